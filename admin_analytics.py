@@ -0,0 +1,209 @@
+"""Fleet-wide admin analytics over every user's data files.
+
+Each user is scanned independently into a small partial aggregate: spend per
+category, months with activity, and how many budgets ran over. Users are
+scanned in parallel in a process pool and the partials are reduced into fleet
+totals. Partials are cached in `.admin_analytics_cache.json` in the data
+directory, keyed by the modification times of the user's files, so a re-run
+only rescans users whose data changed.
+
+    python admin_analytics.py --workers 8
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from archive import archive_index_path, load_archive_index
+from auth import load_users
+from columnar import NO_DATE
+from datadir import data_file_path
+from pivot import normalize_month
+from storage import (
+    budget_file_path, grocery_file_path, load_user_columns, load_user_data, write_json_atomic
+)
+
+CACHE_FILE = data_file_path('.admin_analytics_cache.json')
+
+
+def _file_mtimes(username):
+    paths = [grocery_file_path(username), budget_file_path(username),
+             archive_index_path(username)]
+    return [os.path.getmtime(path) if os.path.exists(path) else None for path in paths]
+
+
+def _month_category_spend(username):
+    """{month: {category: spend}} for live items, read from columns when possible"""
+    columns = load_user_columns(username)
+    if columns is not None:
+        with columns:
+            if not len(columns):
+                return {}, 0
+            # Items whose date could not be parsed have no month to count in
+            dated = columns.date_days != NO_DATE
+            months = columns.date_days[dated].astype('datetime64[D]').astype('datetime64[M]')
+            unique_months, month_codes = np.unique(months, return_inverse=True)
+            category_count = len(columns.categories)
+            totals = np.bincount(
+                month_codes * category_count + columns.category_codes[dated],
+                weights=columns.amounts()[dated],
+                minlength=len(unique_months) * category_count
+            ).reshape(len(unique_months), category_count)
+            result = {}
+            for month, row in zip(unique_months.astype(str).tolist(), totals.tolist()):
+                result[month] = {category: total for category, total in zip(columns.categories, row) if total}
+            return result, len(columns)
+
+    grocery_data, _ = load_user_data(username)
+    result = {}
+    for item in grocery_data:
+        month = normalize_month(item['date_added'][:7])
+        if month is None:
+            continue
+        month = result.setdefault(month, {})
+        month[item['category']] = month.get(item['category'], 0) + item['price'] * item['quantity']
+    return result, len(grocery_data)
+
+
+def scan_user(username):
+    """Compute one user's partial aggregate"""
+    spend, item_count = _month_category_spend(username)
+    for month, summary in load_archive_index(username).items():
+        month_spend = spend.setdefault(month, {})
+        for category, values in summary['categories'].items():
+            month_spend[category] = month_spend.get(category, 0) + values['total']
+        item_count += summary['items']
+
+    category_spend = {}
+    for month_spend in spend.values():
+        for category, amount in month_spend.items():
+            category_spend[category] = category_spend.get(category, 0) + amount
+
+    budget_path = budget_file_path(username)
+    budget_data = []
+    if os.path.exists(budget_path):
+        with open(budget_path, 'r') as f:
+            budget_data = json.load(f)
+    overruns_by_month = {}
+    for entry in budget_data:
+        actual = spend.get(entry['month'], {}).get(entry['category'], 0)
+        counts = overruns_by_month.setdefault(entry['month'], [0, 0])
+        counts[0] += 1
+        if actual > entry['allocated_amount']:
+            counts[1] += 1
+
+    return {
+        'items': item_count,
+        'total': sum(category_spend.values()),
+        'category_spend': category_spend,
+        'active_months': sorted(month for month, month_spend in spend.items() if month_spend),
+        'overruns_by_month': overruns_by_month,
+    }
+
+
+def reduce_partials(partials):
+    """Combine per-user partial aggregates into fleet-wide totals"""
+    category_spend = {}
+    active_users = {}
+    overruns_by_month = {}
+    for partial in partials:
+        for category, amount in partial['category_spend'].items():
+            category_spend[category] = category_spend.get(category, 0) + amount
+        for month in partial['active_months']:
+            active_users[month] = active_users.get(month, 0) + 1
+        for month, (budgets, overruns) in partial['overruns_by_month'].items():
+            counts = overruns_by_month.setdefault(month, [0, 0])
+            counts[0] += budgets
+            counts[1] += overruns
+
+    budgets = sum(counts[0] for counts in overruns_by_month.values())
+    overruns = sum(counts[1] for counts in overruns_by_month.values())
+    return {
+        'users': len(partials),
+        'items': sum(partial['items'] for partial in partials),
+        'total_spend': sum(partial['total'] for partial in partials),
+        'category_spend': dict(sorted(category_spend.items(), key=lambda kv: kv[1], reverse=True)),
+        'active_users_by_month': dict(sorted(active_users.items())),
+        'budgets': budgets,
+        'budget_overruns': overruns,
+        'overrun_rate': overruns / budgets if budgets else 0.0,
+        'overrun_rate_by_month': {
+            month: counts[1] / counts[0] for month, counts in sorted(overruns_by_month.items()) if counts[0]
+        },
+    }
+
+
+def _load_cache(cache_path):
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+def run_admin_analytics(workers=None, cache_path=CACHE_FILE, mp_context=None):
+    """Scan changed users in parallel, reuse cached partials for the rest"""
+    start = time.perf_counter()
+    usernames = list(load_users())
+    cache = _load_cache(cache_path)
+
+    partials = {}
+    changed = []
+    mtimes = {}
+    for username in usernames:
+        mtimes[username] = _file_mtimes(username)
+        cached = cache.get(username)
+        if cached and cached['mtimes'] == mtimes[username]:
+            partials[username] = cached['partial']
+        else:
+            changed.append(username)
+
+    if changed:
+        if workers == 1 or len(changed) == 1:
+            scanned = [scan_user(username) for username in changed]
+        else:
+            chunksize = max(1, len(changed) // ((workers or os.cpu_count() or 1) * 4))
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+                scanned = list(executor.map(scan_user, changed, chunksize=chunksize))
+        partials.update(zip(changed, scanned))
+
+    if cache_path is not None:
+        new_cache = {username: {'mtimes': mtimes[username], 'partial': partials[username]} for username in usernames}
+        # A fresh install has no data directory until the first user signs up
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        write_json_atomic(cache_path, new_cache)
+
+    result = reduce_partials([partials[username] for username in usernames])
+    result['scanned_users'] = len(changed)
+    result['cached_users'] = len(usernames) - len(changed)
+    result['elapsed_seconds'] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet-wide analytics across all users' data")
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true', help='rescan every user and leave the cache untouched')
+    parser.add_argument('--json', action='store_true', help='print the full result as JSON')
+    args = parser.parse_args()
+
+    result = run_admin_analytics(args.workers, cache_path=None if args.no_cache else CACHE_FILE)
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+
+    print(f"{result['users']} users, {result['items']:,} items, €{result['total_spend']:,.2f} total spend "
+          f"({result['scanned_users']} scanned, {result['cached_users']} cached, {result['elapsed_seconds']:.2f} s)")
+    print("Spend per category:")
+    for category, amount in result['category_spend'].items():
+        print(f"  {category:<28} €{amount:,.2f}")
+    print("Active users per month:")
+    for month, count in result['active_users_by_month'].items():
+        print(f"  {month}  {count}")
+    print(f"Budget overruns: {result['budget_overruns']} of {result['budgets']} ({result['overrun_rate']:.1%})")
+
+
+if __name__ == '__main__':
+    main()
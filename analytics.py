@@ -0,0 +1,53 @@
+"""Spending and budget calculations shared by the Streamlit app and the HTTP API"""
+import heapq
+
+from archive import archived_category_totals
+
+
+def total_spent(items, archive_index=None):
+    """Total amount spent across live items and archived months"""
+    total = sum(item['price'] * item['quantity'] for item in items)
+    if archive_index:
+        total += sum(summary['total'] for summary in archive_index.values())
+    return total
+
+
+def spending_by_category(items, archive_index=None):
+    """Spending breakdown by category across live items and archived months"""
+    category_spending = archived_category_totals(archive_index) if archive_index else {}
+    for item in items:
+        category = item['category']
+        amount = item['price'] * item['quantity']
+        category_spending[category] = category_spending.get(category, 0) + amount
+    return category_spending
+
+
+def dashboard_summary(items, archive_index=None, recent_count=5):
+    """Everything the dashboard shows, computed in a single pass over the items"""
+    category_spending = archived_category_totals(archive_index) if archive_index else {}
+    archived_total = sum(summary['total'] for summary in archive_index.values()) if archive_index else 0
+    archived_items = sum(summary['items'] for summary in archive_index.values()) if archive_index else 0
+
+    live_total = 0
+    recent = []  # min-heap of (date_added, position) for the newest items
+    for position, item in enumerate(items):
+        amount = item['price'] * item['quantity']
+        live_total += amount
+        category = item['category']
+        category_spending[category] = category_spending.get(category, 0) + amount
+        entry = (item['date_added'], position)
+        if len(recent) < recent_count:
+            heapq.heappush(recent, entry)
+        elif entry > recent[0]:
+            heapq.heapreplace(recent, entry)
+
+    total_items = len(items) + archived_items
+    total = live_total + archived_total
+    return {
+        'total_items': total_items,
+        'total_spent': total,
+        'category_count': len(category_spending),
+        'avg_item_cost': total / total_items if total_items else 0,
+        'category_spending': category_spending,
+        'recent_items': [items[position] for _, position in sorted(recent, reverse=True)],
+    }
@@ -0,0 +1,321 @@
+"""Headless HTTP JSON API for scripts and integrations.
+
+Runs without Streamlit and shares the app's data layer: the same users.json
+accounts, `storage.load_user_data` / `save_user_data` files, item IDs and
+spending calculations. Users' data is held in the app's memory-capped LRU
+cache (datacache.py). Writes go through a write-behind autosave queue, so a
+request returns as soon as the in-memory state is updated. Saves are merged
+with whatever the app or another API process saved meanwhile (see sync.py),
+and each request first picks up such changes with a revision check.
+
+Authentication is HTTP Basic with the app's username and password.
+
+    GET    /health
+    GET    /items?category=...&limit=N
+    POST   /items                          {"name", "category", "price", "quantity", ...}
+    DELETE /items/<id>
+    GET    /budgets?month=YYYY-MM
+    PUT    /budgets                        {"category", "allocated_amount", "month"}
+    GET    /analytics/spending-by-category
+    GET    /analytics/budget-vs-actual?month=YYYY-MM
+
+Start it with `python api.py --port 8600`.
+"""
+import argparse
+import atexit
+import base64
+import binascii
+import json
+import logging
+import math
+import os
+import threading
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from analytics import spending_by_category
+from archive import load_archive_index
+from auth import load_users, verify_password
+from autosave import AutosaveQueue
+from budget_alerts import BudgetAlerts
+from datacache import UserDataCache
+from events import has_local_changes
+from datadir import users_file_path
+from items import ensure_item_ids
+from mutations import UserData
+from storage import load_user_snapshot
+from sync import attach
+
+logger = logging.getLogger(__name__)
+
+
+class ApiError(Exception):
+    """An error reported to the client as a JSON body with an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class GroceryApi:
+    """Request-independent state of the API: accounts, user data and autosave"""
+
+    def __init__(self):
+        self._users_lock = threading.Lock()
+        self._users = {}
+        self._users_mtime = None
+        self.autosave = AutosaveQueue()
+        # Same memory cap and LRU eviction as the app; users with unsaved changes stay resident
+        self.cache = UserDataCache(self._load_user_data, is_pinned=self.autosave.is_pending)
+
+    def authenticate(self, header):
+        """Return the username for a Basic Authorization header"""
+        if not header or not header.startswith('Basic '):
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Authentication required")
+        try:
+            username, _, password = base64.b64decode(header[6:]).decode('utf-8').partition(':')
+        except (binascii.Error, UnicodeDecodeError):
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Malformed credentials")
+
+        with self._users_lock:
+            users_file = users_file_path()
+            mtime = os.path.getmtime(users_file) if os.path.exists(users_file) else None
+            if mtime != self._users_mtime:
+                self._users = load_users()
+                self._users_mtime = mtime
+            user = self._users.get(username)
+        if user is None or not verify_password(password, user['password']):
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Invalid username or password")
+        return username
+
+    def _load_user_data(self, username):
+        grocery_data, budget_data, revision = load_user_snapshot(username)
+        ensure_item_ids(grocery_data)
+        user_data = UserData(username, grocery_data, budget_data, load_archive_index(username))
+        attach(user_data, revision)
+        user_data.subscribe(lambda events: self.persist(user_data) if has_local_changes(events) else None)
+        return user_data
+
+    def persist(self, user_data):
+        """Queue a user's data for a debounced write"""
+        self.autosave.mark_dirty(user_data.username, user_data.grocery_items, user_data.budget_entries)
+
+    def list_items(self, user_data, query):
+        items = user_data.grocery_items
+        category = query.get('category')
+        if category:
+            items = [item for item in items if item['category'] == category]
+        items = sorted(items, key=lambda x: x['date_added'], reverse=True)
+        if 'limit' in query:
+            items = items[:_parse_int(query['limit'], 'limit')]
+        return {'items': items, 'count': len(items)}
+
+    def create_item(self, user_data, body):
+        for field in ('name', 'category', 'price', 'quantity'):
+            if not body.get(field):
+                raise ApiError(HTTPStatus.BAD_REQUEST, f"Missing required field '{field}'")
+        price = _parse_float(body['price'], 'price')
+        quantity = _parse_int(body['quantity'], 'quantity')
+        if price <= 0 or quantity < 1:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "price must be positive and quantity at least 1")
+        new_item = {
+            'name': _parse_str(body['name'], 'name'),
+            'category': _parse_str(body['category'], 'category'),
+            'price': price,
+            'quantity': quantity,
+            'unit': _parse_str(body.get('unit') or 'pieces', 'unit'),
+            'date_added': _parse_date(body.get('date_added')) or datetime.now().strftime("%Y-%m-%d"),
+            'expiry_date': _parse_date(body.get('expiry_date')),
+            'brand': _parse_str(body['brand'], 'brand') if body.get('brand') else None
+        }
+        return user_data.add_item(new_item)
+
+    def delete_item(self, user_data, item_id):
+        if item_id not in user_data.item_index:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"No item with id '{item_id}'")
+        return user_data.remove_item(item_id)
+
+    def list_budgets(self, user_data, query):
+        month = query.get('month')
+        budgets = [entry for entry in user_data.budget_entries if not month or entry['month'] == month]
+        return {'budgets': budgets}
+
+    def set_budget(self, user_data, body):
+        if not body.get('category'):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Missing required field 'category'")
+        category = _parse_str(body['category'], 'category')
+        allocated_amount = _parse_float(body.get('allocated_amount'), 'allocated_amount')
+        month = body.get('month') or datetime.now().strftime("%Y-%m")
+        try:
+            datetime.strptime(month, "%Y-%m")
+        except (TypeError, ValueError):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "month must be YYYY-MM")
+        return user_data.set_budget(category, allocated_amount, month)
+
+    def shutdown(self):
+        self.autosave.shutdown()
+
+
+def _parse_int(value, field):
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{field}' must be an integer")
+
+
+def _parse_float(value, field):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{field}' must be a number")
+    # float() accepts 'nan' and 'inf', and json.loads accepts NaN and Infinity
+    if not math.isfinite(number):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{field}' must be a finite number")
+    return number
+
+
+def _parse_str(value, field):
+    if isinstance(value, (dict, list)):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{field}' must be a string")
+    return str(value)
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """Routes JSON requests to a GroceryApi instance"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'GroceryAPI/1.0'
+    # Headers and body go out as separate writes; without TCP_NODELAY every
+    # keep-alive response stalls on the client's delayed ACK (~40 ms).
+    disable_nagle_algorithm = True
+    api = None
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Request body must be JSON")
+        if not isinstance(body, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+        return body
+
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            # Always consume the body so keep-alive connections stay in sync
+            body = self._read_body()
+            if parts == ['health'] and method == 'GET':
+                return self._send(HTTPStatus.OK, {'status': 'ok'})
+
+            username = self.api.authenticate(self.headers.get('Authorization'))
+            user_data = self.api.cache.get(username)
+            # The user's requests run one at a time, each after merging what other processes saved
+            with user_data.lock:
+                user_data.sync.refresh()
+                status, payload = self._route(method, parts, query, body, user_data)
+        except ApiError as e:
+            status, payload = e.status, {'error': e.message}
+        except Exception:
+            logger.exception("%s %s failed", method, self.path)
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Internal server error"}
+        self._send(status, payload)
+
+    def _route(self, method, parts, query, body, user_data):
+        api = self.api
+        if parts == ['items']:
+            if method == 'GET':
+                return HTTPStatus.OK, api.list_items(user_data, query)
+            if method == 'POST':
+                return HTTPStatus.CREATED, api.create_item(user_data, body)
+        elif len(parts) == 2 and parts[0] == 'items' and method == 'DELETE':
+            return HTTPStatus.OK, api.delete_item(user_data, parts[1])
+        elif parts == ['budgets']:
+            if method == 'GET':
+                return HTTPStatus.OK, api.list_budgets(user_data, query)
+            if method == 'PUT':
+                return HTTPStatus.OK, api.set_budget(user_data, body)
+        elif parts == ['analytics', 'spending-by-category'] and method == 'GET':
+            return HTTPStatus.OK, spending_by_category(user_data.grocery_items, user_data.archive_index)
+        elif parts == ['analytics', 'budget-vs-actual'] and method == 'GET':
+            # The month's spending from the same running totals the app's budget pages use
+            return HTTPStatus.OK, user_data.derived('budget_alerts', BudgetAlerts.from_user_data).status(
+                query.get('month')
+            )
+        raise ApiError(HTTPStatus.NOT_FOUND, f"No route for {method} {self.path}")
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(host='127.0.0.1', port=8600, verbose=False):
+    """Create (but do not start) an API server bound to host:port"""
+    api = GroceryApi()
+    handler = type('BoundApiRequestHandler', (ApiRequestHandler,), {'api': api})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    server.api = api
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Grocery & Budget Assistant HTTP API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.verbose)
+    atexit.register(server.api.shutdown)
+    print(f"Serving the grocery API on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,12 +3,37 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import json
-import os
+import io
+import time
+import multiprocessing
 from dataclasses import dataclass
 from typing import List, Dict
 import numpy as np
 
+from admin_analytics import run_admin_analytics
+from analytics import dashboard_summary, total_spent
+from auth import hash_password, is_admin, load_users, save_users, verify_password
+from storage import load_user_snapshot, save_user_data
+from autosave import get_autosave_queue
+from budget_alerts import BudgetAlerts
+from datacache import UserDataCache
+from events import has_local_changes
+from classifier import get_category_classifier
+from copurchase import CoPurchaseModel
+from downsample import WEBGL_THRESHOLD, downsample
+from pivot import CategoryMonthPivot, normalize_month
+from planner import PRIORITY_LEVELS, plan_shopping_list
+from rangeindex import SpendRangeIndex
+from receipts import ReceiptParser, categorize
+from recurring import RecurringPurchases
+from archive import (
+    archive_old_items, load_archive_index, load_archived_items
+)
+from items import ensure_item_ids
+from memprofile import get_memory_profiler, load_report
+from mutations import UserData
+from sync import FIELD_CONFLICT, REMOVED_ELSEWHERE, REMOVED_HERE, attach
+
 # Configure page
 st.set_page_config(
     page_title="Smart Grocery & Budget Assistant",
@@ -196,58 +221,6 @@ class BudgetEntry:
     spent_amount: float
     month: str
 
-# Data persistence functions
-def load_data():
-    """Load data from JSON files"""
-    grocery_data = []
-    budget_data = []
-    
-    if os.path.exists('grocery_data.json'):
-        with open('grocery_data.json', 'r') as f:
-            grocery_data = json.load(f)
-    
-    if os.path.exists('budget_data.json'):
-        with open('budget_data.json', 'r') as f:
-            budget_data = json.load(f)
-    
-    return grocery_data, budget_data
-
-def save_data(grocery_data, budget_data):
-    """Save data to JSON files"""
-    with open('grocery_data.json', 'w') as f:
-        json.dump(grocery_data, f)
-    
-    with open('budget_data.json', 'w') as f:
-        json.dump(budget_data, f)
-
-# Initialize session state
-if 'grocery_items' not in st.session_state:
-    grocery_data, budget_data = load_data()
-    st.session_state.grocery_items = grocery_data
-    st.session_state.budget_entries = budget_data
-
-# Authentication functions
-def hash_password(password):
-    """Simple password hashing (in production, use proper hashing like bcrypt)"""
-    import hashlib
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def verify_password(password, hashed_password):
-    """Verify password against hashed password"""
-    return hash_password(password) == hashed_password
-
-def load_users():
-    """Load user data from JSON file"""
-    if os.path.exists('users.json'):
-        with open('users.json', 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_users(users):
-    """Save user data to JSON file"""
-    with open('users.json', 'w') as f:
-        json.dump(users, f)
-
 def forgot_password_page():
     """Display forgot password page"""
     st.markdown("""
@@ -379,35 +352,6 @@ def verify_and_reset_password():
         st.session_state.show_forgot_password = False
         st.rerun()
 
-def load_user_data(username):
-    """Load specific user's grocery and budget data"""
-    grocery_file = f'{username}_grocery_data.json'
-    budget_file = f'{username}_budget_data.json'
-    
-    grocery_data = []
-    budget_data = []
-    
-    if os.path.exists(grocery_file):
-        with open(grocery_file, 'r') as f:
-            grocery_data = json.load(f)
-    
-    if os.path.exists(budget_file):
-        with open(budget_file, 'r') as f:
-            budget_data = json.load(f)
-    
-    return grocery_data, budget_data
-
-def save_user_data(username, grocery_data, budget_data):
-    """Save specific user's grocery and budget data"""
-    grocery_file = f'{username}_grocery_data.json'
-    budget_file = f'{username}_budget_data.json'
-    
-    with open(grocery_file, 'w') as f:
-        json.dump(grocery_data, f)
-    
-    with open(budget_file, 'w') as f:
-        json.dump(budget_data, f)
-
 def login_page():
     """Display login page"""
     st.markdown("""
@@ -462,10 +406,8 @@ def login_page():
                 st.session_state.username = username
                 st.session_state.user_email = users[username]['email']
                 
-                # Load user's data
-                grocery_data, budget_data = load_user_data(username)
-                st.session_state.grocery_items = grocery_data
-                st.session_state.budget_entries = budget_data
+                # Load the user's data and first-page views in the background while the app reruns
+                prewarm_user_data(username)
                 
                 st.success(f"🎉 Welcome back, {username}!")
                 st.rerun()
@@ -715,6 +657,9 @@ def get_category_suggestions():
         "👶 Baby Products", "🐕 Pet Supplies"
     ]
 
+def get_unit_options():
+    return ["pieces", "kg", "lbs", "liters", "gallons", "boxes", "bottles"]
+
 def get_category_emoji(category):
     """Get emoji for category"""
     emoji_map = {
@@ -847,40 +792,171 @@ def get_item_emoji(item_name):
     else:
         return "🛒"
 
+def get_archive_index():
+    """Per-month summaries of the current user's archived months"""
+    return get_user_data().archive_index
+
 def calculate_total_spent():
     """Calculate total amount spent"""
-    total = sum(item['price'] * item['quantity'] for item in st.session_state.grocery_items)
-    return total
-
-def get_spending_by_category():
-    """Get spending breakdown by category"""
-    category_spending = {}
-    for item in st.session_state.grocery_items:
-        category = item['category']
-        amount = item['price'] * item['quantity']
-        category_spending[category] = category_spending.get(category, 0) + amount
-    return category_spending
+    return total_spent(get_user_data().grocery_items, get_archive_index())
+
+def get_budget_alerts():
+    """Running spend per month and category with threshold alerts, updated on every write"""
+    return get_user_data().derived('budget_alerts', BudgetAlerts.from_user_data)
 
 def get_budget_vs_actual():
-    """Compare budget vs actual spending"""
-    category_spending = get_spending_by_category()
-    current_month = datetime.now().strftime("%Y-%m")
-    
-    budget_comparison = []
-    for entry in st.session_state.budget_entries:
-        if entry['month'] == current_month:
-            actual_spent = category_spending.get(entry['category'], 0)
-            budget_comparison.append({
-                'category': entry['category'],
-                'budgeted': entry['allocated_amount'],
-                'actual': actual_spent,
-                'remaining': entry['allocated_amount'] - actual_spent
-            })
+    """Compare this month's budgets with this month's spending, from the running totals"""
+    return get_budget_alerts().status()
+
+def show_budget_alerts():
+    """Toast alerts this session has not seen yet and show a badge for this month's alerts"""
+    alerts = get_budget_alerts()
+    # A rebuilt model starts a new alert sequence; nothing from before it is re-announced
+    seen_model, seen_sequence = st.session_state.get('budget_alerts_seen', (None, None))
+    if seen_model != id(alerts):
+        seen_sequence = alerts.sequence
+    for alert in alerts.since(seen_sequence):
+        st.toast(
+            f"{alert['category']}: {alert['threshold']:.0%} of the "
+            f"{alert['month']} budget used (€{alert['spent']:.2f} of €{alert['budgeted']:.2f})",
+            icon="🚨" if alert['threshold'] >= 1 else "⚠️"
+        )
+    st.session_state.budget_alerts_seen = (id(alerts), alerts.sequence)
     
-    return budget_comparison
+    active = alerts.active()
+    if active:
+        with st.sidebar.expander(f"🔔 {len(active)} budget alert(s) this month"):
+            for category, threshold in active:
+                st.write(f"{'🚨' if threshold >= 1 else '⚠️'} {category}: {threshold:.0%} reached")
+
+def describe_conflict(conflict):
+    """One-line description of a merge conflict with another session"""
+    label = conflict['label']
+    if conflict['kind'] == FIELD_CONFLICT:
+        return (f"**{label}**: {conflict['field']} is `{conflict['kept']}` here "
+                f"but was changed to `{conflict['other']}` in another session")
+    if conflict['kind'] == REMOVED_HERE:
+        return f"**{label}** was removed here but edited in another session, so it was kept"
+    if conflict['kind'] == REMOVED_ELSEWHERE:
+        return f"**{label}** was edited here but removed in another session, so it was kept"
+    other = f"€{conflict['other']:.2f}" if conflict['other'] is not None else "nothing"
+    return f"**{label}** budget is €{conflict['kept']:.2f} here but was set to {other} in another session"
+
+def show_sync_conflicts():
+    """Changes that clashed with another session's save, each with a choice of version"""
+    sync = get_user_data().sync
+    if not sync.conflicts:
+        return
+    with st.sidebar.expander(f"⚠️ {len(sync.conflicts)} sync conflict(s)", expanded=True):
+        for conflict in list(sync.conflicts):
+            st.markdown(describe_conflict(conflict))
+            col1, col2 = st.columns(2)
+            if col1.button("Keep", key=f"conflict_keep_{conflict['sequence']}"):
+                sync.resolve(conflict['sequence'], use_other=False)
+                st.rerun()
+            other_label = "Remove" if conflict['kind'] in (REMOVED_HERE, REMOVED_ELSEWHERE) else "Use other"
+            if col2.button(other_label, key=f"conflict_other_{conflict['sequence']}"):
+                sync.resolve(conflict['sequence'], use_other=True)
+                st.rerun()
+
+def open_user_data(username, grocery_data, budget_data, archive_index, revision):
+    """Wrap a user's loaded data and subscribe autosave and the category classifier to its changes"""
+    user_data = UserData(username, grocery_data, budget_data, archive_index)
+    attach(user_data, revision)
+    # Changes merged in from other sessions are already saved
+    user_data.subscribe(
+        lambda events: get_autosave_queue().mark_dirty(username, user_data.grocery_items, user_data.budget_entries)
+        if has_local_changes(events) else None
+    )
+    user_data.subscribe(lambda events: get_category_classifier().observe(events))
+    return user_data
+
+def hydrate_user_data(username):
+    """Load a user's data from disk, assign missing IDs and archive old months"""
+    grocery_data, budget_data, revision = load_user_snapshot(username)
+    ids_assigned = ensure_item_ids(grocery_data)
+    
+    user_data = open_user_data(username, grocery_data, budget_data, load_archive_index(username), revision)
+    if ids_assigned:
+        get_autosave_queue().mark_dirty(username, user_data.grocery_items, user_data.budget_entries)
+    
+    # Move months older than the archive horizon into cold storage. The moved items are removed
+    # as a change of their own, so a save that has to merge with another session replays it
+    live_items, archive_stats = archive_old_items(username, user_data.grocery_items)
+    if archive_stats['items']:
+        live_ids = {item['id'] for item in live_items}
+        user_data.archive_index = load_archive_index(username)
+        user_data.remove_items([item['id'] for item in user_data.grocery_items if item['id'] not in live_ids])
+        get_autosave_queue().flush(username)
+    return user_data
+
+@st.cache_resource
+def get_user_data_cache():
+    """Process-wide cache of user data shared by all sessions; users with unsaved changes stay resident"""
+    return UserDataCache(hydrate_user_data, is_pinned=get_autosave_queue().is_pending)
+
+def get_user_data():
+    """The current user's data, shared with their other sessions; all mutations go through it"""
+    user_data = get_user_data_cache().get(st.session_state.username)
+    # One stat of the revision file unless another process saved this user
+    user_data.sync.refresh()
+    st.session_state.data_revision = user_data.revision
+    return user_data
+
+def get_copurchase_model():
+    """The current user's co-purchase counts, mined once and kept current from change events"""
+    return get_user_data().derived('copurchase', CoPurchaseModel.from_user_data)
+
+def build_dashboard_summary(user_data):
+    return dashboard_summary(user_data.grocery_items, user_data.archive_index)
+
+def get_range_index():
+    """Cumulative spend per category and day, for any date range in O(categories)"""
+    return get_user_data().derived('range_index', SpendRangeIndex.from_user_data)
+
+def get_items_in_range(start_date, end_date):
+    """Live items added between two dates, inclusive"""
+    start, end = start_date.isoformat(), end_date.isoformat()
+    return [item for item in get_user_data().grocery_items if start <= item['date_added'] <= end]
+
+def select_date_range(index, key):
+    """Date-range picker over the days the user has data for; returns (start, end), or None until both are picked"""
+    bounds = index.bounds()
+    if bounds is None:
+        return None
+    selected = st.date_input("📅 Date range", value=bounds, key=key)
+    # While a new range is being picked the widget holds only its start date, and nothing once cleared
+    if len(selected) != 2:
+        st.info("Pick a start and an end date to see this range.")
+        return None
+    return selected
+
+def get_category_pivot():
+    """Category × month spend/budget matrices, rebuilt only when the user's data changes"""
+    return get_user_data().derived('category_pivot', CategoryMonthPivot.from_user_data)
+
+def get_recurring_purchases():
+    """The current user's purchase intervals per item, kept current from change events"""
+    return get_user_data().derived('recurring', RecurringPurchases.from_user_data)
+
+def get_dashboard_summary():
+    """Dashboard figures, recomputed only when the user's data revision changes"""
+    return get_user_data().derived('dashboard', build_dashboard_summary)
+
+def prewarm_user_data(username):
+    """Start hydrating a just-authenticated user, then build the views the first pages need"""
+    get_user_data_cache().prewarm(username, warmers=(
+        lambda data: data.derived('dashboard', build_dashboard_summary),
+        lambda data: data.derived('recurring', RecurringPurchases.from_user_data),
+        lambda data: data.derived('budget_alerts', BudgetAlerts.from_user_data),
+        lambda data: data.derived('copurchase', CoPurchaseModel.from_user_data),
+    ))
 
 # Main app
 def main():
+    # Starts tracemalloc on the first run when GROCERY_MEMPROFILE is set, before any user data is loaded
+    profiler = get_memory_profiler()
+
     # Check if user is logged in
     if not st.session_state.logged_in:
         if st.session_state.get('show_signup', False):
@@ -940,36 +1016,64 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    page = st.sidebar.selectbox(
-        "Choose a page:",
-        ["📊 Dashboard", "➕ Add Grocery Item", "📝 Grocery List", "💰 Budget Manager", "📈 Analytics", "🎯 Smart Recommendations"]
-    )
+    pages = ["📊 Dashboard", "➕ Add Grocery Item", "🧾 Import Receipt", "📝 Grocery List", "💰 Budget Manager", "🧮 Shopping Planner", "📈 Analytics", "🗓️ Monthly Report", "🎯 Smart Recommendations"]
+    if is_admin(st.session_state.username):
+        pages.append("🛠️ Admin Analytics")
+    page = st.sidebar.selectbox("Choose a page:", pages)
     
     # Logout button
     if st.sidebar.button("🚪 Logout", type="secondary"):
-        # Save current user data before logout
-        save_user_data(st.session_state.username, st.session_state.grocery_items, st.session_state.budget_entries)
+        # Write any pending autosave before logout; nothing is saved if there are no changes
+        get_autosave_queue().flush(st.session_state.username)
         
         # Clear session state
         st.session_state.logged_in = False
         st.session_state.username = None
         st.session_state.user_email = None
-        st.session_state.grocery_items = []
-        st.session_state.budget_entries = []
+        st.session_state.data_revision = None
         st.rerun()
-    
-    if page == "📊 Dashboard":
-        show_dashboard()
-    elif page == "➕ Add Grocery Item":
-        add_grocery_item()
-    elif page == "📝 Grocery List":
-        show_grocery_list()
-    elif page == "💰 Budget Manager":
-        budget_manager()
-    elif page == "📈 Analytics":
-        show_analytics()
-    elif page == "🎯 Smart Recommendations":
-        show_recommendations()
+
+    # Autosave status of this user only; the process-wide queue is on the admin page
+    autosave_status = get_autosave_queue().user_status(st.session_state.username)
+    if autosave_status['failures']:
+        st.sidebar.warning(f"💾 Saving failed {autosave_status['failures']} time(s); retrying")
+    elif autosave_status['pending']:
+        st.sidebar.caption(f"💾 Unsaved changes ({autosave_status['pending_seconds']:.0f} s), saving shortly")
+    elif autosave_status['last_saved'] is not None:
+        st.sidebar.caption(
+            f"💾 All changes saved at {datetime.fromtimestamp(autosave_status['last_saved']):%H:%M:%S} "
+            f"· last write {autosave_status['last_write_ms']:.1f} ms"
+        )
+    user_data = get_user_data()
+    st.sidebar.caption(
+        f"🧠 {len(user_data.grocery_items):,} items · "
+        f"{get_user_data_cache().resident_bytes(user_data.username) / 1024:,.0f} KB in memory · "
+        f"revision {user_data.revision} · saved as {user_data.sync.stored_revision}"
+    )
+    show_budget_alerts()
+    show_sync_conflicts()
+
+    with profiler.profile(page, user_data):
+        if page == "📊 Dashboard":
+            show_dashboard()
+        elif page == "➕ Add Grocery Item":
+            add_grocery_item()
+        elif page == "🧾 Import Receipt":
+            import_receipt()
+        elif page == "📝 Grocery List":
+            show_grocery_list()
+        elif page == "💰 Budget Manager":
+            budget_manager()
+        elif page == "🧮 Shopping Planner":
+            show_shopping_planner()
+        elif page == "📈 Analytics":
+            show_analytics()
+        elif page == "🗓️ Monthly Report":
+            show_monthly_report()
+        elif page == "🎯 Smart Recommendations":
+            show_recommendations()
+        elif page == "🛠️ Admin Analytics":
+            show_admin_analytics()
 
 def show_dashboard():
     st.markdown('<div class="grocery-pattern">', unsafe_allow_html=True)
@@ -991,9 +1095,10 @@ def show_dashboard():
     # Key metrics with beautiful cards
     col1, col2, col3, col4 = st.columns(4)
     
-    total_items = len(st.session_state.grocery_items)
-    total_spent = calculate_total_spent()
-    category_count = len(set(item['category'] for item in st.session_state.grocery_items))
+    summary = get_dashboard_summary()
+    total_items = summary['total_items']
+    total_spent = summary['total_spent']
+    category_count = summary['category_count']
     
     with col1:
         st.markdown(f"""
@@ -1046,7 +1151,7 @@ def show_dashboard():
         """, unsafe_allow_html=True)
     
     with col4:
-        avg_item_cost = total_spent / total_items if total_items > 0 else 0
+        avg_item_cost = summary['avg_item_cost']
         st.markdown(f"""
         <div style="
             background: linear-gradient(135deg, #d299c2 0%, #fef9d7 100%);
@@ -1076,14 +1181,8 @@ def show_dashboard():
     </div>
     """, unsafe_allow_html=True)
     
-    if st.session_state.grocery_items:
-        recent_items = sorted(
-            st.session_state.grocery_items,
-            key=lambda x: x['date_added'],
-            reverse=True
-        )[:5]
-        
-        for item in recent_items:
+    if summary['recent_items']:
+        for item in summary['recent_items']:
             item_emoji = get_item_emoji(item['name'])
             with st.expander(f"{item_emoji} {item['name']} - €{item['price']:.2f}"):
                 col1, col2, col3 = st.columns(3)
@@ -1097,6 +1196,44 @@ def show_dashboard():
     else:
         st.info("No grocery items added yet. Start by adding some items!")
     
+    # Replenishment list from the user's purchase intervals
+    st.markdown("""
+    <div style="
+        background: linear-gradient(135deg, #d4fc79 0%, #96e6a1 100%);
+        padding: 1rem;
+        border-radius: 12px;
+        margin: 2rem 0 1rem 0;
+        text-align: center;
+        box-shadow: 0 4px 15px rgba(0, 0, 0, 0.1);
+    ">
+        <h3 style="color: #2c3e50; margin: 0;">🔁 Due Soon</h3>
+    </div>
+    """, unsafe_allow_html=True)
+    due_soon = get_recurring_purchases().due_soon()
+    if due_soon:
+        due_df = pd.DataFrame([
+            {
+                'Item': f"{get_item_emoji(estimate['name'])} {estimate['name']}",
+                'Category': f"{get_category_emoji(estimate['category'])} {estimate['category']}",
+                'Usually': f"{estimate['quantity']} {estimate['unit']} every {estimate['interval_days']:.0f} ± {estimate['interval_std']:.0f} days",
+                'Last Bought': estimate['last_purchase'].isoformat(),
+                'Due': (
+                    f"{-estimate['days_until']} day(s) overdue" if estimate['days_until'] < 0
+                    else "today" if estimate['days_until'] == 0
+                    else f"in {estimate['days_until']} day(s)"
+                ),
+                'Est. Cost': f"€{estimate['price'] * estimate['quantity']:.2f}"
+            }
+            for estimate in due_soon
+        ])
+        st.dataframe(due_df, use_container_width=True, hide_index=True)
+        st.caption(
+            f"🛒 {len(due_soon)} items to restock, about "
+            f"€{sum(estimate['price'] * estimate['quantity'] for estimate in due_soon):.2f}"
+        )
+    else:
+        st.info("Nothing due yet. Items you buy regularly will show up here when it's time to restock.")
+    
     # Quick budget overview
     st.markdown("""
     <div style="
@@ -1134,17 +1271,43 @@ def show_dashboard():
 def add_grocery_item():
     st.header("➕ Add Grocery Item")
     
+    # Suggest what usually goes in the same basket as today's purchases
+    today = datetime.now().strftime("%Y-%m-%d")
+    todays_names = [item['name'] for item in get_user_data().grocery_items if item['date_added'] == today]
+    suggestions = get_copurchase_model().suggest(todays_names) if todays_names else []
+    if suggestions:
+        st.caption("🛒 You usually buy these with today's items:")
+        suggestion_cols = st.columns(len(suggestions))
+        for col, suggestion in zip(suggestion_cols, suggestions):
+            col.button(
+                f"{get_item_emoji(suggestion['item'])} {suggestion['item']}",
+                key=f"suggest_{suggestion['item']}",
+                help=f"Bought together in {suggestion['confidence']:.0%} of baskets",
+                on_click=lambda name=suggestion['item']: st.session_state.update(add_item_name=name)
+            )
+    
+    # The name sits outside the form so the category can be predicted as it changes
+    name = st.text_input("Item Name*", placeholder="e.g., Organic Bananas", key="add_item_name")
+    categories = get_category_suggestions()
+    predicted_category = get_category_classifier().predict(name) if name else None
+    if predicted_category and predicted_category not in categories:
+        categories = [predicted_category] + categories
+    
     with st.form("add_item_form"):
         col1, col2 = st.columns(2)
         
         with col1:
-            name = st.text_input("Item Name*", placeholder="e.g., Organic Bananas")
-            category = st.selectbox("Category*", get_category_suggestions())
+            category = st.selectbox(
+                "Category*",
+                categories,
+                index=categories.index(predicted_category) if predicted_category else 0,
+                help="Suggested from the item name" if predicted_category else None
+            )
             price = st.number_input("Price (€)*", min_value=0.01, step=0.01, format="%.2f")
             quantity = st.number_input("Quantity*", min_value=1, step=1)
         
         with col2:
-            unit = st.selectbox("Unit", ["pieces", "kg", "lbs", "liters", "gallons", "boxes", "bottles"])
+            unit = st.selectbox("Unit", get_unit_options())
             brand = st.text_input("Brand (optional)", placeholder="e.g., Organic Valley")
             expiry_date = st.date_input("Expiry Date (optional)", value=None)
         
@@ -1163,17 +1326,99 @@ def add_grocery_item():
                     'brand': brand if brand else None
                 }
                 
-                st.session_state.grocery_items.append(new_item)
-                save_user_data(st.session_state.username, st.session_state.grocery_items, st.session_state.budget_entries)
+                get_user_data().add_item(new_item)
                 st.success(f"Added {name} to your grocery list!")
                 st.rerun()
             else:
                 st.error("Please fill in all required fields marked with *")
 
+def import_receipt():
+    st.header("🧾 Import Receipt")
+    st.write("Paste the text of a receipt or upload it as a `.txt` file. "
+             "Each item line becomes a grocery item; review the rows, then add them all at once.")
+    
+    # Fresh widget keys after each import clear the upload and the pasted text
+    import_count = st.session_state.get('receipt_import_count', 0)
+    uploaded = st.file_uploader("Receipt file", type=["txt"], key=f"receipt_file_{import_count}")
+    pasted = st.text_area("Receipt text", height=200, key=f"receipt_text_{import_count}",
+                          placeholder="BANANAS            1.29\nWHOLE MILK  2 x 1.09  2.18\n...")
+    
+    receipt = ReceiptParser()
+    if uploaded is not None:
+        # Stream the upload line by line instead of decoding it into one string
+        lines = io.TextIOWrapper(io.BytesIO(uploaded.getvalue()), encoding='utf-8', errors='replace')
+    elif pasted:
+        lines = pasted.splitlines()
+    else:
+        return
+    
+    start = time.perf_counter()
+    parsed_items = categorize(list(receipt.parse(lines)))
+    parse_ms = (time.perf_counter() - start) * 1000
+    
+    if not parsed_items:
+        st.warning("No item lines found in this receipt.")
+        return
+    
+    st.caption(f"Found {len(parsed_items)} items in {receipt.lines} lines "
+               f"({receipt.skipped_count} other lines skipped) in {parse_ms:.1f} ms")
+    
+    categories = get_category_suggestions()
+    units = get_unit_options()
+    receipt_df = pd.DataFrame([
+        {
+            'Add': True,
+            'Item': item['name'],
+            'Category': item['category'] if item['category'] in categories else categories[0],
+            'Price (€)': item['price'],
+            'Quantity': item['quantity'],
+            'Unit': item['unit'] if item['unit'] in units else units[0]
+        }
+        for item in parsed_items
+    ])
+    edited = st.data_editor(
+        receipt_df,
+        key=f"receipt_editor_{import_count}",
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Add': st.column_config.CheckboxColumn(),
+            'Category': st.column_config.SelectboxColumn(options=categories, required=True),
+            'Price (€)': st.column_config.NumberColumn(min_value=0.01, step=0.01, format="€%.2f"),
+            'Quantity': st.column_config.NumberColumn(min_value=1, step=1),
+            'Unit': st.column_config.SelectboxColumn(options=units, required=True)
+        }
+    )
+    
+    receipt_date = datetime.strptime(receipt.date, "%Y-%m-%d").date() if receipt.date else datetime.now().date()
+    purchase_date = st.date_input("Purchase date", value=receipt_date, key=f"receipt_date_{import_count}")
+    
+    rows = [row for row in edited.to_dict('records') if row['Add'] and row['Item'] and row['Price (€)'] > 0]
+    total = sum(row['Price (€)'] * row['Quantity'] for row in rows)
+    if st.button(f"Add {len(rows)} items (€{total:.2f})", type="primary", disabled=not rows):
+        new_items = [
+            {
+                'name': row['Item'],
+                'category': row['Category'],
+                'price': float(row['Price (€)']),
+                'quantity': int(row['Quantity']),
+                'unit': row['Unit'],
+                'date_added': purchase_date.strftime("%Y-%m-%d"),
+                'expiry_date': None,
+                'brand': None
+            }
+            for row in rows
+        ]
+        # The whole receipt is one change: one autosave mark and one rerun
+        get_user_data().add_items(new_items)
+        st.session_state.receipt_import_count = import_count + 1
+        st.success(f"Added {len(new_items)} items from the receipt!")
+        st.rerun()
+
 def show_grocery_list():
     st.header("📝 Grocery List")
     
-    if not st.session_state.grocery_items:
+    if not get_user_data().grocery_items:
         st.info("Your grocery list is empty. Add some items to get started!")
         return
     
@@ -1184,14 +1429,14 @@ def show_grocery_list():
         search_term = st.text_input("🔍 Search items", placeholder="Search by name...")
     
     with col2:
-        categories = ["All"] + list(set(item['category'] for item in st.session_state.grocery_items))
+        categories = ["All"] + list(set(item['category'] for item in get_user_data().grocery_items))
         selected_category = st.selectbox("Filter by category", categories)
     
     with col3:
         sort_by = st.selectbox("Sort by", ["Date Added", "Name", "Price", "Category"])
     
     # Filter items
-    filtered_items = st.session_state.grocery_items.copy()
+    filtered_items = get_user_data().grocery_items.copy()
     
     if search_term:
         filtered_items = [item for item in filtered_items if search_term.lower() in item['name'].lower()]
@@ -1209,9 +1454,18 @@ def show_grocery_list():
     elif sort_by == "Category":
         filtered_items.sort(key=lambda x: x['category'])
     
+    # Bulk operations replace the per-item list while enabled
+    if st.toggle("☑️ Bulk edit mode", key="bulk_mode"):
+        if filtered_items:
+            bulk_edit_items(filtered_items)
+        else:
+            st.warning("No items match your search criteria.")
+        return
+    
     # Display items
     if filtered_items:
-        for i, item in enumerate(filtered_items):
+        for item in filtered_items:
+            item_id = item['id']
             item_emoji = get_item_emoji(item['name'])
             with st.expander(f"{item_emoji} {item['name']} - €{item['price']:.2f} x {item['quantity']} {item['unit']}"):
                 col1, col2, col3 = st.columns([2, 2, 1])
@@ -1229,10 +1483,15 @@ def show_grocery_list():
                         st.write(f"**Expires:** {item['expiry_date']}")
                 
                 with col3:
-                    if st.button("🗑️ Remove", key=f"remove_{i}"):
-                        st.session_state.grocery_items.remove(item)
-                        save_user_data(st.session_state.username, st.session_state.grocery_items, st.session_state.budget_entries)
+                    if st.button("✏️ Edit", key=f"edit_{item_id}"):
+                        st.session_state.editing_item_id = item_id
+                        st.rerun()
+                    if st.button("🗑️ Remove", key=f"remove_{item_id}"):
+                        get_user_data().remove_item(item_id)
                         st.rerun()
+                
+                if st.session_state.get('editing_item_id') == item_id:
+                    edit_grocery_item(item)
         
         # Summary
         total_cost = sum(item['price'] * item['quantity'] for item in filtered_items)
@@ -1241,6 +1500,125 @@ def show_grocery_list():
     else:
         st.warning("No items match your search criteria.")
 
+def bulk_edit_items(filtered_items):
+    """Select several items and delete or change them as one batched write"""
+    select_all = st.checkbox(
+        f"Select all {len(filtered_items)} items matching the current filter",
+        key="bulk_select_all"
+    )
+    
+    bulk_df = pd.DataFrame(
+        [
+            {
+                'Select': select_all,
+                'Item': f"{get_item_emoji(item['name'])} {item['name']}",
+                'Category': item['category'],
+                'Price': item['price'],
+                'Quantity': item['quantity'],
+                'Unit': item['unit'],
+                'Date Added': item['date_added']
+            }
+            for item in filtered_items
+        ],
+        index=[item['id'] for item in filtered_items]
+    )
+    
+    # Re-key the editor when "select all" flips so the new default applies
+    edited_df = st.data_editor(
+        bulk_df,
+        key=f"bulk_editor_{select_all}",
+        hide_index=True,
+        disabled=[column for column in bulk_df.columns if column != 'Select'],
+        use_container_width=True
+    )
+    selected_ids = edited_df.index[edited_df['Select']].tolist()
+    st.write(f"**{len(selected_ids)} of {len(filtered_items)} items selected**")
+    
+    with st.form("bulk_action_form"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            action = st.selectbox("Action", ["🗑️ Delete", "📂 Change category", "📏 Change unit"])
+        with col2:
+            new_category = st.selectbox("New category", get_category_suggestions())
+        with col3:
+            new_unit = st.selectbox("New unit", get_unit_options())
+        apply_clicked = st.form_submit_button("Apply to selected", type="primary")
+    
+    if apply_clicked:
+        if not selected_ids:
+            st.warning("Select at least one item first.")
+            return
+        
+        # One change (one autosave mark) and one rerun for the whole batch
+        user_data = get_user_data()
+        if action == "🗑️ Delete":
+            user_data.remove_items(selected_ids)
+        elif action == "📂 Change category":
+            user_data.update_items(selected_ids, {'category': new_category})
+        else:
+            user_data.update_items(selected_ids, {'unit': new_unit})
+        st.rerun()
+
+def edit_grocery_item(item):
+    """Display an in-place edit form for an existing item"""
+    item_id = item['id']
+    categories = get_category_suggestions()
+    units = get_unit_options()
+    # Keep legacy values selectable so saving doesn't silently change them
+    if item['category'] not in categories:
+        categories = [item['category']] + categories
+    if item['unit'] not in units:
+        units = [item['unit']] + units
+    # Free-text expiry dates ("next week") get no default date and are kept unless one is picked
+    try:
+        current_expiry = datetime.strptime(item['expiry_date'], "%Y-%m-%d").date() if item['expiry_date'] else None
+        unparsed_expiry = None
+    except (TypeError, ValueError):
+        current_expiry = None
+        unparsed_expiry = item['expiry_date']
+    
+    with st.form(f"edit_item_form_{item_id}"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            name = st.text_input("Item Name*", value=item['name'])
+            category = st.selectbox("Category*", categories, index=categories.index(item['category']))
+            price = st.number_input("Price (€)*", min_value=0.01, step=0.01, format="%.2f", value=float(item['price']))
+            quantity = st.number_input("Quantity*", min_value=1, step=1, value=int(item['quantity']))
+        
+        with col2:
+            unit = st.selectbox("Unit", units, index=units.index(item['unit']))
+            brand = st.text_input("Brand (optional)", value=item['brand'] or "")
+            expiry_date = st.date_input("Expiry Date (optional)", value=current_expiry)
+            if unparsed_expiry:
+                st.caption(f"Stored expiry '{unparsed_expiry}' is not a date; pick one to replace it.")
+        
+        save_col, cancel_col = st.columns(2)
+        with save_col:
+            save_clicked = st.form_submit_button("💾 Save Changes", type="primary")
+        with cancel_col:
+            cancel_clicked = st.form_submit_button("❌ Cancel")
+    
+    if save_clicked:
+        if name:
+            get_user_data().update_item(item_id, {
+                'name': name,
+                'category': category,
+                'price': price,
+                'quantity': quantity,
+                'unit': unit,
+                'expiry_date': expiry_date.strftime("%Y-%m-%d") if expiry_date else unparsed_expiry,
+                'brand': brand if brand else None
+            })
+            st.session_state.editing_item_id = None
+            st.rerun()
+        else:
+            st.error("Please fill in all required fields marked with *")
+    
+    if cancel_clicked:
+        st.session_state.editing_item_id = None
+        st.rerun()
+
 def budget_manager():
     st.header("💰 Budget Manager")
     
@@ -1260,29 +1638,22 @@ def budget_manager():
             month = st.text_input("Month (YYYY-MM)", value=current_month)
         
         if st.form_submit_button("Set Budget"):
-            # Check if budget already exists for this category and month
-            existing_budget = None
-            for i, budget in enumerate(st.session_state.budget_entries):
-                if budget['category'] == budget_category and budget['month'] == month:
-                    existing_budget = i
-                    break
-            
-            new_budget = {
-                'category': budget_category,
-                'allocated_amount': allocated_amount,
-                'spent_amount': 0,
-                'month': month
-            }
-            
-            if existing_budget is not None:
-                st.session_state.budget_entries[existing_budget] = new_budget
-                st.success(f"Updated budget for {budget_category}")
+            month = normalize_month(month.strip())
+            if month is None:
+                st.error("Please enter the month as YYYY-MM, e.g. 2025-07")
             else:
-                st.session_state.budget_entries.append(new_budget)
-                st.success(f"Added budget for {budget_category}")
-            
-            save_user_data(st.session_state.username, st.session_state.grocery_items, st.session_state.budget_entries)
-            st.rerun()
+                # Check if budget already exists for this category and month
+                existing_budget = any(
+                    budget['category'] == budget_category and budget['month'] == month
+                    for budget in get_user_data().budget_entries
+                )
+
+                get_user_data().set_budget(budget_category, allocated_amount, month)
+                if existing_budget:
+                    st.success(f"Updated budget for {budget_category}")
+                else:
+                    st.success(f"Added budget for {budget_category}")
+                st.rerun()
     
     # Current Month Budget Overview
     st.subheader(f"Budget Overview - {current_month}")
@@ -1336,16 +1707,132 @@ def budget_manager():
     else:
         st.info("No budgets set for this month. Add some budget categories above!")
 
+def get_planner_starting_list(limit=15):
+    """Candidate rows for the planner: the user's most frequently bought items"""
+    counts = {}
+    latest = {}
+    for item in get_user_data().grocery_items:
+        key = item['name'].strip().lower()
+        counts[key] = counts.get(key, 0) + 1
+        if key not in latest or item['date_added'] >= latest[key]['date_added']:
+            latest[key] = item
+    usual = sorted(counts, key=counts.get, reverse=True)[:limit]
+    return pd.DataFrame([
+        {
+            'Item': latest[key]['name'],
+            'Category': latest[key]['category'],
+            'Price (€)': float(latest[key]['price']),
+            'Quantity': 1,
+            'Priority': PRIORITY_LEVELS[3]
+        }
+        for key in usual
+    ], columns=['Item', 'Category', 'Price (€)', 'Quantity', 'Priority'])
+
+def show_shopping_planner():
+    st.header("🧮 Shopping Planner")
+    st.write("List what you'd like to buy and how important each item is. "
+             "The planner picks the best combination that fits each category's remaining budget this month.")
+    
+    if 'planner_candidates' not in st.session_state:
+        st.session_state.planner_candidates = get_planner_starting_list()
+    
+    categories = get_category_suggestions()
+    known_categories = [c for c in st.session_state.planner_candidates['Category'].dropna().unique() if c not in categories]
+    priority_labels = list(PRIORITY_LEVELS.values())
+    edited = st.data_editor(
+        st.session_state.planner_candidates,
+        key="planner_editor",
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Item': st.column_config.TextColumn(required=True),
+            'Category': st.column_config.SelectboxColumn(options=known_categories + categories, required=True),
+            'Price (€)': st.column_config.NumberColumn(min_value=0.01, step=0.01, format="€%.2f", required=True),
+            'Quantity': st.column_config.NumberColumn("Max Quantity", min_value=1, step=1, required=True),
+            'Priority': st.column_config.SelectboxColumn(options=priority_labels, required=True),
+        }
+    )
+    
+    priority_by_label = {label: level for level, label in PRIORITY_LEVELS.items()}
+    candidates = [
+        {
+            'name': row['Item'],
+            'category': row['Category'],
+            'price': float(row['Price (€)']),
+            'quantity': int(row['Quantity']),
+            'priority': priority_by_label.get(row['Priority'], 3)
+        }
+        for row in edited.to_dict('records')
+        if row['Item'] and row['Category'] and pd.notna(row['Price (€)']) and pd.notna(row['Quantity'])
+        and row['Price (€)'] > 0 and row['Quantity'] >= 1
+    ]
+    if not candidates:
+        st.info("Add some items to plan your shopping trip.")
+        return
+    
+    remaining = {budget['category']: budget['remaining'] for budget in get_budget_vs_actual()}
+    plan = plan_shopping_list(candidates, remaining)
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Planned Spend", f"€{plan['total']:.2f}")
+    col2.metric("Items in Plan", f"{len(plan['selected'])} of {len(candidates)}")
+    col3.metric("Left Out", len(plan['skipped']))
+    
+    if plan['selected']:
+        st.subheader("🛒 Your Plan")
+        plan_df = pd.DataFrame([
+            {
+                'Item': f"{get_item_emoji(item['name'])} {item['name']}",
+                'Category': item['category'],
+                'Quantity': item['quantity'],
+                'Priority': PRIORITY_LEVELS[item['priority']],
+                'Total': f"€{item['total']:.2f}"
+            }
+            for item in sorted(plan['selected'], key=lambda x: (x['category'], -x['priority']))
+        ])
+        st.dataframe(plan_df, use_container_width=True, hide_index=True)
+    
+    st.subheader("💰 Budget Fit")
+    fit_df = pd.DataFrame([
+        {
+            'Category': category,
+            'Remaining Budget': f"€{summary['budget']:.2f}" if summary['budget'] is not None else "No budget set",
+            'Planned': f"€{summary['planned']:.2f}",
+            'Left After Trip': f"€{summary['left']:.2f}" if summary['left'] is not None else "—"
+        }
+        for category, summary in plan['categories'].items()
+    ])
+    st.dataframe(fit_df, use_container_width=True, hide_index=True)
+    
+    if plan['skipped']:
+        st.warning("⚠️ These don't fit the remaining budget:")
+        for item in plan['skipped']:
+            st.write(f"• {get_item_emoji(item['name'])} {item['name']} × {item['quantity']} ({PRIORITY_LEVELS[item['priority']]})")
+    
+    methods = sorted({summary['method'] for summary in plan['categories'].values()})
+    st.caption(f"Planned in {plan['elapsed_ms']:.1f} ms ({', '.join(methods)})")
+
 def show_analytics():
     st.header("📈 Analytics")
     
-    if not st.session_state.grocery_items:
+    index = get_range_index()
+    if index.bounds() is None:
         st.info("Add some grocery items to see analytics!")
         return
     
+    date_range = select_date_range(index, key="analytics_date_range")
+    if date_range is None:
+        return
+    start_date, end_date = date_range
+    category_spending = index.category_totals(start_date, end_date)
+    st.caption(
+        f"€{index.total(start_date, end_date):,.2f} spent from {start_date} to {end_date} · "
+        f"range answered in {index.last_query_us:.0f} µs"
+    )
+    
     # Spending by Category
     st.subheader("Spending by Category")
-    category_spending = get_spending_by_category()
     
     if category_spending:
         fig_pie = px.pie(
@@ -1354,34 +1841,22 @@ def show_analytics():
             title="Spending Distribution by Category"
         )
         st.plotly_chart(fig_pie, use_container_width=True)
+    else:
+        st.info("No spending in the selected date range.")
     
     # Spending Over Time
     st.subheader("Spending Trends")
     
-    # Create daily spending data
-    daily_spending = {}
-    for item in st.session_state.grocery_items:
-        date = item['date_added']
-        amount = item['price'] * item['quantity']
-        daily_spending[date] = daily_spending.get(date, 0) + amount
-    
-    if daily_spending:
-        dates = list(daily_spending.keys())
-        amounts = list(daily_spending.values())
-        
-        fig_line = px.line(
-            x=dates,
-            y=amounts,
-            title="Daily Spending Trend",
-            labels={'x': 'Date', 'y': 'Amount Spent (€)'}
-        )
-        st.plotly_chart(fig_line, use_container_width=True)
+    # Daily spending comes from the index, which includes the archive's daily totals
+    dates, amounts = index.daily_totals(start_date, end_date)
+    if len(dates):
+        show_spending_trend(dates, amounts)
     
     # Top Expensive Items
     st.subheader("Most Expensive Items")
     
     expensive_items = sorted(
-        st.session_state.grocery_items,
+        get_items_in_range(start_date, end_date),
         key=lambda x: x['price'] * x['quantity'],
         reverse=True
     )[:10]
@@ -1403,10 +1878,7 @@ def show_analytics():
     # Shopping Frequency by Category
     st.subheader("Shopping Frequency by Category")
     
-    category_frequency = {}
-    for item in st.session_state.grocery_items:
-        category = item['category']
-        category_frequency[category] = category_frequency.get(category, 0) + 1
+    category_frequency = index.category_counts(start_date, end_date)
     
     if category_frequency:
         fig_bar = px.bar(
@@ -1417,10 +1889,141 @@ def show_analytics():
         )
         st.plotly_chart(fig_bar, use_container_width=True)
 
+    # Archived months drill-down
+    archive_index = get_archive_index()
+    if archive_index:
+        st.subheader("🗄️ Archived Months")
+
+        archive_df = pd.DataFrame([
+            {
+                'Month': month,
+                'Items': summary['items'],
+                'Total Spent': f"€{summary['total']:.2f}",
+                'Top Category': max(summary['categories'], key=lambda c: summary['categories'][c]['total'])
+            }
+            for month, summary in sorted(archive_index.items(), reverse=True)
+        ])
+        st.dataframe(archive_df, use_container_width=True, hide_index=True)
+
+        drill_month = st.selectbox("Show items for archived month", ["—"] + sorted(archive_index, reverse=True))
+        if drill_month != "—":
+            # Only now is the month's segment decompressed
+            archived_items = load_archived_items(st.session_state.username, drill_month)
+            st.dataframe(pd.DataFrame([
+                {
+                    'Item': f"{get_item_emoji(item['name'])} {item['name']}",
+                    'Category': f"{get_category_emoji(item['category'])} {item['category']}",
+                    'Unit Price': f"€{item['price']:.2f}",
+                    'Quantity': f"{item['quantity']} {item['unit']}",
+                    'Total Cost': f"€{item['price'] * item['quantity']:.2f}",
+                    'Date': item['date_added']
+                }
+                for item in sorted(archived_items, key=lambda x: x['date_added'])
+            ]), use_container_width=True, hide_index=True)
+
+def show_spending_trend(dates, amounts):
+    """Daily spending line, downsampled on the server before it is sent to the browser"""
+    first, last = dates[0].item(), dates[-1].item()
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        if first < last:
+            # Zooming re-samples the selected range from the full-resolution series
+            zoom_start, zoom_end = st.slider(
+                "Date range", min_value=first, max_value=last, value=(first, last),
+                format="YYYY-MM-DD", key=f"trend_range_{first}_{last}"
+            )
+        else:
+            zoom_start, zoom_end = first, last
+    with col2:
+        method = st.selectbox("Downsampling", ["LTTB", "Min/max"], key="trend_downsampling")
+    
+    start = time.perf_counter()
+    in_range = (dates >= np.datetime64(zoom_start)) & (dates <= np.datetime64(zoom_end))
+    range_dates = dates[in_range]
+    range_amounts = amounts[in_range]
+    keep = downsample(range_dates.astype(np.int64), range_amounts, method='minmax' if method == "Min/max" else 'lttb')
+    
+    use_webgl = len(keep) > WEBGL_THRESHOLD
+    trace = go.Scattergl if use_webgl else go.Scatter
+    fig_line = go.Figure(trace(x=range_dates[keep], y=range_amounts[keep], mode='lines', name='Daily spending'))
+    fig_line.update_layout(title="Daily Spending Trend", xaxis_title='Date', yaxis_title='Amount Spent (€)')
+    payload_kb = len(fig_line.to_json()) / 1024
+    prepare_ms = (time.perf_counter() - start) * 1000
+    
+    st.plotly_chart(fig_line, use_container_width=True)
+    st.caption(
+        f"{len(keep):,} of {len(range_dates):,} days plotted · {'WebGL' if use_webgl else 'SVG'} · "
+        f"{payload_kb:.1f} KB chart payload · prepared in {prepare_ms:.1f} ms"
+    )
+
+def show_monthly_report():
+    st.header("🗓️ Monthly Report")
+    
+    pivot = get_category_pivot()
+    if not pivot.categories:
+        st.info("Add some grocery items or budgets to see the monthly report!")
+        return
+    
+    st.caption(
+        f"{len(pivot.categories)} categories × {len(pivot.months)} months · "
+        f"built in {pivot.build_ms:.1f} ms at data revision {get_user_data().revision}"
+    )
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        if len(pivot.months) > 1:
+            first_month, last_month = st.select_slider(
+                "Months", options=pivot.months,
+                value=(pivot.months[max(0, len(pivot.months) - 12)], pivot.months[-1]),
+                key=f"report_months_{pivot.months[0]}_{pivot.months[-1]}"
+            )
+        else:
+            first_month = last_month = pivot.months[0]
+    with col2:
+        measure = st.selectbox("Show", ["Spent", "Budget", "Variance"], key="report_measure")
+    
+    columns = slice(pivot.months.index(first_month), pivot.months.index(last_month) + 1)
+    months = pivot.months[columns]
+    matrix = pivot.measure(measure.lower())[:, columns]
+    
+    heatmap_tab, table_tab = st.tabs(["🔥 Heatmap", "📋 Table"])
+    with heatmap_tab:
+        labels = {'x': 'Month', 'y': 'Category', 'color': f"{measure} (€)"}
+        if measure == "Variance":
+            # Green is under budget, red is over; months without a budget stay blank
+            limit = np.nanmax(np.abs(matrix)) if not np.all(np.isnan(matrix)) else 1
+            fig_heatmap = px.imshow(
+                matrix, x=months, y=pivot.categories, labels=labels, aspect='auto',
+                color_continuous_scale='RdYlGn', zmin=-limit, zmax=limit
+            )
+        else:
+            fig_heatmap = px.imshow(
+                matrix, x=months, y=pivot.categories, labels=labels, aspect='auto',
+                color_continuous_scale='Blues'
+            )
+        fig_heatmap.update_layout(title=f"{measure} per Category and Month")
+        st.plotly_chart(fig_heatmap, use_container_width=True)
+    
+    with table_tab:
+        table_df = pd.DataFrame(matrix, index=pivot.categories, columns=months)
+        if measure != "Budget":
+            table_df['Total'] = np.nansum(matrix, axis=1)
+        st.dataframe(table_df.round(2), use_container_width=True)
+        if measure == "Variance":
+            st.caption("Budget minus spending; negative means over budget. Blank months have no budget.")
+    
+    st.download_button(
+        "⬇️ Download CSV",
+        data=pivot.to_csv(),
+        file_name=f"{st.session_state.username}_monthly_report.csv",
+        mime="text/csv",
+        help="All categories and months, with spent, budget and variance columns"
+    )
+
 def show_recommendations():
     st.header("🎯 Smart Recommendations")
     
-    if not st.session_state.grocery_items:
+    if not get_user_data().grocery_items:
         st.info("Add some grocery items to get personalized recommendations!")
         return
     
@@ -1438,7 +2041,12 @@ def show_recommendations():
     # Shopping pattern recommendations
     st.subheader("🛍️ Shopping Pattern Insights")
     
-    category_spending = get_spending_by_category()
+    index = get_range_index()
+    date_range = select_date_range(index, key="recommendations_date_range")
+    if date_range is None:
+        return
+    start_date, end_date = date_range
+    category_spending = index.category_totals(start_date, end_date)
     total_spending = sum(category_spending.values())
     
     if total_spending > 0:
@@ -1450,16 +2058,42 @@ def show_recommendations():
         if largest_percentage > 40:
             st.warning(f"💡 Consider diversifying your spending - {largest_category} takes up a large portion of your budget.")
     
+    # Co-purchase recommendations: each day's purchases form one basket
+    st.subheader("🛒 Frequently Bought Together")
+    
+    model = get_copurchase_model()
+    rules = model.top_rules()
+    if rules:
+        rules_df = pd.DataFrame([
+            {
+                'If you buy': f"{get_item_emoji(rule['antecedent'])} {rule['antecedent']}",
+                'You usually buy': f"{get_item_emoji(rule['consequent'])} {rule['consequent']}",
+                'Baskets': rule['baskets'],
+                'Confidence': f"{rule['confidence']:.0%}",
+                'Lift': f"{rule['lift']:.2f}"
+            }
+            for rule in rules
+        ])
+        st.dataframe(rules_df, use_container_width=True, hide_index=True)
+        
+        item_names = sorted({rule['antecedent'] for rule in rules})
+        selected_name = st.selectbox("What do you usually buy with...", item_names, key="copurchase_item")
+        for rule in model.rules_for(selected_name):
+            st.write(f"• {get_item_emoji(rule['consequent'])} {rule['consequent']} "
+                     f"— together in {rule['baskets']} baskets ({rule['confidence']:.0%} of the time)")
+    else:
+        st.info(f"💡 Not enough repeat shopping trips yet ({model.basket_count} baskets) to spot items you buy together.")
+    
     # Price optimization suggestions
     st.subheader("💰 Price Optimization Tips")
     
     expensive_items = sorted(
-        st.session_state.grocery_items,
+        get_items_in_range(start_date, end_date),
         key=lambda x: x['price'],
         reverse=True
     )[:5]
     
-    st.write("**Most expensive items in your list:**")
+    st.write(f"**Most expensive items from {start_date} to {end_date}:**")
     for item in expensive_items:
         item_emoji = get_item_emoji(item['name'])
         st.write(f"• {item_emoji} {item['name']} - €{item['price']:.2f}")
@@ -1472,7 +2106,7 @@ def show_recommendations():
     expiring_soon = []
     today = datetime.now().date()
     
-    for item in st.session_state.grocery_items:
+    for item in get_user_data().grocery_items:
         if item['expiry_date']:
             expiry = datetime.strptime(item['expiry_date'], "%Y-%m-%d").date()
             days_until_expiry = (expiry - today).days
@@ -1515,5 +2149,158 @@ def show_recommendations():
     
     st.info(f"🌿 {seasonal_tips.get(current_month, 'Check what\'s in season for better prices!')}")
 
+@st.cache_data(ttl=60, show_spinner="Scanning user data...")
+def get_admin_analytics():
+    """Fleet-wide analytics, rescanned at most once a minute unless refreshed by hand"""
+    # Only users whose files changed since the last run are rescanned; spawn
+    # keeps worker processes independent of the Streamlit server's threads
+    result = run_admin_analytics(mp_context=multiprocessing.get_context('spawn'))
+    result['computed_at'] = datetime.now().strftime("%H:%M:%S")
+    return result
+
+def show_admin_analytics():
+    st.header("🛠️ Admin Analytics")
+    
+    if not is_admin(st.session_state.username):
+        st.error("This page is only available to administrators.")
+        return
+    
+    if st.button("🔄 Rescan now"):
+        get_admin_analytics.clear()
+    result = get_admin_analytics()
+    
+    st.caption(
+        f"As of {result['computed_at']}: {result['scanned_users']} users rescanned, "
+        f"{result['cached_users']} from cache in {result['elapsed_seconds']:.2f} s"
+    )
+    autosave_stats = get_autosave_queue().metrics()
+    st.caption(
+        f"💾 Autosave queue (all users): {autosave_stats['queue_depth']} pending save(s) · "
+        f"{autosave_stats['errors']} error(s) · last write {autosave_stats['last_write_ms']:.1f} ms · "
+        f"avg {autosave_stats['avg_write_ms']:.1f} ms"
+    )
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Users", result['users'])
+    col2.metric("Items", f"{result['items']:,}")
+    col3.metric("Total Spend", f"€{result['total_spend']:,.2f}")
+    col4.metric("Budget Overrun Rate", f"{result['overrun_rate']:.1%}")
+    
+    if result['category_spend']:
+        st.subheader("Spend per Category (all users)")
+        fig_categories = px.bar(
+            x=list(result['category_spend'].keys()),
+            y=list(result['category_spend'].values()),
+            labels={'x': 'Category', 'y': 'Amount Spent (€)'}
+        )
+        st.plotly_chart(fig_categories, use_container_width=True)
+    
+    if result['active_users_by_month']:
+        st.subheader("Active Users per Month")
+        fig_active = px.line(
+            x=list(result['active_users_by_month'].keys()),
+            y=list(result['active_users_by_month'].values()),
+            labels={'x': 'Month', 'y': 'Active Users'},
+            markers=True
+        )
+        st.plotly_chart(fig_active, use_container_width=True)
+    
+    if result['overrun_rate_by_month']:
+        st.subheader("Budget Overrun Rate per Month")
+        overrun_df = pd.DataFrame([
+            {'Month': month, 'Overrun Rate': f"{rate:.1%}"}
+            for month, rate in result['overrun_rate_by_month'].items()
+        ])
+        st.dataframe(overrun_df, use_container_width=True, hide_index=True)
+    
+    # Users currently held in this server process
+    st.subheader("🧠 Data Cache")
+    cache_stats = get_user_data_cache().stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric(
+        "Resident",
+        f"{cache_stats['resident_bytes'] / 1024 ** 2:,.1f} MB",
+        help=f"Cap {cache_stats['max_bytes'] / 1024 ** 2:,.0f} MB (GROCERY_CACHE_MAX_MB)"
+    )
+    col2.metric("Cached Users", len(cache_stats['users']))
+    lookups = cache_stats['hits'] + cache_stats['misses']
+    col3.metric("Hit Rate", f"{cache_stats['hits'] / lookups:.1%}" if lookups else "–")
+    col4.metric("Evictions", cache_stats['evictions'])
+    if cache_stats['users']:
+        cache_df = pd.DataFrame([
+            {
+                'User': username,
+                'Items': user['items'],
+                'Memory (KB)': round(user['bytes'] / 1024, 1),
+                'Revision': user['revision'],
+                'Idle (s)': round(user['idle_seconds']),
+                'Hits': user['hits']
+            }
+            for username, user in cache_stats['users'].items()
+        ])
+        st.dataframe(cache_df, use_container_width=True, hide_index=True)
+
+    show_memory_profile()
+
+def show_memory_profile():
+    st.subheader("🔬 Memory Profile")
+    profiler = get_memory_profiler()
+    report = profiler.report() if profiler.enabled else load_report(profiler.report_path)
+    if report is None or not report['pages']:
+        st.info(
+            "Start the app with GROCERY_MEMPROFILE=1 to trace allocations per page render. "
+            "The report can also be printed with `python memprofile.py`."
+        )
+        return
+    if not profiler.enabled:
+        st.caption(f"Tracing is off in this process; showing the last report from {profiler.report_path}")
+
+    pages_df = pd.DataFrame([
+        {
+            'Page': page,
+            'Renders': measurement['renders'],
+            'Render (ms)': round(measurement['render_ms']),
+            'Retained (KB)': round(measurement['retained_bytes'] / 1024, 1),
+            'Peak (KB)': round(measurement['peak_bytes'] / 1024, 1),
+            'Traced (MB)': round(measurement['traced_bytes'] / 1024 ** 2, 1)
+        }
+        for page, measurement in report['pages'].items()
+    ])
+    st.dataframe(pages_df, use_container_width=True, hide_index=True)
+
+    page = st.selectbox("Page", list(report['pages']), key="memprofile_page")
+    measurement = report['pages'][page]
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Retained by package**")
+        st.dataframe(pd.DataFrame([
+            {'Package': package, 'KB': round(size / 1024, 1)}
+            for package, size in measurement['packages'].items()
+        ]), use_container_width=True, hide_index=True)
+    with col2:
+        st.markdown("**Retained by source line**")
+        st.dataframe(pd.DataFrame([
+            {
+                'Line': entry['site'],
+                'KB': round(entry['bytes'] / 1024, 1),
+                'Blocks': entry['blocks'],
+                'Packages': ", ".join(entry['packages'])
+            }
+            for entry in measurement['lines']
+        ]), use_container_width=True, hide_index=True)
+
+    if report['users']:
+        st.markdown("**Item footprint per user**")
+        st.dataframe(pd.DataFrame([
+            {
+                'User': username,
+                'Items': user['items'],
+                'Bytes/Item': round(user['bytes_per_item']),
+                'Items (MB)': round(user['items_bytes'] / 1024 ** 2, 2),
+                'Revision': user['revision']
+            }
+            for username, user in report['users'].items()
+        ]), use_container_width=True, hide_index=True)
+
 if __name__ == "__main__":
     main()
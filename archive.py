@@ -0,0 +1,227 @@
+"""Cold archive of old months into compressed per-month segments.
+
+Items from months older than the archive horizon are moved out of the user's
+live `grocery_data.json` into `archive/YYYY-MM.json.gz` in their directory. Each
+segment starts with a one-line JSON header holding the month's totals per
+category and per day, followed by the items. The headers are also collected
+into a small `index.json`, so analytics can use the summaries at login without
+decompressing anything. A segment is only decompressed when a drill-down needs
+item-level detail.
+
+Run `python archive.py USERNAME` to archive a user's data and report the
+disk savings and login-time improvement.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from items import ensure_item_ids
+from storage import (
+    RevisionConflict, archive_dir_path, grocery_file_path, load_user_data, load_user_snapshot, save_user_data,
+    write_json_atomic
+)
+
+ARCHIVE_HORIZON_MONTHS = int(os.environ.get('GROCERY_ARCHIVE_HORIZON_MONTHS', '12'))
+INDEX_FILE = 'index.json'
+# Compare-and-swap attempts of the CLI before giving up on a user who is saved continuously
+MAX_SAVE_ATTEMPTS = 5
+
+
+def archive_cutoff_month(horizon_months=ARCHIVE_HORIZON_MONTHS, today=None):
+    """First month (YYYY-MM) that stays live; older months get archived"""
+    today = today or datetime.now()
+    month_number = today.year * 12 + (today.month - 1) - horizon_months
+    return f"{month_number // 12:04d}-{month_number % 12 + 1:02d}"
+
+
+def _segment_path(username, month):
+    return os.path.join(archive_dir_path(username), f'{month}.json.gz')
+
+
+def summarize_month(month, items):
+    """Build the summary header for one month of items"""
+    categories = {}
+    daily = {}
+    total = 0.0
+    for item in items:
+        amount = item['price'] * item['quantity']
+        total += amount
+        category = categories.setdefault(item['category'], {'total': 0.0, 'count': 0})
+        category['total'] += amount
+        category['count'] += 1
+        daily[item['date_added']] = daily.get(item['date_added'], 0) + amount
+    return {
+        'month': month,
+        'items': len(items),
+        'total': total,
+        'categories': categories,
+        'daily': daily,
+    }
+
+
+def archive_index_path(username):
+    """Path of a user's archive index; it is replaced whenever months are archived"""
+    return os.path.join(archive_dir_path(username), INDEX_FILE)
+
+
+def load_archive_index(username):
+    """Load the per-month summaries of a user's archive"""
+    index_path = archive_index_path(username)
+    if os.path.exists(index_path):
+        with open(index_path, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+def read_segment_header(username, month):
+    """Read only the summary header of a segment"""
+    with gzip.open(_segment_path(username, month), 'rt') as f:
+        return json.loads(f.readline())
+
+
+@lru_cache(maxsize=32)
+def _read_segment_items(path, mtime):
+    with gzip.open(path, 'rt') as f:
+        f.readline()
+        return json.loads(f.readline())
+
+
+def load_archived_items(username, month):
+    """Decompress one archived month's items for drill-down"""
+    path = _segment_path(username, month)
+    if not os.path.exists(path):
+        return []
+    # Keyed by mtime so a rewritten segment is never served stale
+    return list(_read_segment_items(path, os.path.getmtime(path)))
+
+
+def _write_segment(username, month, items):
+    summary = summarize_month(month, items)
+    path = _segment_path(username, month)
+    tmp_path = f'{path}.tmp'
+    with gzip.open(tmp_path, 'wt', compresslevel=9) as f:
+        f.write(json.dumps(summary))
+        f.write('\n')
+        f.write(json.dumps(items))
+    os.replace(tmp_path, path)
+    summary['compressed_bytes'] = os.path.getsize(path)
+    summary['raw_bytes'] = len(json.dumps(items).encode())
+    return summary
+
+
+def archive_old_items(username, items, horizon_months=ARCHIVE_HORIZON_MONTHS, today=None):
+    """Move items older than the horizon into compressed segments.
+
+    Items must already carry IDs (see `items.ensure_item_ids`). Returns the
+    live items to keep and the archive statistics. The caller is
+    responsible for saving the live items afterwards; until it does, archived
+    items also remain in the live file and are merged by ID on the next run.
+    """
+    cutoff = archive_cutoff_month(horizon_months, today)
+    live_items = []
+    old_by_month = {}
+    for item in items:
+        month = item['date_added'][:7]
+        if month < cutoff:
+            old_by_month.setdefault(month, []).append(item)
+        else:
+            live_items.append(item)
+
+    stats = {'months': 0, 'items': 0, 'raw_bytes': 0, 'compressed_bytes': 0}
+    if not old_by_month:
+        return items, stats
+
+    os.makedirs(archive_dir_path(username), exist_ok=True)
+    index = load_archive_index(username)
+    for month, month_items in sorted(old_by_month.items()):
+        if month in index:
+            merged = {item['id']: item for item in load_archived_items(username, month)}
+            merged.update((item['id'], item) for item in month_items)
+            month_items = list(merged.values())
+        summary = _write_segment(username, month, month_items)
+        index[month] = summary
+        stats['months'] += 1
+        stats['items'] += len(old_by_month[month])
+
+    write_json_atomic(archive_index_path(username), index)
+    stats['raw_bytes'] = sum(summary['raw_bytes'] for summary in index.values())
+    stats['compressed_bytes'] = sum(summary['compressed_bytes'] for summary in index.values())
+    return live_items, stats
+
+
+def archived_category_totals(index):
+    """Total spend per category across all archived months"""
+    totals = {}
+    for summary in index.values():
+        for category, values in summary['categories'].items():
+            totals[category] = totals.get(category, 0) + values['total']
+    return totals
+
+
+def archived_category_counts(index):
+    """Number of items per category across all archived months"""
+    counts = {}
+    for summary in index.values():
+        for category, values in summary['categories'].items():
+            counts[category] = counts.get(category, 0) + values['count']
+    return counts
+
+
+def archived_daily_totals(index):
+    """Spend per day across all archived months"""
+    daily = {}
+    for summary in index.values():
+        for date, amount in summary['daily'].items():
+            daily[date] = daily.get(date, 0) + amount
+    return daily
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive a user's old months and report the savings")
+    parser.add_argument('username')
+    parser.add_argument('--horizon', type=int, default=ARCHIVE_HORIZON_MONTHS,
+                        help='months to keep live (default: %(default)s)')
+    args = parser.parse_args()
+
+    size_before = os.path.getsize(grocery_file_path(args.username)) if os.path.exists(grocery_file_path(args.username)) else 0
+    start = time.perf_counter()
+    load_user_data(args.username)
+    load_before = time.perf_counter() - start
+
+    for _ in range(MAX_SAVE_ATTEMPTS):
+        grocery_data, budget_data, revision = load_user_snapshot(args.username)
+        ensure_item_ids(grocery_data)
+        live_items, stats = archive_old_items(args.username, grocery_data, args.horizon)
+        try:
+            # Archiving again is harmless (segments merge by ID), so a concurrent save just means another pass
+            save_user_data(args.username, live_items, budget_data, expected_revision=revision)
+            break
+        except RevisionConflict:
+            continue
+    else:
+        sys.exit(f"{args.username} kept being saved by another process; try again")
+
+    size_after = os.path.getsize(grocery_file_path(args.username))
+    start = time.perf_counter()
+    load_user_data(args.username)
+    load_archive_index(args.username)
+    load_after = time.perf_counter() - start
+
+    archive_bytes = sum(
+        os.path.getsize(os.path.join(archive_dir_path(args.username), name))
+        for name in os.listdir(archive_dir_path(args.username))
+    ) if os.path.isdir(archive_dir_path(args.username)) else 0
+
+    print(f"Archived {stats['items']} items from {stats['months']} month(s), {len(live_items)} items stay live")
+    print(f"Disk: {size_before:,} bytes -> {size_after + archive_bytes:,} bytes "
+          f"(live {size_after:,} + archive {archive_bytes:,})")
+    print(f"Login load: {load_before * 1000:.1f} ms -> {load_after * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""User accounts and password checks shared by the Streamlit app and the HTTP API"""
+import hashlib
+import json
+import os
+
+from datadir import users_file_path, warn_if_unmigrated
+
+
+def hash_password(password):
+    """Simple password hashing (in production, use proper hashing like bcrypt)"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def verify_password(password, hashed_password):
+    """Verify password against hashed password"""
+    return hash_password(password) == hashed_password
+
+
+def load_users():
+    """Load user data from JSON file"""
+    users_file = users_file_path()
+    if os.path.exists(users_file):
+        with open(users_file, 'r') as f:
+            return json.load(f)
+    warn_if_unmigrated()
+    return {}
+
+
+def save_users(users):
+    """Save user data to JSON file"""
+    users_file = users_file_path()
+    os.makedirs(os.path.dirname(users_file), exist_ok=True)
+    with open(users_file, 'w') as f:
+        json.dump(users, f)
+
+
+def get_admin_users():
+    """Usernames allowed to see fleet-wide admin pages (GROCERY_ADMIN_USERS, comma-separated)"""
+    return {name.strip() for name in os.environ.get('GROCERY_ADMIN_USERS', '').split(',') if name.strip()}
+
+
+def is_admin(username):
+    """Whether a user may see fleet-wide admin pages"""
+    return username in get_admin_users()
@@ -0,0 +1,189 @@
+"""Write-behind autosave queue for per-user data.
+
+UI mutations call `mark_dirty` and return immediately. A background thread
+coalesces repeated marks for the same user and writes the latest snapshot once
+the user has been quiet for `debounce_seconds`. A user that keeps editing is
+still written at most `max_delay_seconds` after the first unsaved change, which
+bounds the data-loss window. Logout and process shutdown flush synchronously.
+
+The default writer is `sync.save_user`: users whose data is attached to a
+stored revision are saved with a compare-and-swap that merges concurrent
+saves from other processes instead of overwriting them.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from sync import save_user
+
+logger = logging.getLogger(__name__)
+
+DEBOUNCE_SECONDS = float(os.environ.get('GROCERY_AUTOSAVE_DEBOUNCE', '1.0'))
+MAX_DELAY_SECONDS = float(os.environ.get('GROCERY_AUTOSAVE_MAX_DELAY', '5.0'))
+
+
+class AutosaveQueue:
+    """Debounced, coalescing background writer for user data"""
+
+    def __init__(self, writer=save_user, debounce_seconds=DEBOUNCE_SECONDS,
+                 max_delay_seconds=MAX_DELAY_SECONDS):
+        self.writer = writer
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max(max_delay_seconds, debounce_seconds)
+
+        # username -> {'grocery', 'budget', 'first_dirty', 'last_dirty'}
+        self._pending = {}
+        self._write_locks = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+
+        self._marks = 0
+        self._writes = 0
+        self._errors = 0
+        self._total_write_seconds = 0.0
+        self._last_write_seconds = 0.0
+        self._max_write_seconds = 0.0
+        # username -> {'last_write_ms', 'last_saved', 'failures'}; failures counts errors since the last good write
+        self._user_stats = {}
+
+        self._thread = threading.Thread(target=self._run, name='autosave-writer', daemon=True)
+        self._thread.start()
+
+    def mark_dirty(self, username, grocery_data, budget_data):
+        """Record the latest data for a user and schedule a debounced write"""
+        now = time.monotonic()
+        with self._cond:
+            entry = self._pending.get(username)
+            first_dirty = entry['first_dirty'] if entry else now
+            # Copy the lists so the writer never iterates one the UI is mutating
+            self._pending[username] = {
+                'grocery': list(grocery_data),
+                'budget': list(budget_data),
+                'first_dirty': first_dirty,
+                'last_dirty': now,
+            }
+            self._marks += 1
+            self._cond.notify()
+
+    def is_pending(self, username):
+        """Whether a user has changes that are not written yet"""
+        with self._cond:
+            return username in self._pending
+
+    def flush(self, username=None):
+        """Synchronously write pending data for one user, or for everyone"""
+        with self._cond:
+            usernames = [username] if username is not None else list(self._pending)
+        for name in usernames:
+            self._write(name)
+
+    def shutdown(self):
+        """Flush everything and stop the background thread"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self.flush()
+        self._thread.join(timeout=self.max_delay_seconds + 1)
+
+    def metrics(self):
+        """Queue depth and write latency statistics"""
+        now = time.monotonic()
+        with self._cond:
+            oldest = min((entry['first_dirty'] for entry in self._pending.values()), default=None)
+            writes = self._writes
+            return {
+                'queue_depth': len(self._pending),
+                'oldest_pending_seconds': now - oldest if oldest is not None else 0.0,
+                'marks': self._marks,
+                'writes': writes,
+                'coalesced': max(self._marks - writes, 0),
+                'errors': self._errors,
+                'last_write_ms': self._last_write_seconds * 1000,
+                'avg_write_ms': (self._total_write_seconds / writes * 1000) if writes else 0.0,
+                'max_write_ms': self._max_write_seconds * 1000,
+            }
+
+    def user_status(self, username):
+        """Autosave state of one user only, for showing to that user"""
+        now = time.monotonic()
+        with self._cond:
+            entry = self._pending.get(username)
+            stats = self._user_stats.get(username, {})
+            return {
+                'pending': entry is not None,
+                'pending_seconds': now - entry['first_dirty'] if entry else 0.0,
+                'failures': stats.get('failures', 0),
+                'last_write_ms': stats.get('last_write_ms'),
+                'last_saved': stats.get('last_saved'),
+            }
+
+    def _due_time(self, entry):
+        return min(entry['last_dirty'] + self.debounce_seconds,
+                   entry['first_dirty'] + self.max_delay_seconds)
+
+    def _write_lock(self, username):
+        with self._cond:
+            lock = self._write_locks.get(username)
+            if lock is None:
+                lock = self._write_locks[username] = threading.Lock()
+            return lock
+
+    def _write(self, username):
+        # The snapshot is taken while holding the per-user lock, so writes for
+        # one user land in mark order, and a flush waits for an in-flight
+        # background write: logout returns only once the data is on disk.
+        with self._write_lock(username):
+            with self._cond:
+                entry = self._pending.pop(username, None)
+            if entry is None:
+                return
+            start = time.perf_counter()
+            try:
+                self.writer(username, entry['grocery'], entry['budget'])
+            except Exception:
+                logger.exception("Autosave failed for %s", username)
+                with self._cond:
+                    self._errors += 1
+                    stats = self._user_stats.setdefault(username, {})
+                    stats['failures'] = stats.get('failures', 0) + 1
+                    # Retry later unless a newer snapshot has already arrived
+                    retry_at = time.monotonic()
+                    self._pending.setdefault(username, dict(entry, first_dirty=retry_at, last_dirty=retry_at))
+                return
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                self._writes += 1
+                self._total_write_seconds += elapsed
+                self._last_write_seconds = elapsed
+                self._max_write_seconds = max(self._max_write_seconds, elapsed)
+                self._user_stats[username] = {'last_write_ms': elapsed * 1000, 'last_saved': time.time(), 'failures': 0}
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                due = [name for name, entry in self._pending.items() if self._due_time(entry) <= now]
+                if not due:
+                    next_due = min((self._due_time(entry) for entry in self._pending.values()), default=None)
+                    self._cond.wait(timeout=None if next_due is None else next_due - now)
+                    continue
+            for name in due:
+                self._write(name)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_autosave_queue():
+    """Process-wide autosave queue, flushed automatically at interpreter exit"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = AutosaveQueue()
+            atexit.register(_queue.shutdown)
+        return _queue
@@ -0,0 +1,147 @@
+"""Throughput benchmark for the headless HTTP API.
+
+Seeds a throwaway data directory with one or more users, starts `api.py`
+in-process on an ephemeral port and drives it with keep-alive HTTP clients
+in several threads. Prints requests/second and latency percentiles per
+endpoint mix.
+
+    python benchmarks/api_throughput.py --clients 8 --requests 2000 --items 5000
+"""
+import argparse
+import base64
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Seeded users go into a throwaway data directory, whatever GROCERY_DATA_DIR says; the repo's
+# modules read it on import
+WORK_DIR = tempfile.mkdtemp(prefix='grocery-api-bench-')
+os.environ['GROCERY_DATA_DIR'] = os.path.join(WORK_DIR, 'data')
+
+from auth import hash_password, save_users  # noqa: E402
+from storage import save_user_data  # noqa: E402
+
+CATEGORIES = ["🥬 Fruits & Vegetables", "🥛 Dairy & Eggs", "🥩 Meat & Seafood", "🍞 Bakery", "🥤 Beverages"]
+NAMES = ["Milk", "Eggs", "Bread", "Apples", "Bananas", "Coffee", "Chicken", "Cheese", "Rice", "Tomatoes"]
+
+
+def seed_users(user_count, items_per_user):
+    users = {}
+    today = date.today()
+    for n in range(user_count):
+        username = f'bench{n}'
+        users[username] = {'password': hash_password('bench'), 'email': f'{username}@example.com'}
+        items = [
+            {
+                'name': random.choice(NAMES),
+                'category': random.choice(CATEGORIES),
+                'price': round(random.uniform(0.5, 20), 2),
+                'quantity': random.randint(1, 4),
+                'unit': 'pieces',
+                'date_added': (today - timedelta(days=random.randint(0, 300))).isoformat(),
+                'expiry_date': None,
+                'brand': None
+            }
+            for _ in range(items_per_user)
+        ]
+        budgets = [
+            {'category': category, 'allocated_amount': 200.0, 'spent_amount': 0, 'month': today.strftime('%Y-%m')}
+            for category in CATEGORIES
+        ]
+        save_user_data(username, items, budgets)
+    save_users(users)
+    return list(users)
+
+
+def run_client(port, username, request_count, mix, latencies, errors):
+    auth = 'Basic ' + base64.b64encode(f'{username}:bench'.encode()).decode()
+    headers = {'Authorization': auth, 'Content-Type': 'application/json'}
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    created = []
+    for _ in range(request_count):
+        kind = random.choices(list(mix), weights=list(mix.values()))[0]
+        if kind == 'remove' and not created:
+            kind = 'list'
+        body = None
+        if kind == 'add':
+            method, path = 'POST', '/items'
+            body = json.dumps({'name': random.choice(NAMES), 'category': random.choice(CATEGORIES),
+                               'price': round(random.uniform(0.5, 20), 2), 'quantity': 1})
+        elif kind == 'remove':
+            method, path = 'DELETE', f'/items/{created.pop()}'
+        elif kind == 'list':
+            method, path = 'GET', '/items?limit=50'
+        elif kind == 'budget':
+            method, path = 'GET', '/analytics/budget-vs-actual'
+        else:
+            method, path = 'GET', '/analytics/spending-by-category'
+
+        start = time.perf_counter()
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        payload = response.read()
+        latencies.setdefault(kind, []).append(time.perf_counter() - start)
+        if response.status >= 400:
+            errors.append((response.status, payload[:200]))
+        elif kind == 'add':
+            created.append(json.loads(payload)['id'])
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=1000, help='requests per client')
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--items', type=int, default=2000, help='seeded items per user')
+    args = parser.parse_args()
+
+    os.chdir(WORK_DIR)
+    usernames = seed_users(args.users, args.items)
+
+    from api import make_server
+    server = make_server(port=0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    mix = {'add': 30, 'remove': 10, 'list': 20, 'budget': 20, 'spending': 20}
+    latencies = {}
+    errors = []
+    threads = [
+        threading.Thread(target=run_client, args=(port, usernames[n % len(usernames)], args.requests, mix, latencies, errors))
+        for n in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total} requests from {args.clients} clients in {elapsed:.2f} s "
+          f"-> {total / elapsed:,.0f} req/s ({len(errors)} errors)")
+    for kind, values in sorted(latencies.items()):
+        values.sort()
+        p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+        print(f"  {kind:<9} n={len(values):<6} p50={statistics.median(values) * 1000:6.2f} ms  p99={p99 * 1000:6.2f} ms")
+    server.shutdown()
+    server.api.shutdown()
+    autosave = server.api.autosave.metrics()
+    print(f"  autosave: {autosave['writes']} writes for {autosave['marks']} mutations "
+          f"(avg {autosave['avg_write_ms']:.1f} ms)")
+    if errors:
+        print("First error:", errors[0])
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
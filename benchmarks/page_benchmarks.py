@@ -0,0 +1,204 @@
+"""Page render benchmarks for the Streamlit app, with a regression gate.
+
+Seeds a throwaway data directory with one user per size (1k, 10k and 100k
+items by default), logs in through Streamlit's `AppTest` and times full
+script reruns with each page selected. The first run of a page (cold,
+derived views built) and the median of the following reruns (warm) are
+recorded. Runs headless and offline; no browser or server is started.
+
+Results are written as JSON. With `--baseline`, each page's fastest warm
+rerun is compared with the baseline's and the script exits with status 1
+when it is slower by more than `--tolerance` (relative) plus `--slack-ms`
+(absolute). The minimum is gated rather than the median because noise from
+other processes only ever adds time; the median is recorded for reading.
+
+    python benchmarks/page_benchmarks.py --sizes 1000 10000 --output bench.json
+    python benchmarks/page_benchmarks.py --sizes 100000 --pages show_dashboard show_analytics
+    python benchmarks/page_benchmarks.py --baseline benchmarks/page_baseline.json
+    python benchmarks/page_benchmarks.py --update-baseline benchmarks/page_baseline.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Seeded users go into a throwaway data directory, whatever GROCERY_DATA_DIR says; the repo's
+# modules (and the app under AppTest) read it on import
+WORK_DIR = tempfile.mkdtemp(prefix='grocery-page-bench-')
+os.environ['GROCERY_DATA_DIR'] = os.path.join(WORK_DIR, 'data')
+
+from auth import hash_password, save_users  # noqa: E402
+from items import ensure_item_ids  # noqa: E402
+from storage import save_user_data  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, 'app.py')
+PAGES = {
+    'show_dashboard': "📊 Dashboard",
+    'show_grocery_list': "📝 Grocery List",
+    'budget_manager': "💰 Budget Manager",
+    'show_analytics': "📈 Analytics",
+    'show_recommendations': "🎯 Smart Recommendations",
+}
+CATEGORIES = ["🥬 Fruits & Vegetables", "🥛 Dairy & Eggs", "🥩 Meat & Seafood", "🍞 Bakery",
+              "🥫 Pantry Staples", "🧊 Frozen Foods", "🥤 Beverages", "🍿 Snacks"]
+NAMES = ["Milk", "Eggs", "Bread", "Apples", "Bananas", "Coffee", "Chicken", "Cheese", "Rice", "Tomatoes",
+         "Yogurt", "Butter", "Pasta", "Orange Juice", "Carrots", "Onions", "Salmon", "Cereal", "Tea", "Chips"]
+DEFAULT_TOLERANCE = float(os.environ.get('GROCERY_BENCH_TOLERANCE', '0.25'))
+
+
+def seed_user(username, item_count, seed=0):
+    """Write a user with `item_count` items over the last ~11 months and this month's budgets"""
+    rng = random.Random(seed)
+    today = date.today()
+    items = [
+        {
+            'name': rng.choice(NAMES),
+            'category': rng.choice(CATEGORIES),
+            'price': round(rng.uniform(0.5, 20), 2),
+            'quantity': rng.randint(1, 4),
+            'unit': 'pieces',
+            'date_added': (today - timedelta(days=rng.randint(0, 330))).isoformat(),
+            'expiry_date': None,
+            'brand': None
+        }
+        for _ in range(item_count)
+    ]
+    ensure_item_ids(items)
+    budgets = [
+        {'category': category, 'allocated_amount': 50.0 * item_count / 100, 'spent_amount': 0,
+         'month': today.strftime('%Y-%m')}
+        for category in CATEGORIES
+    ]
+    save_user_data(username, items, budgets)
+
+
+def benchmark_size(item_count, pages, repeat, timeout):
+    """Cold and warm rerun times per page for one user with `item_count` items"""
+    from streamlit.testing.v1 import AppTest
+
+    username = f'bench{item_count}'
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    app.run()
+    app.text_input[0].input(username)
+    app.text_input[1].input('bench')
+    app.button[0].click().run()
+    if app.exception or not app.session_state.logged_in:
+        raise RuntimeError(f"Login failed for {username}: {app.exception}")
+
+    results = {}
+    for function in pages:
+        label = PAGES[function]
+        start = time.perf_counter()
+        app.sidebar.selectbox[0].select(label).run()
+        cold_ms = (time.perf_counter() - start) * 1000
+        if app.exception:
+            raise RuntimeError(f"{function} raised: {app.exception}")
+        warm = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            app.run()
+            warm.append((time.perf_counter() - start) * 1000)
+        results[function] = {
+            'cold_ms': round(cold_ms, 1),
+            'median_ms': round(statistics.median(warm), 1),
+            'min_ms': round(min(warm), 1),
+        }
+        print(f"  {function:<22} cold {cold_ms:8.1f} ms   warm median {results[function]['median_ms']:8.1f} ms"
+              f"   min {results[function]['min_ms']:8.1f} ms")
+    return results
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    """Regressions of the fastest warm reruns against a baseline, as readable lines"""
+    regressions = []
+    for size, pages in results['sizes'].items():
+        for function, timing in pages.items():
+            reference = baseline.get('sizes', {}).get(size, {}).get(function)
+            if reference is None:
+                continue
+            limit = reference['min_ms'] * (1 + tolerance) + slack_ms
+            if timing['min_ms'] > limit:
+                regressions.append(
+                    f"{function} @ {int(size):,} items: {timing['min_ms']:.1f} ms "
+                    f"> {limit:.1f} ms (baseline {reference['min_ms']:.1f} ms)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='items per seeded user')
+    parser.add_argument('--pages', nargs='+', choices=list(PAGES), default=list(PAGES), help='page functions to time')
+    parser.add_argument('--repeat', type=int, default=5, help='warm reruns per page')
+    parser.add_argument('--timeout', type=float, default=600, help='AppTest timeout per run, in seconds')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='fail if a page is slower than in this JSON file')
+    parser.add_argument('--update-baseline', metavar='PATH',
+                        help='merge the results into this baseline, replacing only the pages that were timed')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed relative slowdown (default GROCERY_BENCH_TOLERANCE or 0.25)')
+    parser.add_argument('--slack-ms', type=float, default=20.0, help='allowed absolute slowdown per page')
+    args = parser.parse_args()
+
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    # Paths are resolved before moving into the throwaway data directory
+    args.output = args.output and os.path.abspath(args.output)
+    args.update_baseline = args.update_baseline and os.path.abspath(args.update_baseline)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    os.chdir(WORK_DIR)
+    save_users({f'bench{size}': {'password': hash_password('bench'), 'email': 'bench@example.com'}
+                for size in args.sizes})
+    results = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'repeat': args.repeat,
+        'sizes': {},
+    }
+    for size in args.sizes:
+        seed_user(f'bench{size}', size)
+        print(f"{size:,} items")
+        results['sizes'][str(size)] = benchmark_size(size, args.pages, args.repeat, args.timeout)
+
+    if args.output:
+        write_json(args.output, results)
+    if args.update_baseline:
+        merged = dict(results, sizes={})
+        if os.path.exists(args.update_baseline):
+            with open(args.update_baseline, encoding='utf-8') as f:
+                merged['sizes'] = json.load(f).get('sizes', {})
+        for size, pages in results['sizes'].items():
+            merged['sizes'].setdefault(size, {}).update(pages)
+        write_json(args.update_baseline, merged)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance, args.slack_ms)
+        if regressions:
+            print(f"\n{len(regressions)} page(s) regressed beyond {args.tolerance:.0%} + {args.slack_ms:.0f} ms:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo page regressed beyond {args.tolerance:.0%} + {args.slack_ms:.0f} ms of the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Date-range spending queries: full scan vs. the prefix-sum index.
+
+Generates a synthetic item history, then answers the same random date
+ranges with a scan over all items (what the analytics page used to do) and
+with `rangeindex.SpendRangeIndex`. Prints build time and per-query latency.
+
+    python benchmarks/range_queries.py --items 200000 --queries 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rangeindex import SpendRangeIndex  # noqa: E402
+
+CATEGORIES = ["🥬 Fruits & Vegetables", "🥛 Dairy & Eggs", "🥩 Meat & Seafood", "🍞 Bakery",
+              "🥫 Pantry Staples", "🧊 Frozen Foods", "🥤 Beverages", "🍿 Snacks"]
+
+
+def make_items(count, days, seed=0):
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=days)
+    return [
+        {
+            'category': rng.choice(CATEGORIES),
+            'price': round(rng.uniform(0.5, 20), 2),
+            'quantity': rng.randint(1, 4),
+            'date_added': (start + timedelta(days=rng.randrange(days))).isoformat(),
+        }
+        for _ in range(count)
+    ]
+
+
+def scan_category_totals(items, start, end):
+    totals = {}
+    for item in items:
+        if start <= item['date_added'] <= end:
+            totals[item['category']] = totals.get(item['category'], 0) + item['price'] * item['quantity']
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=200000, help='items in the history')
+    parser.add_argument('--days', type=int, default=5 * 365, help='days the history spans')
+    parser.add_argument('--queries', type=int, default=200, help='random date ranges to answer')
+    args = parser.parse_args()
+
+    items = make_items(args.items, args.days)
+    rng = random.Random(1)
+    first = date.today() - timedelta(days=args.days)
+    ranges = []
+    for _ in range(args.queries):
+        a, b = sorted(rng.sample(range(args.days), 2))
+        ranges.append((first + timedelta(days=a), first + timedelta(days=b)))
+
+    start = time.perf_counter()
+    index = SpendRangeIndex.from_items(items)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for range_start, range_end in ranges:
+        index.category_totals(range_start, range_end)
+    index_seconds = (time.perf_counter() - start) / len(ranges)
+
+    scan_ranges = ranges[:max(1, len(ranges) // 20)]
+    start = time.perf_counter()
+    for range_start, range_end in scan_ranges:
+        scan_category_totals(items, range_start.isoformat(), range_end.isoformat())
+    scan_seconds = (time.perf_counter() - start) / len(scan_ranges)
+
+    print(f"{len(items):,} items over {args.days:,} days, {len(index.categories)} categories")
+    print(f"Index build: {build_seconds * 1000:.1f} ms")
+    print(f"Full scan:   {scan_seconds * 1000:.2f} ms per range")
+    print(f"Prefix sums: {index_seconds * 1e6:.1f} µs per range ({scan_seconds / index_seconds:,.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
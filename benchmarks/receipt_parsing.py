@@ -0,0 +1,56 @@
+"""Throughput benchmark for the receipt parser.
+
+Repeats the receipts in `sample_receipts/` until the requested number of
+lines is reached and streams them through `receipts.ReceiptParser`, then
+categorizes the parsed items. Prints lines/second for each stage.
+
+    python benchmarks/receipt_parsing.py --lines 100000
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from classifier import get_category_classifier  # noqa: E402
+from receipts import ReceiptParser, categorize  # noqa: E402
+
+
+def load_corpus():
+    lines = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'sample_receipts', '*.txt'))):
+        with open(path, encoding='utf-8') as f:
+            lines.extend(f.read().splitlines())
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=100000, help='receipt lines to parse')
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    lines = (corpus * (args.lines // len(corpus) + 1))[:args.lines]
+
+    receipt = ReceiptParser()
+    start = time.perf_counter()
+    items = list(receipt.parse(lines))
+    parse_seconds = time.perf_counter() - start
+
+    # Trained on stored items in the background; timed once that is done
+    get_category_classifier().trained.wait()
+    start = time.perf_counter()
+    categorize(items)
+    categorize_seconds = time.perf_counter() - start
+
+    print(f"Parsed {len(lines):,} lines -> {len(items):,} items in {parse_seconds * 1000:.1f} ms "
+          f"({len(lines) / parse_seconds:,.0f} lines/s); {receipt.skipped_count:,} non-item lines skipped")
+    print(f"Categorized {len(items):,} items in {categorize_seconds * 1000:.1f} ms "
+          f"({len(items) / categorize_seconds:,.0f} items/s, trained classifier)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Budget threshold alerts evaluated when data is written.
+
+Spending is kept as running totals per (month, category). Each change event
+updates only the totals it touches and compares them with that month's
+budget, so crossing a threshold (50/80/100% by default) is detected at the
+moment the item is added or the budget is set, not when a page happens to
+rescan everything. Crossings are recorded as numbered alerts; each session
+shows the ones newer than the last it has seen.
+
+Falling back below a threshold (an item removed, a budget raised) lowers
+the recorded level silently, so crossing it again raises a new alert.
+"""
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+from events import BUDGET_SET, ITEM_ADDED, ITEM_REMOVED, ITEM_UPDATED
+
+ALERT_THRESHOLDS = tuple(sorted(
+    float(value) / 100 for value in os.environ.get('GROCERY_BUDGET_ALERT_THRESHOLDS', '50,80,100').split(',')
+))
+MAX_ALERTS_KEPT = 50
+
+
+class BudgetAlerts:
+    """Running spend per month and category, checked against budgets on every change"""
+
+    def __init__(self, thresholds=ALERT_THRESHOLDS):
+        self.thresholds = thresholds
+        self.spent = {}  # (month, category) -> amount
+        self.budgets = {}  # (month, category) -> allocated amount
+        self.levels = {}  # (month, category) -> highest threshold reached
+        self.alerts = deque(maxlen=MAX_ALERTS_KEPT)
+        self.sequence = 0
+
+    @classmethod
+    def from_user_data(cls, user_data):
+        return cls.from_data(user_data.grocery_items, user_data.budget_entries, user_data.archive_index)
+
+    @classmethod
+    def from_data(cls, items, budget_entries, archive_index=None):
+        """Build the running totals; thresholds already crossed count as known, not as new alerts"""
+        model = cls()
+        for item in items:
+            key = (item['date_added'][:7], item['category'])
+            model.spent[key] = model.spent.get(key, 0) + item['price'] * item['quantity']
+        for month, summary in (archive_index or {}).items():
+            for category, values in summary['categories'].items():
+                model.spent[(month, category)] = model.spent.get((month, category), 0) + values['total']
+        for entry in budget_entries:
+            model.budgets[(entry['month'], entry['category'])] = entry['allocated_amount']
+        for key in model.budgets:
+            model.levels[key] = model._level(key)
+        return model
+
+    def apply(self, event):
+        """Update the totals touched by one change event and record any threshold crossings"""
+        if event.kind == ITEM_ADDED:
+            self._spend(event.item, 1, event.revision)
+        elif event.kind == ITEM_REMOVED:
+            self._spend(event.item, -1, event.revision)
+        elif event.kind == ITEM_UPDATED:
+            self._spend(event.previous, -1, event.revision)
+            self._spend(event.item, 1, event.revision)
+        elif event.kind == BUDGET_SET:
+            key = (event.budget['month'], event.budget['category'])
+            self.budgets[key] = event.budget['allocated_amount']
+            self._check(key, event.revision)
+
+    def status(self, month=None):
+        """Budget against actual spending for each budgeted category of a month"""
+        month = month or datetime.now().strftime("%Y-%m")
+        return [
+            {
+                'category': category,
+                'budgeted': allocated,
+                'actual': self.spent.get((budget_month, category), 0),
+                'remaining': allocated - self.spent.get((budget_month, category), 0),
+            }
+            for (budget_month, category), allocated in self.budgets.items()
+            if budget_month == month
+        ]
+
+    def active(self, month=None):
+        """Categories of a month at or above a threshold, as (category, threshold) highest first"""
+        month = month or datetime.now().strftime("%Y-%m")
+        reached = [(category, level) for (level_month, category), level in self.levels.items()
+                   if level_month == month and level]
+        return sorted(reached, key=lambda entry: entry[1], reverse=True)
+
+    def since(self, sequence):
+        """Alerts recorded after alert number `sequence`, oldest first"""
+        return [alert for alert in self.alerts if alert['sequence'] > sequence]
+
+    def _spend(self, item, sign, revision):
+        key = (item['date_added'][:7], item['category'])
+        self.spent[key] = self.spent.get(key, 0) + sign * item['price'] * item['quantity']
+        if key in self.budgets:
+            self._check(key, revision)
+
+    def _level(self, key):
+        allocated = self.budgets.get(key)
+        if not allocated:
+            return 0
+        used = self.spent.get(key, 0) / allocated
+        return max((threshold for threshold in self.thresholds if used >= threshold - 1e-9), default=0)
+
+    def _check(self, key, revision):
+        level = self._level(key)
+        if level > self.levels.get(key, 0):
+            self.sequence += 1
+            month, category = key
+            self.alerts.append({
+                'sequence': self.sequence,
+                'month': month,
+                'category': category,
+                'threshold': level,
+                'spent': self.spent.get(key, 0),
+                'budgeted': self.budgets[key],
+                'revision': revision,
+                'time': time.time(),
+            })
+        self.levels[key] = level
@@ -0,0 +1,185 @@
+"""Learned category prediction for new grocery items.
+
+A multinomial naive Bayes model over hashed name features. An item name is
+split into lowercase word tokens (with a simple plural strip) and adjacent
+word pairs, and each feature is hashed with crc32 into a fixed number of
+buckets, so the model's size does not grow with the vocabulary.
+
+The model starts from seed keywords per category, is trained on every user's
+past `name -> category` choices in a background thread, and learns
+incrementally from each item a user adds or re-categorizes. Until the
+history is read, predictions come from the seed keywords and whatever has
+been learned so far, so nothing waits on the scan of all users. Prediction touches only the name's few features
+per category and runs in microseconds, cheap enough for every change of the
+item name field.
+"""
+import logging
+import math
+import re
+import threading
+import zlib
+from collections import Counter
+
+from auth import load_users
+from events import ITEM_ADDED, ITEM_UPDATED
+from storage import load_user_data
+
+logger = logging.getLogger(__name__)
+
+HASH_BUCKETS = 1 << 18
+SMOOTHING = 0.1
+# How many training examples one seed keyword is worth
+SEED_WEIGHT = 5
+
+SEED_KEYWORDS = {
+    "🥬 Fruits & Vegetables": [
+        'apple', 'banana', 'avocado', 'onion', 'carrot', 'tomato', 'potato', 'lettuce', 'salad', 'greens',
+        'orange', 'lemon', 'strawberry', 'grape', 'pepper', 'broccoli', 'cucumber', 'spinach', 'garlic', 'berry',
+    ],
+    "🥛 Dairy & Eggs": ['milk', 'dairy', 'cheese', 'cheddar', 'mozzarella', 'egg', 'butter', 'yogurt', 'yoghurt', 'cream'],
+    "🥩 Meat & Seafood": ['chicken', 'poultry', 'beef', 'steak', 'pork', 'ham', 'bacon', 'fish', 'salmon', 'tuna',
+                          'shrimp', 'prawn', 'mince', 'sausage'],
+    "🍞 Bakery": ['bread', 'loaf', 'croissant', 'bagel', 'cake', 'muffin', 'bun', 'baguette', 'roll'],
+    "🥫 Pantry Staples": ['rice', 'pasta', 'spaghetti', 'oil', 'salt', 'honey', 'flour', 'sugar', 'beans', 'sauce',
+                          'cereal', 'oats'],
+    "🥤 Beverages": ['coffee', 'espresso', 'tea', 'juice', 'water', 'beer', 'wine', 'soda', 'cola', 'soft drink'],
+    "🍿 Snacks": ['chips', 'crisps', 'chocolate', 'candy', 'cookie', 'biscuit', 'popcorn', 'nuts', 'almond', 'peanut'],
+    "🧊 Frozen Foods": ['frozen', 'ice cream', 'pizza', 'fries', 'ice'],
+    "🧴 Personal Care": ['shampoo', 'soap', 'toothpaste', 'deodorant', 'lotion', 'razor', 'conditioner'],
+    "🧽 Household Items": ['detergent', 'sponge', 'paper towel', 'toilet paper', 'bin bag', 'cleaner', 'foil'],
+    "👶 Baby Products": ['diaper', 'nappy', 'baby', 'wipes', 'formula'],
+    "🐕 Pet Supplies": ['dog', 'cat', 'pet', 'litter', 'kibble'],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(token):
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 4 and token.endswith(('oes', 'ches', 'shes')):
+        return token[:-2]
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def name_features(name):
+    """Hashed feature buckets for an item name: word tokens and adjacent word pairs"""
+    tokens = [_stem(token) for token in _TOKEN_RE.findall(name.lower())]
+    features = tokens + [f'{first} {second}' for first, second in zip(tokens, tokens[1:])]
+    return [zlib.crc32(feature.encode()) % HASH_BUCKETS for feature in features]
+
+
+class CategoryClassifier:
+    """Hashed-token multinomial naive Bayes over item names"""
+
+    def __init__(self, seed_keywords=SEED_KEYWORDS):
+        self._lock = threading.Lock()
+        self._class_examples = Counter()  # category -> training examples
+        self._class_features = Counter()  # category -> total feature count
+        self._feature_counts = {}  # category -> Counter(bucket -> count)
+        self._known_buckets = set()
+        self.trained = threading.Event()  # set once every user's history has been learned
+        for category, keywords in seed_keywords.items():
+            for keyword in keywords:
+                self.learn(keyword, category, SEED_WEIGHT)
+
+    def learn(self, name, category, weight=1):
+        """Count one labelled name (or `weight` identical ones) into the model"""
+        buckets = name_features(name)
+        if not buckets or not category:
+            return
+        with self._lock:
+            counts = self._feature_counts.setdefault(category, Counter())
+            for bucket in buckets:
+                counts[bucket] += weight
+            self._known_buckets.update(buckets)
+            self._class_examples[category] += weight
+            self._class_features[category] += weight * len(buckets)
+
+    def forget(self, name, category, weight=1):
+        """Undo `learn`, e.g. when the user corrects an item's category"""
+        buckets = name_features(name)
+        with self._lock:
+            counts = self._feature_counts.get(category)
+            if not buckets or counts is None:
+                return
+            for bucket in buckets:
+                counts[bucket] = max(0, counts[bucket] - weight)
+            self._class_examples[category] = max(0, self._class_examples[category] - weight)
+            self._class_features[category] = max(0, self._class_features[category] - weight * len(buckets))
+
+    def predict_scores(self, name, limit=3):
+        """The most likely categories for a name with their probabilities"""
+        buckets = name_features(name)
+        with self._lock:
+            if not any(bucket in self._known_buckets for bucket in buckets):
+                return []
+            total_examples = sum(self._class_examples.values())
+            log_scores = {}
+            for category, counts in self._feature_counts.items():
+                examples = self._class_examples[category]
+                if not examples:
+                    continue
+                denominator = math.log(self._class_features[category] + SMOOTHING * HASH_BUCKETS)
+                score = math.log(examples / total_examples)
+                for bucket in buckets:
+                    score += math.log(counts.get(bucket, 0) + SMOOTHING) - denominator
+                log_scores[category] = score
+        if not log_scores:
+            return []
+        top = max(log_scores.values())
+        weights = {category: math.exp(score - top) for category, score in log_scores.items()}
+        norm = sum(weights.values())
+        ranked = sorted(weights.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        return [(category, weight / norm) for category, weight in ranked]
+
+    def predict(self, name):
+        """The most likely category for a name, or None if nothing in it is known"""
+        scores = self.predict_scores(name, limit=1)
+        return scores[0][0] if scores else None
+
+    def observe(self, events):
+        """Learn from a user's change events: new items and category corrections"""
+        for event in events:
+            if event.kind == ITEM_ADDED:
+                self.learn(event.item['name'], event.item['category'])
+            elif event.kind == ITEM_UPDATED:
+                old, new = event.previous, event.item
+                if (old['name'], old['category']) != (new['name'], new['category']):
+                    self.forget(old['name'], old['category'])
+                    self.learn(new['name'], new['category'])
+
+    def train_on_items(self, items):
+        """Learn from a list of item dicts, with one weighted update per distinct name/category pair"""
+        pairs = Counter((item['name'], item['category']) for item in items if item.get('name'))
+        for (name, category), count in pairs.items():
+            self.learn(name, category, count)
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def train_on_history(classifier):
+    """Learn every user's stored items, then set `classifier.trained`"""
+    try:
+        for username in load_users():
+            grocery_data, _ = load_user_data(username)
+            classifier.train_on_items(grocery_data)
+    except Exception:
+        logger.exception("Training the category classifier on stored items failed")
+    finally:
+        classifier.trained.set()
+
+
+def get_category_classifier():
+    """Process-wide classifier; the first call starts training it on every user's history in the background"""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = CategoryClassifier()
+            threading.Thread(target=train_on_history, args=(_classifier,),
+                             name='classifier-training', daemon=True).start()
+        return _classifier
@@ -0,0 +1,272 @@
+"""Memory-mapped binary columnar file format for a user's item table.
+
+JSON stays the interchange format; the `.col` file written next to it is a
+faster binary copy of the same items. Layout:
+
+    8 bytes   magic b'GRCOL1\\0\\0'
+    4 bytes   little-endian uint32 header length
+    header    JSON: item count, category/unit dictionaries, column offsets
+    columns   each column 8-byte aligned, little-endian fixed-width arrays
+
+Numeric columns (price, quantity, date and expiry as days since the epoch,
+category and unit codes) are opened through `mmap` with `numpy.frombuffer`, so
+reading them copies nothing. Names, brands and IDs live in string heaps, with
+each value NUL-terminated and indexed by a uint32 offsets column.
+"""
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'GRCOL1\0\0'
+NO_DATE = np.iinfo(np.int32).min
+KNOWN_FIELDS = ('id', 'name', 'category', 'price', 'quantity', 'unit', 'date_added', 'expiry_date', 'brand')
+
+
+def _parse_day(value):
+    try:
+        return np.datetime64(value, 'D')
+    except (ValueError, TypeError):
+        return np.datetime64('NaT')
+
+
+def _days_since_epoch(dates):
+    try:
+        days = np.array(dates, dtype='datetime64[D]')
+    except (ValueError, TypeError):
+        # Free-text dates ("tomorrow") are stored as missing; the caller keeps the raw value
+        days = np.array([_parse_day(value) for value in dates], dtype='datetime64[D]')
+    result = days.astype(np.int64)
+    result[np.isnat(days)] = NO_DATE
+    return result.astype(np.int32)
+
+
+def _days_to_strings(days):
+    strings = (np.datetime64('1970-01-01', 'D') + days.astype('timedelta64[D]')).astype(str).tolist()
+    missing = np.flatnonzero(days == NO_DATE)
+    for position in missing.tolist():
+        strings[position] = None
+    return strings
+
+
+def _string_heap(values):
+    encoded = [value.encode('utf-8') + b'\0' for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def _codes(values):
+    dictionary = sorted(set(values))
+    lookup = {value: code for code, value in enumerate(dictionary)}
+    return dictionary, np.array([lookup[value] for value in values], dtype=np.uint16)
+
+
+def encode_item_columns(items):
+    """The columnar file for items as bytes; raises before anything is written if items cannot be encoded"""
+    categories, category_codes = _codes([item['category'] for item in items])
+    units, unit_codes = _codes([item['unit'] for item in items])
+    prices = [item['price'] for item in items]
+    quantities = [item['quantity'] for item in items]
+    quantity_dtype = np.int32 if all(float(q).is_integer() for q in quantities) else np.float64
+    dates = {'date_added': [item['date_added'] for item in items],
+             'expiry_date': [item.get('expiry_date') for item in items]}
+    brands = [item.get('brand') for item in items]
+    ids = [item.get('id') for item in items]
+
+    brand_null = np.array([not brand for brand in brands], dtype=np.uint8)
+    name_offsets, name_heap = _string_heap([item['name'] for item in items])
+    brand_offsets, brand_heap = _string_heap([brand or '' for brand in brands])
+    id_offsets, id_heap = _string_heap([item_id or '' for item_id in ids])
+
+    columns = {
+        'price': np.array(prices, dtype=np.float64),
+        'quantity': np.array(quantities, dtype=quantity_dtype),
+        'date_added': _days_since_epoch(dates['date_added']),
+        'expiry_date': _days_since_epoch(dates['expiry_date']),
+        'category': category_codes,
+        'unit': unit_codes,
+        'brand_null': brand_null,
+        'name_offsets': name_offsets,
+        'name_heap': name_heap,
+        'brand_offsets': brand_offsets,
+        'brand_heap': brand_heap,
+        'id_offsets': id_offsets,
+        'id_heap': id_heap,
+    }
+
+    # Fields the format has no column for ride along in the header, as do values the columns
+    # would not give back exactly (free-text or timestamped dates, an int among float prices, '' brands)
+    extras = {}
+    for position, item in enumerate(items):
+        unknown = {key: value for key, value in item.items() if key not in KNOWN_FIELDS}
+        if unknown:
+            extras[str(position)] = unknown
+    quantity_type = int if quantity_dtype is np.int32 else float
+    inexact = {
+        'price': [position for position, value in enumerate(prices) if type(value) is not float],
+        'quantity': [position for position, value in enumerate(quantities) if type(value) is not quantity_type],
+        'brand': [position for position, value in enumerate(brands) if not value and value is not None],
+        'id': [position for position, value in enumerate(ids) if not value and value != ''],
+    }
+    for field, values in dates.items():
+        inexact[field] = [position for position, (value, day)
+                          in enumerate(zip(values, _days_to_strings(columns[field]))) if value != day]
+    for field, positions in inexact.items():
+        for position in positions:
+            extras.setdefault(str(position), {})[field] = items[position].get(field)
+
+    layout = {}
+    offset = 0
+    for name, array in columns.items():
+        layout[name] = [offset, array.dtype.str, len(array)]
+        offset += -(-array.nbytes // 8) * 8
+    header = json.dumps({
+        'count': len(items),
+        'categories': categories,
+        'units': units,
+        'columns': layout,
+        'extras': extras,
+    }).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 4 + len(header)) // 8) * 8
+
+    encoded = bytearray(data_start + offset)
+    encoded[:len(MAGIC) + 4 + len(header)] = MAGIC + struct.pack('<I', len(header)) + header
+    for name, array in columns.items():
+        start = data_start + layout[name][0]
+        encoded[start:start + array.nbytes] = array.tobytes()
+    return encoded
+
+
+def write_item_columns(path, items, encoded=None):
+    """Write items to a columnar file, replacing any existing one atomically.
+
+    `encoded` is the output of `encode_item_columns(items)` if the caller
+    already built it.
+    """
+    if encoded is None:
+        encoded = encode_item_columns(items)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(encoded)
+    os.replace(tmp_path, path)
+
+
+class ItemColumns:
+    """Zero-copy, read-only view of a columnar item file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a columnar item file")
+        (header_length,) = struct.unpack_from('<I', self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(self._mmap[header_start:header_start + header_length])
+        data_start = -(-(header_start + header_length) // 8) * 8
+
+        self.count = header['count']
+        self.categories = header['categories']
+        self.units = header['units']
+        self.extras = header['extras']
+        self._columns = {
+            name: np.frombuffer(self._mmap, dtype=np.dtype(dtype), count=length, offset=data_start + offset)
+            for name, (offset, dtype, length) in header['columns'].items()
+        }
+        self.price = self._columns['price']
+        self.quantity = self._columns['quantity']
+        self.date_days = self._columns['date_added']
+        self.expiry_days = self._columns['expiry_date']
+        self.category_codes = self._columns['category']
+        self.unit_codes = self._columns['unit']
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        """Release the mapping; arrays taken from this view become invalid"""
+        self._columns = {}
+        self.price = self.quantity = self.date_days = self.expiry_days = None
+        self.category_codes = self.unit_codes = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Arrays handed out earlier still reference the mapping; it is
+            # released once they are garbage collected.
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _strings(self, name):
+        # Sliced by the offsets column rather than split on NUL, which values may contain
+        heap = self._columns[f'{name}_heap'].tobytes()
+        offsets = self._columns[f'{name}_offsets'].tolist()
+        return [heap[start:end - 1].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+
+    def _string(self, name, position):
+        offsets = self._columns[f'{name}_offsets']
+        start, end = int(offsets[position]), int(offsets[position + 1]) - 1
+        return self._columns[f'{name}_heap'][start:end].tobytes().decode('utf-8')
+
+    def name(self, position):
+        """Item name at a position, decoded from the string heap"""
+        return self._string('name', position)
+
+    def amounts(self):
+        """price * quantity per item"""
+        return self.price * self.quantity
+
+    def to_dicts(self):
+        """Materialize the table as the list of item dicts the app works with"""
+        names = self._strings('name')
+        brands = self._strings('brand')
+        ids = self._strings('id')
+        brand_null = self._columns['brand_null'].tolist()
+        categories = [self.categories[code] for code in self.category_codes.tolist()]
+        units = [self.units[code] for code in self.unit_codes.tolist()]
+        items = [
+            {
+                'name': name,
+                'category': category,
+                'price': price,
+                'quantity': quantity,
+                'unit': unit,
+                'date_added': date_added,
+                'expiry_date': expiry_date,
+                'brand': None if no_brand else brand,
+                'id': item_id,
+            }
+            for name, category, price, quantity, unit, date_added, expiry_date, brand, no_brand, item_id in zip(
+                names, categories, self.price.tolist(), self.quantity.tolist(), units,
+                _days_to_strings(self.date_days), _days_to_strings(self.expiry_days),
+                brands, brand_null, ids
+            )
+        ]
+        for position, extra in self.extras.items():
+            items[int(position)].update(extra)
+        return items
+
+
+def spending_by_category(columns):
+    """Total spend per category computed directly on the mapped columns"""
+    totals = np.bincount(columns.category_codes, weights=columns.amounts(), minlength=len(columns.categories))
+    return {category: float(total) for category, total in zip(columns.categories, totals) if total}
+
+
+def total_spent(columns):
+    """Total spend across the whole table"""
+    return float(columns.amounts().sum())
+
+
+def daily_spending(columns):
+    """Spend per day as {YYYY-MM-DD: amount}"""
+    days, inverse = np.unique(columns.date_days, return_inverse=True)
+    totals = np.bincount(inverse, weights=columns.amounts())
+    return dict(zip(_days_to_strings(days), totals.tolist()))
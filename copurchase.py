@@ -0,0 +1,169 @@
+"""Co-purchase mining for "you usually buy X with Y" recommendations.
+
+Every (user, date) is treated as one shopping basket. The model keeps, per
+user, how many baskets contain each item and how many contain each pair of
+items, so association rules can be read off directly:
+
+    support(X -> Y)    = baskets with X and Y / all baskets
+    confidence(X -> Y) = baskets with X and Y / baskets with X
+    lift(X -> Y)       = confidence(X -> Y) / (baskets with Y / all baskets)
+
+Counts are maintained incrementally: adding or removing one item touches only
+the other items in the same basket, so keeping recommendations current costs
+O(basket size) instead of a full re-mine. Item names are matched
+case-insensitively.
+"""
+from collections import Counter
+from itertools import combinations
+
+from events import ITEM_ADDED, ITEM_REMOVED, ITEM_UPDATED
+
+
+def item_key(name):
+    """Normalize an item name for matching across baskets"""
+    return ' '.join(str(name).lower().split())
+
+
+class CoPurchaseModel:
+    """Incrementally maintained basket, item and pair counts for one user"""
+
+    def __init__(self):
+        self.baskets = {}  # date -> Counter(item key -> occurrences that day)
+        self.item_counts = Counter()  # item key -> baskets containing it
+        self.pair_counts = {}  # item key -> Counter(other item key -> baskets containing both)
+        self.display_names = {}  # item key -> most recently seen spelling
+
+    @classmethod
+    def from_user_data(cls, user_data):
+        """Mine a model from a UserData object, for use as a derived view"""
+        return cls.from_items(user_data.grocery_items)
+
+    @classmethod
+    def from_items(cls, items):
+        """Mine a model from a user's full item list"""
+        model = cls()
+        for item in items:
+            key = item_key(item['name'])
+            model.display_names[key] = item['name']
+            model.baskets.setdefault(item['date_added'], Counter())[key] += 1
+        # Bulk pass: count each basket's pairs once instead of item by item
+        pair_totals = Counter()
+        for basket in model.baskets.values():
+            keys = sorted(basket)
+            model.item_counts.update(keys)
+            pair_totals.update(combinations(keys, 2))
+        for (first, second), together in pair_totals.items():
+            model.pair_counts.setdefault(first, Counter())[second] = together
+            model.pair_counts.setdefault(second, Counter())[first] = together
+        return model
+
+    @property
+    def basket_count(self):
+        return len(self.baskets)
+
+    def add(self, item):
+        """Count one item into its day's basket"""
+        key = item_key(item['name'])
+        self.display_names[key] = item['name']
+        basket = self.baskets.setdefault(item['date_added'], Counter())
+        if not basket[key]:
+            # First time this item appears in the basket: pair it with the rest
+            pairs = self.pair_counts.setdefault(key, Counter())
+            for other in basket:
+                if basket[other]:
+                    pairs[other] += 1
+                    self.pair_counts.setdefault(other, Counter())[key] += 1
+            self.item_counts[key] += 1
+        basket[key] += 1
+
+    def remove(self, item):
+        """Undo `add` for an item that was deleted or changed"""
+        key = item_key(item['name'])
+        basket = self.baskets.get(item['date_added'])
+        if not basket or not basket[key]:
+            return
+        basket[key] -= 1
+        if basket[key]:
+            return
+        del basket[key]
+        pairs = self.pair_counts.get(key, Counter())
+        for other in basket:
+            _decrement(pairs, other)
+            _decrement(self.pair_counts[other], key)
+            if not self.pair_counts[other]:
+                del self.pair_counts[other]
+        if not pairs:
+            self.pair_counts.pop(key, None)
+        _decrement(self.item_counts, key)
+        if not basket:
+            del self.baskets[item['date_added']]
+
+    def update(self, old_item, new_item):
+        """Re-count an item whose name or date changed"""
+        if item_key(old_item['name']) != item_key(new_item['name']) or old_item['date_added'] != new_item['date_added']:
+            self.remove(old_item)
+            self.add(new_item)
+
+    def apply(self, event):
+        """Keep the counts current from a change event"""
+        if event.kind == ITEM_ADDED:
+            self.add(event.item)
+        elif event.kind == ITEM_REMOVED:
+            self.remove(event.item)
+        elif event.kind == ITEM_UPDATED:
+            self.update(event.previous, event.item)
+
+    def rules_for(self, name, min_support=2, limit=5):
+        """Association rules X -> Y for one item X, best confidence first"""
+        key = item_key(name)
+        item_baskets = self.item_counts.get(key, 0)
+        if not item_baskets:
+            return []
+        rules = [
+            self._rule(key, other, together)
+            for other, together in self.pair_counts.get(key, {}).items()
+            if together >= min_support
+        ]
+        rules.sort(key=lambda rule: (rule['confidence'], rule['support']), reverse=True)
+        return rules[:limit]
+
+    def top_rules(self, min_support=2, min_confidence=0.3, limit=10):
+        """Strongest association rules across all of a user's baskets"""
+        rules = []
+        for key, pairs in self.pair_counts.items():
+            for other, together in pairs.items():
+                if together >= min_support and together / self.item_counts[key] >= min_confidence:
+                    rules.append(self._rule(key, other, together))
+        rules.sort(key=lambda rule: (rule['confidence'], rule['lift'], rule['support']), reverse=True)
+        return rules[:limit]
+
+    def suggest(self, names, min_support=2, limit=5):
+        """Items often bought together with any of `names` that are not among them"""
+        keys = {item_key(name) for name in names}
+        scores = {}
+        for key in keys:
+            item_baskets = self.item_counts.get(key, 0)
+            for other, together in self.pair_counts.get(key, {}).items():
+                if other in keys or together < min_support:
+                    continue
+                # Score by the strongest rule pointing at the suggestion
+                scores[other] = max(scores.get(other, 0), together / item_baskets)
+        ranked = sorted(scores.items(), key=lambda kv: (kv[1], self.item_counts[kv[0]]), reverse=True)
+        return [{'item': self.display_names[key], 'confidence': score} for key, score in ranked[:limit]]
+
+    def _rule(self, key, other, together):
+        confidence = together / self.item_counts[key]
+        return {
+            'antecedent': self.display_names[key],
+            'consequent': self.display_names[other],
+            'baskets': together,
+            'support': together / self.basket_count,
+            'confidence': confidence,
+            'lift': confidence / (self.item_counts[other] / self.basket_count),
+        }
+
+
+def _decrement(counter, key):
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
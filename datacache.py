@@ -0,0 +1,199 @@
+"""Process-wide cache of users' data shared by all sessions.
+
+Every browser session of a user works on the same UserData object instead
+of a private copy, so three open tabs cost one copy of the item list. Users
+are kept in least-recently-used order; when the estimated resident size of
+all cached users exceeds the memory cap, the coldest users are evicted and
+re-hydrated from disk on their next access. Users with unsaved changes are
+never evicted.
+
+Sessions keep only the username and the revision they last saw, not the
+data, so evicted data is actually released. The revision of an evicted user
+is remembered, so revisions stay monotonic across reloads.
+
+`prewarm` hydrates a user on a background thread right after login, so the
+first page render finds the data and its derived views already built.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_MB = float(os.environ.get('GROCERY_CACHE_MAX_MB', '256'))
+# Items measured per user to estimate the size of the whole list
+SIZE_SAMPLE = 200
+# A busy user is re-measured on access at most this often; stats() always measures
+REMEASURE_SECONDS = 1.0
+
+
+def _deep_size(value):
+    if value is None or isinstance(value, bool):
+        return 0
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        # Field names are shared between all items (JSON decoding memoizes them)
+        size += sum(_deep_size(item) for item in value.values())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_deep_size(item) for item in value)
+    return size
+
+
+def estimate_user_bytes(user_data):
+    """Approximate resident bytes of a user's items, index and budgets"""
+    items = user_data.grocery_items
+    step = max(1, len(items) // SIZE_SAMPLE)
+    sample = items[::step]
+    item_bytes = sum(_deep_size(item) for item in sample) / len(sample) * len(items) if sample else 0
+    return int(
+        item_bytes
+        + sys.getsizeof(items)
+        + sys.getsizeof(user_data.item_index) + len(user_data.item_index) * 90  # id strings and positions
+        + _deep_size(user_data.budget_entries)
+        + _deep_size(user_data.archive_index)
+    )
+
+
+class _Entry:
+    __slots__ = ('user_data', 'bytes', 'measured_revision', 'measured_at', 'last_access', 'hits')
+
+    def __init__(self, user_data):
+        self.user_data = user_data
+        self.bytes = estimate_user_bytes(user_data)
+        self.measured_revision = user_data.revision
+        self.measured_at = self.last_access = time.monotonic()
+        self.hits = 0
+
+
+class UserDataCache:
+    """Shared per-user UserData objects with LRU eviction under a memory cap"""
+
+    def __init__(self, loader, max_bytes=CACHE_MAX_MB * 1024 * 1024, is_pinned=None):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.is_pinned = is_pinned or (lambda username: False)
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._entries = OrderedDict()  # username -> _Entry, least recently used first
+        self._evicted_revisions = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, username):
+        """The user's shared data, hydrating it with `loader(username)` if it is not cached"""
+        with self._lock:
+            entry = self._touch(username)
+            if entry is not None:
+                return entry.user_data
+            load_lock = self._load_locks.setdefault(username, threading.Lock())
+
+        # Load outside the cache lock; concurrent sessions of one user wait for one load
+        with load_lock:
+            with self._lock:
+                entry = self._touch(username)
+                if entry is not None:
+                    return entry.user_data
+            user_data = self.loader(username)
+            with self._lock:
+                user_data.revision = max(user_data.revision, self._evicted_revisions.pop(username, 0))
+                self._entries[username] = _Entry(user_data)
+                self.misses += 1
+                self._evict(keep=username)
+            return user_data
+
+    def prewarm(self, username, warmers=()):
+        """Load a user's data and then run each `warmer(user_data)` on a background thread"""
+        def run():
+            try:
+                user_data = self.get(username)
+                for warm in warmers:
+                    warm(user_data)
+            except Exception:
+                # The page load retries in the foreground and surfaces the error there
+                logger.exception("Pre-warming data for %s failed", username)
+
+        thread = threading.Thread(target=run, name=f'prewarm-{username}', daemon=True)
+        thread.start()
+        return thread
+
+    def peek(self, username):
+        """The user's data if it is cached, without loading or touching it"""
+        with self._lock:
+            entry = self._entries.get(username)
+            return entry.user_data if entry else None
+
+    def discard(self, username):
+        """Drop a user's cached data, e.g. after their files were replaced"""
+        with self._lock:
+            entry = self._entries.pop(username, None)
+            if entry is not None:
+                self._evicted_revisions[username] = entry.user_data.revision
+
+    def resident_bytes(self, username):
+        """Estimated resident bytes of one cached user (0 if not cached)"""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return 0
+            self._remeasure(entry)
+            return entry.bytes
+
+    def stats(self):
+        """Resident bytes per cached user, plus hit/miss/eviction counters"""
+        now = time.monotonic()
+        with self._lock:
+            users = {}
+            for username, entry in self._entries.items():
+                self._remeasure(entry)
+                users[username] = {
+                    'bytes': entry.bytes,
+                    'items': len(entry.user_data.grocery_items),
+                    'revision': entry.user_data.revision,
+                    'idle_seconds': now - entry.last_access,
+                    'hits': entry.hits,
+                }
+            return {
+                'users': users,
+                'resident_bytes': sum(user['bytes'] for user in users.values()),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _touch(self, username):
+        entry = self._entries.get(username)
+        if entry is None:
+            return None
+        self._entries.move_to_end(username)
+        entry.last_access = time.monotonic()
+        entry.hits += 1
+        self.hits += 1
+        # Sampling the items on every mutation would dominate small API requests
+        if (entry.measured_revision != entry.user_data.revision
+                and entry.last_access - entry.measured_at >= REMEASURE_SECONDS):
+            self._remeasure(entry)
+            self._evict(keep=username)
+        return entry
+
+    def _remeasure(self, entry):
+        if entry.measured_revision != entry.user_data.revision:
+            entry.bytes = estimate_user_bytes(entry.user_data)
+            entry.measured_revision = entry.user_data.revision
+            entry.measured_at = time.monotonic()
+
+    def _evict(self, keep):
+        total = sum(entry.bytes for entry in self._entries.values())
+        for username in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if username == keep or self.is_pinned(username):
+                continue
+            entry = self._entries.pop(username)
+            self._evicted_revisions[username] = entry.user_data.revision
+            total -= entry.bytes
+            self.evictions += 1
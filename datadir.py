@@ -0,0 +1,187 @@
+"""Layout of the data directory: one hash-sharded subdirectory per user.
+
+All data lives under GROCERY_DATA_DIR (default `data`, relative to the
+working directory):
+
+    data/
+        users.json
+        users/3f/a2/alice/
+            grocery_data.json
+            budget_data.json
+            items.col
+            archive/
+
+The two shard levels come from the SHA-256 of the username, so no directory
+holds more than 256 entries until there are far more than 65,536 users, and
+a user's directory is computed from the name alone: lookups never list a
+directory, whatever the number of accounts.
+
+Directory names are a reversible, case-insensitive-safe encoding of the
+username: lowercase ASCII letters, digits, `-` and `_` are kept and every
+other character, including uppercase letters, is percent-encoded as UTF-8
+bytes. Names can therefore never contain path separators or be `.`/`..`,
+and `Alice` and `alice` stay distinct on case-insensitive filesystems.
+
+Data written by earlier versions (`{username}_grocery_data.json` and friends
+next to app.py) is moved into this layout with
+
+    python datadir.py migrate --source . [--dry-run]
+"""
+import argparse
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+from urllib.parse import unquote
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.environ.get('GROCERY_DATA_DIR', 'data')
+USERS_FILE = 'users.json'
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2  # hex characters per level
+# Longer encoded names are truncated and made unique with a hash suffix (filesystems cap names at 255 bytes)
+MAX_NAME_LENGTH = 120
+
+_SAFE_CHARACTERS = frozenset('abcdefghijklmnopqrstuvwxyz0123456789-_')
+
+# Files of one user in the flat layout used before the data directory existed
+LEGACY_FILES = {
+    '{}_grocery_data.json': 'grocery_data.json',
+    '{}_budget_data.json': 'budget_data.json',
+    '{}_items.col': 'items.col',
+    '{}_archive': 'archive',
+}
+
+
+def encode_username(username):
+    """Filesystem-safe directory name for a username"""
+    encoded = ''.join(
+        character if character in _SAFE_CHARACTERS
+        else ''.join(f'%{byte:02X}' for byte in character.encode('utf-8'))
+        for character in username
+    )
+    if not encoded:
+        encoded = '%'  # the empty username still needs a name of its own
+    if len(encoded) > MAX_NAME_LENGTH:
+        digest = hashlib.sha256(username.encode('utf-8')).hexdigest()[:16]
+        encoded = f"{encoded[:MAX_NAME_LENGTH - 17]}~{digest}"
+    return encoded
+
+
+def decode_username(name):
+    """The username a directory name was encoded from, or None for truncated names"""
+    if '~' in name:
+        return None
+    return '' if name == '%' else unquote(name, errors='strict')
+
+
+def shard(username):
+    """Shard subdirectories of a user, e.g. ('3f', 'a2')"""
+    digest = hashlib.sha256(username.encode('utf-8')).hexdigest()
+    return tuple(digest[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH] for level in range(SHARD_LEVELS))
+
+
+def user_dir(username, root=None):
+    """Directory holding all files of one user"""
+    return os.path.join(root or DATA_DIR, 'users', *shard(username), encode_username(username))
+
+
+def users_file_path(root=None):
+    """Path of the accounts file"""
+    return os.path.join(root or DATA_DIR, USERS_FILE)
+
+
+def data_file_path(name, root=None):
+    """Path of a process-wide file (caches, reports) in the data directory"""
+    return os.path.join(root or DATA_DIR, name)
+
+
+def ensure_user_dir(username):
+    """Create a user's directory (and its shards) if needed and return it"""
+    path = user_dir(username)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@functools.cache
+def warn_if_unmigrated():
+    """Log a hint (once per process) when flat-layout data exists but the data directory has no accounts"""
+    if not os.path.exists(users_file_path()) and os.path.exists(USERS_FILE) \
+            and os.path.abspath(USERS_FILE) != os.path.abspath(users_file_path()):
+        logger.warning(
+            "Found %s in %s but none in the data directory %s; run `python datadir.py migrate --source .`",
+            USERS_FILE, os.getcwd(), os.path.abspath(DATA_DIR)
+        )
+
+
+def legacy_usernames(source):
+    """Usernames with files in the flat layout under `source`, from users.json and the file names"""
+    usernames = set()
+    legacy_users = os.path.join(source, USERS_FILE)
+    if os.path.exists(legacy_users):
+        with open(legacy_users) as f:
+            usernames.update(json.load(f))
+    # Archive directories only move along with their user; "*_archive" alone is too common a name
+    suffixes = [pattern.format('') for pattern in LEGACY_FILES if not pattern.endswith('_archive')]
+    with os.scandir(source) as entries:
+        for entry in entries:
+            for suffix in suffixes:
+                # The legacy global files ("grocery_data.json") have no owner and are left alone
+                if entry.is_file() and entry.name.endswith(suffix) and len(entry.name) > len(suffix):
+                    usernames.add(entry.name[:-len(suffix)])
+    return sorted(usernames)
+
+
+def migrate(source, root=None, dry_run=False, out=sys.stdout):
+    """Move flat-layout user files from `source` into the sharded layout under `root`"""
+    root = root or DATA_DIR
+    moves, conflicts = [], []
+    for username in legacy_usernames(source):
+        destination_dir = user_dir(username, root)
+        for pattern, name in LEGACY_FILES.items():
+            old_path = os.path.join(source, pattern.format(username))
+            if not os.path.exists(old_path):
+                continue
+            new_path = os.path.join(destination_dir, name)
+            (conflicts if os.path.exists(new_path) else moves).append((old_path, new_path))
+    old_users, new_users = os.path.join(source, USERS_FILE), users_file_path(root)
+    if os.path.exists(old_users) and os.path.abspath(old_users) != os.path.abspath(new_users):
+        (conflicts if os.path.exists(new_users) else moves).append((old_users, new_users))
+
+    for old_path, new_path in moves:
+        print(f"{'would move' if dry_run else 'move'} {old_path} -> {new_path}", file=out)
+        if not dry_run:
+            os.makedirs(os.path.dirname(new_path), exist_ok=True)
+            shutil.move(old_path, new_path)
+    for old_path, new_path in conflicts:
+        print(f"skip {old_path}: {new_path} already exists", file=out)
+    return len(moves), len(conflicts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the sharded per-user data directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = commands.add_parser('migrate', help='move flat-layout user files into the data directory')
+    migrate_parser.add_argument('--source', default='.', help='directory holding the old {username}_* files')
+    migrate_parser.add_argument('--data-dir', default=DATA_DIR, help='data directory (default GROCERY_DATA_DIR)')
+    migrate_parser.add_argument('--dry-run', action='store_true', help='print the moves without making them')
+    locate_parser = commands.add_parser('locate', help="print a user's directory")
+    locate_parser.add_argument('username')
+    locate_parser.add_argument('--data-dir', default=DATA_DIR, help='data directory (default GROCERY_DATA_DIR)')
+    args = parser.parse_args()
+
+    if args.command == 'locate':
+        print(user_dir(args.username, args.data_dir))
+        return
+    moved, skipped = migrate(args.source, args.data_dir, args.dry_run)
+    print(f"{moved} path(s) {'to move' if args.dry_run else 'moved'}, {skipped} skipped")
+    if skipped:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
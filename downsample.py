@@ -0,0 +1,74 @@
+"""Server-side downsampling for long time-series charts.
+
+Plotting every day of a multi-year history ships thousands of points to the
+browser. These helpers pick a representative subset before plotting:
+
+- `lttb_indices`: Largest-Triangle-Three-Buckets, which keeps the points that
+  best preserve the visual shape of the line.
+- `minmax_indices`: keeps the first, last, lowest and highest point of each
+  bucket, so spikes are never dropped.
+
+Both return sorted indices into the original arrays, so any column can be
+sliced with them.
+"""
+import os
+
+import numpy as np
+
+CHART_MAX_POINTS = int(os.environ.get('GROCERY_CHART_MAX_POINTS', '800'))
+# Above this many rendered points, line charts switch to WebGL (Scattergl)
+WEBGL_THRESHOLD = int(os.environ.get('GROCERY_CHART_WEBGL_THRESHOLD', '500'))
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of `threshold` points chosen by Largest-Triangle-Three-Buckets"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # threshold - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    chosen = np.empty(threshold, dtype=np.int64)
+    chosen[0] = 0
+    chosen[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x = x[end:edges[bucket + 2]].mean()
+            next_y = y[end:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle area formed with the previous pick and the next bucket's average
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        chosen[bucket + 1] = previous
+    return chosen
+
+
+def minmax_indices(y, buckets):
+    """Indices of the first, last, minimum and maximum point of each bucket"""
+    n = len(y)
+    if n <= buckets * 4:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    bucket_of = np.arange(n) * buckets // n
+    starts = np.searchsorted(bucket_of, np.arange(buckets))
+    ends = np.append(starts[1:], n) - 1
+    # Sorting by (bucket, value) puts each bucket's min first and max last
+    order = np.lexsort((y, bucket_of))
+    return np.unique(np.concatenate([starts, ends, order[starts], order[ends]]))
+
+
+def downsample(x, y, max_points=CHART_MAX_POINTS, method='lttb'):
+    """Indices to plot for a series, using `method` ('lttb' or 'minmax') when it is too long"""
+    if len(x) <= max_points:
+        return np.arange(len(x))
+    if method == 'minmax':
+        return minmax_indices(y, max(1, max_points // 4))
+    return lttb_indices(x, y, max_points)
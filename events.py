@@ -0,0 +1,44 @@
+"""Typed change events emitted when a user's data is mutated.
+
+Every mutation made through `mutations.UserData` produces one ChangeEvent
+carrying the user's new revision number. Subscribers (autosave, derived
+views such as aggregates and recommendation models, the category classifier)
+receive the events of each mutation in order and update themselves
+incrementally instead of rescanning the whole item list.
+
+Events made by this process are LOCAL; REMOTE events replay changes another
+session saved, when they are merged into the in-memory copy (see sync.py).
+Views update on both, but only LOCAL events need to be saved.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+ITEM_ADDED = 'item_added'
+ITEM_REMOVED = 'item_removed'
+ITEM_UPDATED = 'item_updated'
+BUDGET_SET = 'budget_set'
+
+LOCAL = 'local'
+REMOTE = 'remote'
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """One change to a user's data.
+
+    `item` is the added, removed or updated item (after the update) and
+    `budget` the budget entry that was set. `previous` holds the item or
+    budget entry as it was before an update or replacement. `origin` tells
+    local mutations from changes merged in from another session.
+    """
+    kind: str
+    revision: int
+    item: Optional[dict] = None
+    budget: Optional[dict] = None
+    previous: Optional[dict] = None
+    origin: str = LOCAL
+
+
+def has_local_changes(events):
+    """Whether any of the events were made in this process and so still need saving"""
+    return any(event.origin == LOCAL for event in events)
@@ -0,0 +1,354 @@
+"""Asyncio batch-ingest pipeline for high-volume purchase events.
+
+Store webhooks and receipt scanners submit purchase events into a bounded
+queue. `submit` waits when the queue is full, which pushes backpressure onto
+producers instead of buffering without limit. A dispatcher groups events per
+user and commits each user's batch with one load/append/save cycle in a worker
+thread. While a user's commit is in flight, new events for that user keep
+accumulating and go out together in the next commit. A failed commit is
+retried with the user's next batch, with a growing delay; after
+`max_commit_attempts` failures in a row the batch moves to `dead_letters`.
+
+An event is a dict:
+
+    {"username": "alice", "name": "Milk", "category": "🥛 Dairy & Eggs",
+     "price": 1.29, "quantity": 2, "unit": "bottles", "date": "2025-07-19",
+     "brand": null, "event_id": "store-123-line-4"}
+
+`event_id` is optional. When present it becomes the item ID, so a webhook
+that is delivered twice adds the item only once. `category` is optional too:
+events without one are categorized from the item name by the shared
+category classifier.
+
+Replay synthetic events offline with `python ingest.py --events 50000 --users 20`.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from classifier import get_category_classifier
+from items import add_item, build_item_index, ensure_item_ids
+from datadir import DATA_DIR
+from storage import RevisionConflict, load_user_snapshot, save_user_data
+
+logger = logging.getLogger(__name__)
+
+# Compare-and-swap attempts of one commit before it gives up on a user who is saved continuously
+MAX_SAVE_ATTEMPTS = 5
+
+
+class InvalidEvent(ValueError):
+    """A purchase event that cannot be turned into a grocery item"""
+
+
+def _parse_date(value, field):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise InvalidEvent(f"invalid '{field}' {value!r}, expected YYYY-MM-DD")
+
+
+def event_to_item(event):
+    """Validate a purchase event and convert it to an item dict"""
+    for field in ('username', 'name', 'price'):
+        if not event.get(field):
+            raise InvalidEvent(f"missing '{field}'")
+    category = event.get('category') or get_category_classifier().predict(str(event['name']))
+    if not category:
+        raise InvalidEvent("missing 'category' and none could be predicted from the name")
+    try:
+        price = float(event['price'])
+        quantity = int(event.get('quantity') or 1)
+    except (TypeError, ValueError) as e:
+        raise InvalidEvent(str(e))
+    date_added = _parse_date(event['date'], 'date') if event.get('date') else datetime.now().strftime("%Y-%m-%d")
+    expiry_date = _parse_date(event['expiry_date'], 'expiry_date') if event.get('expiry_date') else None
+    if price <= 0 or quantity < 1:
+        raise InvalidEvent("price must be positive and quantity at least 1")
+    item = {
+        'name': str(event['name']),
+        'category': str(category),
+        'price': price,
+        'quantity': quantity,
+        'unit': event.get('unit') or 'pieces',
+        'date_added': date_added,
+        'expiry_date': expiry_date,
+        'brand': event.get('brand') or None
+    }
+    if event.get('event_id'):
+        item['id'] = str(event['event_id'])
+    return item
+
+
+def commit_items(username, items):
+    """Append a batch of items to a user's stored data with a single write"""
+    for _ in range(MAX_SAVE_ATTEMPTS):
+        grocery_data, budget_data, revision = load_user_snapshot(username)
+        ensure_item_ids(grocery_data)
+        index = build_item_index(grocery_data)
+        added = 0
+        for item in items:
+            if item.get('id') in index:
+                continue
+            add_item(grocery_data, index, item)
+            added += 1
+        if not added:
+            return 0
+        try:
+            # Fails if the app saved the user meanwhile; the batch is then re-applied to that data
+            save_user_data(username, grocery_data, budget_data, expected_revision=revision)
+            return added
+        except RevisionConflict:
+            continue
+    raise RevisionConflict(revision)
+
+
+class IngestPipeline:
+    """Bounded queue -> per-user batches -> coalesced commits"""
+
+    def __init__(self, commit=commit_items, max_queue=10000, max_batch=1000, max_wait=0.05,
+                 max_concurrent_commits=4, max_commit_attempts=3, retry_delay=0.5):
+        self.commit = commit
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_commit_attempts = max_commit_attempts
+        self.retry_delay = retry_delay
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self._commit_slots = asyncio.Semaphore(max_concurrent_commits)
+        self._buffers = {}  # username -> (first_event_time, [items])
+        self._in_flight = {}  # username -> commit task
+        self._failures = {}  # username -> commits failed in a row
+        # Batches given up on after max_commit_attempts, as {'username', 'items', 'error'}
+        self.dead_letters = []
+        self._dispatcher = None
+        self._closing = False
+
+        self.events_in = 0
+        self.events_rejected = 0
+        self.events_committed = 0
+        self.items_added = 0
+        self.batches = 0
+        self.max_batch_size = 0
+        self.max_queue_depth = 0
+        self.backpressure_waits = 0
+        self.commit_errors = 0
+        self.commit_retries = 0
+        self.events_dead_lettered = 0
+        self._commit_latencies = []
+
+    def start(self):
+        """Start the dispatcher on the running event loop"""
+        self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def submit(self, event):
+        """Queue an event, waiting while the queue is full"""
+        if self.queue.full():
+            self.backpressure_waits += 1
+        await self.queue.put(event)
+        self.events_in += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+
+    async def close(self):
+        """Commit everything queued or buffered, then stop"""
+        await self.queue.join()
+        self._closing = True
+        await self.queue.put(None)
+        await self._dispatcher
+
+    def metrics(self):
+        """Queue depth, batch size and commit latency statistics"""
+        latencies = sorted(self._commit_latencies)
+        return {
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'events_in': self.events_in,
+            'events_rejected': self.events_rejected,
+            'events_committed': self.events_committed,
+            'items_added': self.items_added,
+            'batches': self.batches,
+            'avg_batch_size': self.events_committed / self.batches if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'backpressure_waits': self.backpressure_waits,
+            'commit_errors': self.commit_errors,
+            'commit_retries': self.commit_retries,
+            'events_dead_lettered': self.events_dead_lettered,
+            'avg_commit_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            'p95_commit_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+            'max_commit_ms': latencies[-1] * 1000 if latencies else 0.0,
+        }
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._closing:
+                self._flush_ready(loop.time(), force=True)
+                if self._in_flight:
+                    await asyncio.gather(*list(self._in_flight.values()))
+                elif not self._buffers:
+                    return
+                continue
+
+            try:
+                event = await asyncio.wait_for(self.queue.get(), self._next_deadline(loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            else:
+                if event is not None:
+                    self._buffer(event, loop.time())
+                self.queue.task_done()
+            self._flush_ready(loop.time())
+
+    def _buffer(self, event, now):
+        try:
+            item = event_to_item(event)
+        except InvalidEvent as e:
+            self.events_rejected += 1
+            logger.warning("Rejected purchase event %r: %s", event, e)
+            return
+        first_seen, items = self._buffers.setdefault(event['username'], (now, []))
+        items.append(item)
+
+    def _next_deadline(self, now):
+        # Users with a commit in flight are flushed when that commit finishes
+        waiting = [first_seen for username, (first_seen, _) in self._buffers.items()
+                   if username not in self._in_flight]
+        if not waiting:
+            return None
+        return max(min(waiting) + self.max_wait - now, 0)
+
+    def _flush_ready(self, now, force=False, usernames=None):
+        for username in list(usernames or self._buffers):
+            if username in self._in_flight or username not in self._buffers:
+                continue
+            first_seen, items = self._buffers[username]
+            if force or len(items) >= self.max_batch or now - first_seen >= self.max_wait:
+                del self._buffers[username]
+                task = asyncio.get_running_loop().create_task(self._commit(username, items))
+                self._in_flight[username] = task
+
+    async def _commit(self, username, items):
+        async with self._commit_slots:
+            start = time.perf_counter()
+            try:
+                added = await asyncio.to_thread(self.commit, username, items)
+            except Exception as e:
+                self.commit_errors += 1
+                self._commit_failed(username, items, e)
+                failures = self._failures.get(username, 0)
+            else:
+                self._failures.pop(username, None)
+                failures = 0
+                self.events_committed += len(items)
+                self.items_added += added
+                self.batches += 1
+                self.max_batch_size = max(self.max_batch_size, len(items))
+            self._commit_latencies.append(time.perf_counter() - start)
+        if failures:
+            # Back off before the retry; the user stays in flight, so new events keep buffering
+            await asyncio.sleep(self.retry_delay * failures)
+        del self._in_flight[username]
+        # Whatever arrived meanwhile has already waited a full commit: send it now
+        self._flush_ready(asyncio.get_running_loop().time(), force=True, usernames=[username])
+
+
+    def _commit_failed(self, username, items, error):
+        failures = self._failures.get(username, 0) + 1
+        if failures < self.max_commit_attempts:
+            self._failures[username] = failures
+            self.commit_retries += 1
+            logger.warning("Ingest commit failed for %s (%d events), attempt %d of %d: %s",
+                           username, len(items), failures, self.max_commit_attempts, error)
+            # Ahead of whatever arrived meanwhile, keeping the events in order
+            first_seen, buffered = self._buffers.pop(username, (asyncio.get_running_loop().time(), []))
+            self._buffers[username] = (first_seen, items + buffered)
+        else:
+            self._failures.pop(username, None)
+            self.events_dead_lettered += len(items)
+            self.dead_letters.append({'username': username, 'items': items, 'error': repr(error)})
+            logger.error("Ingest commit failed for %s after %d attempts; %d events moved to dead letters",
+                         username, failures, len(items), exc_info=error)
+
+
+REPLAY_CATEGORIES = {
+    "🥬 Fruits & Vegetables": ["Bananas", "Apples", "Tomatoes", "Carrots", "Lettuce"],
+    "🥛 Dairy & Eggs": ["Milk", "Eggs", "Cheddar Cheese", "Butter", "Yogurt"],
+    "🥩 Meat & Seafood": ["Chicken Breast", "Salmon", "Ground Beef"],
+    "🍞 Bakery": ["Sourdough Bread", "Bagels", "Croissant"],
+    "🥤 Beverages": ["Coffee", "Orange Juice", "Sparkling Water"],
+    "🍿 Snacks": ["Potato Chips", "Dark Chocolate", "Almonds"],
+}
+
+
+def generate_events(count, usernames, days=90, seed=None):
+    """Yield synthetic purchase events, as a store webhook would send them"""
+    rng = random.Random(seed)
+    categories = list(REPLAY_CATEGORIES)
+    today = date.today()
+    for n in range(count):
+        category = rng.choice(categories)
+        yield {
+            'username': rng.choice(usernames),
+            'name': rng.choice(REPLAY_CATEGORIES[category]),
+            'category': category,
+            'price': round(rng.uniform(0.5, 15), 2),
+            'quantity': rng.randint(1, 3),
+            'unit': 'pieces',
+            'date': (today - timedelta(days=rng.randint(0, days))).isoformat(),
+            'event_id': f'replay-{n}',
+        }
+
+
+async def replay(events, rate=None, **pipeline_options):
+    """Feed events through a pipeline, optionally throttled to `rate` events/second"""
+    pipeline = IngestPipeline(**pipeline_options)
+    pipeline.start()
+    start = time.perf_counter()
+    for n, event in enumerate(events):
+        if rate:
+            delay = start + n / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await pipeline.submit(event)
+    await pipeline.close()
+    return pipeline, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay synthetic purchase events through the ingest pipeline")
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--rate', type=float, default=None, help='events per second (default: as fast as possible)')
+    parser.add_argument('--max-queue', type=int, default=10000)
+    parser.add_argument('--max-batch', type=int, default=1000)
+    parser.add_argument('--max-wait', type=float, default=0.05, help='seconds a batch may wait before commit')
+    parser.add_argument('--data-dir', default=None, help='working directory of the run; user files go into its GROCERY_DATA_DIR (default: a temp dir)')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    os.chdir(args.data_dir or tempfile.mkdtemp(prefix='grocery-ingest-'))
+    # An absolute GROCERY_DATA_DIR would send the synthetic events into real user data
+    if os.path.commonpath([os.getcwd(), os.path.abspath(DATA_DIR)]) != os.getcwd():
+        sys.exit(f"GROCERY_DATA_DIR ({os.path.abspath(DATA_DIR)}) is outside the run directory {os.getcwd()}; "
+                 f"unset it or point it inside the run directory")
+    usernames = [f'replay{n}' for n in range(args.users)]
+    events = generate_events(args.events, usernames, seed=args.seed)
+    pipeline, elapsed = asyncio.run(replay(
+        events, args.rate, max_queue=args.max_queue, max_batch=args.max_batch, max_wait=args.max_wait
+    ))
+
+    stats = pipeline.metrics()
+    print(f"Ingested {stats['events_committed']} events in {elapsed:.2f} s "
+          f"-> {stats['events_committed'] / elapsed:,.0f} events/s into {os.path.abspath(DATA_DIR)}")
+    for key, value in stats.items():
+        print(f"  {key:<20} {value:,.2f}" if isinstance(value, float) else f"  {key:<20} {value:,}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -0,0 +1,76 @@
+"""Stable grocery item identity and id-indexed list operations.
+
+Every item dict carries a persistent `id`. Alongside the item list we keep an
+index mapping id -> list position, so lookups, edits and removals are O(1).
+Removal swaps the last item into the freed slot; views that care about order
+sort explicitly, so list order is not meaningful.
+"""
+import uuid
+
+
+def new_item_id():
+    """Generate a new unique item ID"""
+    return uuid.uuid4().hex
+
+
+def ensure_item_ids(items):
+    """Give legacy items without an ID a new one, returning how many were assigned"""
+    assigned = 0
+    for item in items:
+        if not item.get('id'):
+            item['id'] = new_item_id()
+            assigned += 1
+    return assigned
+
+
+def build_item_index(items):
+    """Build the id -> list position index for a list of items"""
+    return {item['id']: position for position, item in enumerate(items)}
+
+
+def get_item(items, index, item_id):
+    """Look up an item by ID, or None if it does not exist"""
+    position = index.get(item_id)
+    return items[position] if position is not None else None
+
+
+def add_item(items, index, item):
+    """Append an item, assigning an ID if it has none"""
+    if not item.get('id'):
+        item['id'] = new_item_id()
+    index[item['id']] = len(items)
+    items.append(item)
+    return item
+
+
+def remove_item(items, index, item_id):
+    """Remove an item by ID in O(1), returning the removed item"""
+    position = index.pop(item_id)
+    removed = items[position]
+    last = items.pop()
+    if position < len(items):
+        items[position] = last
+        index[last['id']] = position
+    return removed
+
+
+def update_item(items, index, item_id, changes):
+    """Update an item's fields by ID in O(1), returning the updated item.
+
+    The stored dict is replaced rather than mutated so snapshots already handed
+    to the autosave queue keep their original contents.
+    """
+    position = index[item_id]
+    updated = {**items[position], **changes, 'id': item_id}
+    items[position] = updated
+    return updated
+
+
+def remove_items(items, index, item_ids):
+    """Remove several items by ID in one pass, returning the removed items"""
+    return [remove_item(items, index, item_id) for item_id in item_ids if item_id in index]
+
+
+def update_items(items, index, item_ids, changes):
+    """Apply the same field changes to several items, returning the updated items"""
+    return [update_item(items, index, item_id, changes) for item_id in item_ids if item_id in index]
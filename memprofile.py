@@ -0,0 +1,263 @@
+"""Opt-in tracemalloc profiling of page renders and per-item memory footprint.
+
+Set GROCERY_MEMPROFILE=1 to start `tracemalloc` when the app starts. Each
+page render is then wrapped in `profile(page, user_data)`: a snapshot is
+taken before and after the page function, and the memory still allocated
+afterwards is attributed two ways:
+
+* to the nearest line of this project's code on the allocation's stack
+  (e.g. the `pd.DataFrame(...)` call in `budget_manager`), and
+* to the package that made the allocation (pandas, plotly, streamlit, the
+  project's own modules, ...).
+
+The peak traced memory during the render is recorded as well, since frames
+and figures built for one render are often freed again before it ends.
+Each profiled render also measures the bytes per stored item of the current
+user by decoding a sample of their items while traced.
+
+The report is written as JSON to GROCERY_MEMPROFILE_REPORT after every
+profiled render and is shown on the admin page or printed with
+
+    python memprofile.py [--report PATH] [--page "📈 Analytics"] [--top 10]
+    python memprofile.py --user alice
+
+tracemalloc is process-wide, so profiled renders are serialized and
+allocations made by other threads during a render are counted too. Tracing
+slows every allocation down; leave it off outside of investigations.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from datadir import data_file_path
+from storage import write_json_atomic
+
+ENABLED = os.environ.get('GROCERY_MEMPROFILE', '') not in ('', '0')
+REPORT_PATH = os.environ.get('GROCERY_MEMPROFILE_REPORT', data_file_path('memprofile_report.json'))
+# Stack depth kept per allocation; Streamlit's runtime alone is ~20 frames deep
+TRACE_FRAMES = int(os.environ.get('GROCERY_MEMPROFILE_FRAMES', '40'))
+TOP_LINES = 25
+# Items decoded per user to measure bytes per stored item
+FOOTPRINT_SAMPLE = 500
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# The profiler's own bookkeeping and import machinery are left out of the attribution
+_IGNORED_FILES = (__file__, tracemalloc.__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>')
+
+
+def _package(filename):
+    """The package an allocating file belongs to: a project module, a site-packages top level, or 'python'"""
+    if filename.startswith(ROOT):
+        return os.path.relpath(filename, ROOT)
+    parts = filename.replace('\\', '/').split('/')
+    for marker in ('site-packages', 'dist-packages'):
+        if marker in parts:
+            index = parts.index(marker)
+            if index + 1 < len(parts):
+                return parts[index + 1].removesuffix('.py')
+    return 'python'
+
+
+def _project_site(traceback):
+    """'file:line' of the most recent project frame on an allocation's stack, or None"""
+    for frame in reversed(traceback):
+        if frame.filename.startswith(ROOT):
+            return f"{os.path.relpath(frame.filename, ROOT)}:{frame.lineno}"
+    return None
+
+
+def measure_item_bytes(items, sample_size=FOOTPRINT_SAMPLE):
+    """Bytes per stored item, measured by decoding a sample of the items while traced"""
+    if not items:
+        return 0.0
+    step = max(1, len(items) // sample_size)
+    encoded = json.dumps(items[::step])
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        decoded = json.loads(encoded)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        if started:
+            tracemalloc.stop()
+    return (after - before) / len(decoded)
+
+
+class MemoryProfiler:
+    """Per-page allocation snapshots and per-user item footprints, written as a JSON report"""
+
+    def __init__(self, report_path=REPORT_PATH, frames=TRACE_FRAMES):
+        self.report_path = report_path
+        self.frames = frames
+        # Re-entrant: the admin page reads the report from inside its own profiled render
+        self._lock = threading.RLock()
+        self.pages = {}  # page -> latest measurement and render count
+        self.users = {}  # username -> item footprint at a revision
+
+    @property
+    def enabled(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def profile(self, page, user_data=None):
+        """Context manager measuring one page render; does nothing while tracing is off"""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._profile(page, user_data)
+
+    @contextlib.contextmanager
+    def _profile(self, page, user_data):
+        with self._lock:
+            before = tracemalloc.take_snapshot()
+            traced_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            started = time.perf_counter()
+            try:
+                yield
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                traced_after, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+                self._record(page, before, after, traced_before, traced_after, peak, elapsed_ms)
+                if user_data is not None:
+                    self._measure_user(user_data)
+                self.write_report()
+
+    def _record(self, page, before, after, traced_before, traced_after, peak, elapsed_ms):
+        filters = [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+        differences = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'traceback')
+        sites, packages = {}, {}
+        for difference in differences:
+            if not difference.size_diff:
+                continue
+            traceback = difference.traceback
+            package = _package(traceback[-1].filename)
+            packages[package] = packages.get(package, 0) + difference.size_diff
+            site = _project_site(traceback) or f"({package})"
+            entry = sites.setdefault(site, {'site': site, 'bytes': 0, 'blocks': 0, 'packages': {}})
+            entry['bytes'] += difference.size_diff
+            entry['blocks'] += difference.count_diff
+            entry['packages'][package] = entry['packages'].get(package, 0) + difference.size_diff
+        top_sites = sorted(sites.values(), key=lambda entry: abs(entry['bytes']), reverse=True)[:TOP_LINES]
+        previous = self.pages.get(page, {})
+        self.pages[page] = {
+            'renders': previous.get('renders', 0) + 1,
+            'time': time.time(),
+            'render_ms': elapsed_ms,
+            'retained_bytes': traced_after - traced_before,
+            'peak_bytes': peak - traced_before,
+            'traced_bytes': traced_after,
+            'packages': dict(sorted(packages.items(), key=lambda entry: abs(entry[1]), reverse=True)),
+            'lines': top_sites,
+        }
+
+    def _measure_user(self, user_data):
+        known = self.users.get(user_data.username)
+        if known is not None and known['revision'] == user_data.revision:
+            return
+        items = user_data.grocery_items
+        # Runs after the closing snapshot, so the decoded sample stays out of the page's figures
+        bytes_per_item = measure_item_bytes(items)
+        self.users[user_data.username] = {
+            'items': len(items),
+            'revision': user_data.revision,
+            'bytes_per_item': bytes_per_item,
+            'items_bytes': bytes_per_item * len(items),
+        }
+
+    def report(self):
+        with self._lock:
+            return self._report()
+
+    def _report(self):
+        return {
+            'generated': time.time(),
+            'tracing': self.enabled,
+            'traced_bytes': tracemalloc.get_traced_memory()[0] if self.enabled else None,
+            'pages': self.pages,
+            'users': self.users,
+        }
+
+    def write_report(self):
+        # Renders before the first sign-up run before the data directory exists
+        os.makedirs(os.path.dirname(self.report_path) or '.', exist_ok=True)
+        write_json_atomic(self.report_path, self._report())
+
+
+def load_report(path=REPORT_PATH):
+    """The last report written by a profiled app process, or None if there is none"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_memory_profiler():
+    """Process-wide profiler; tracing starts with it when GROCERY_MEMPROFILE is set"""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = MemoryProfiler()
+            if ENABLED:
+                _profiler.start()
+        return _profiler
+
+
+def _kb(size):
+    return f"{size / 1024:+,.1f} KB"
+
+
+def print_report(report, page=None, top=10, out=sys.stdout):
+    pages = report['pages']
+    if page is not None:
+        pages = {page: pages[page]} if page in pages else {}
+    for name, measurement in sorted(pages.items(), key=lambda entry: entry[1]['retained_bytes'], reverse=True):
+        print(f"{name}: {measurement['renders']} render(s), last {measurement['render_ms']:.0f} ms, "
+              f"retained {_kb(measurement['retained_bytes'])}, peak {_kb(measurement['peak_bytes'])}", file=out)
+        packages = list(measurement['packages'].items())[:5]
+        print("  by package: " + ", ".join(f"{package} {_kb(size)}" for package, size in packages), file=out)
+        for entry in measurement['lines'][:top]:
+            print(f"  {_kb(entry['bytes']):>14}  {entry['blocks']:+8,} blocks  {entry['site']}", file=out)
+    for username, user in report['users'].items():
+        print(f"user {username}: {user['items']:,} items, {user['bytes_per_item']:,.0f} bytes/item, "
+              f"~{user['items_bytes'] / 1024 ** 2:,.1f} MB of items (revision {user['revision']})", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the page memory profile written by the app")
+    parser.add_argument('--report', default=REPORT_PATH, help='report file (default GROCERY_MEMPROFILE_REPORT)')
+    parser.add_argument('--page', help='only show this page')
+    parser.add_argument('--top', type=int, default=10, help='source lines shown per page')
+    parser.add_argument('--user', help="measure this user's bytes per stored item from their data files instead")
+    args = parser.parse_args()
+
+    if args.user:
+        from storage import load_user_data
+        items, _ = load_user_data(args.user)
+        bytes_per_item = measure_item_bytes(items)
+        print(f"{args.user}: {len(items):,} items, {bytes_per_item:,.0f} bytes/item, "
+              f"~{bytes_per_item * len(items) / 1024 ** 2:,.1f} MB of items")
+        return
+
+    report = load_report(args.report)
+    if report is None:
+        sys.exit(f"No report at {args.report}; run the app with GROCERY_MEMPROFILE=1 and open a few pages")
+    print_report(report, args.page, args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Mutation API for one user's grocery items and budgets.
+
+All changes to a user's data go through a UserData object. Each mutation
+updates the item list and id index in place, increments the user's revision
+and notifies subscribers with the resulting change events. The revision only
+ever grows, so it can be used as a cache key for anything derived from the
+data.
+
+Derived views are registered with `derived(name, factory)`. A view that has
+an `apply(event)` method is kept current incrementally; any other view is
+rebuilt lazily on the first access after a change.
+
+One UserData object is shared by all sessions of a user, so mutations and
+derived-view builds hold the object's re-entrant lock. Changes saved by
+other processes are merged in with `apply_remote`, which emits REMOTE events
+for the differences only.
+"""
+import functools
+import logging
+import threading
+
+from events import BUDGET_SET, ITEM_ADDED, ITEM_REMOVED, ITEM_UPDATED, LOCAL, REMOTE, ChangeEvent
+from items import add_item, build_item_index, get_item, remove_item, update_item
+
+logger = logging.getLogger(__name__)
+
+
+def _locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class UserData:
+    """A user's items and budgets with change notification"""
+
+    def __init__(self, username, grocery_items, budget_entries, archive_index=None):
+        self.username = username
+        self.grocery_items = grocery_items
+        self.budget_entries = budget_entries
+        self.item_index = build_item_index(grocery_items)
+        self.archive_index = archive_index or {}
+        self.revision = 0
+        self.lock = threading.RLock()
+        self._subscribers = []
+        self._derived = {}  # name -> (revision built at, view)
+        self.sync = None  # sync.UserSync once the data is tied to its stored revision
+
+    def subscribe(self, callback):
+        """Call `callback(events)` with the events of every later mutation; returns an unsubscribe function"""
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    @_locked
+    def derived(self, name, factory):
+        """A view of this data built by `factory(user_data)`, kept current as the data changes"""
+        entry = self._derived.get(name)
+        if entry is not None and entry[0] in (None, self.revision):
+            return entry[1]
+        view = factory(self)
+        # Incremental views never go stale; the rest are tagged with the revision they saw
+        self._derived[name] = (None if hasattr(view, 'apply') else self.revision, view)
+        return view
+
+    @_locked
+    def invalidate(self, name=None):
+        """Drop one derived view, or all of them, so they are rebuilt on next access"""
+        if name is None:
+            self._derived.clear()
+        else:
+            self._derived.pop(name, None)
+
+    def get_item(self, item_id):
+        return get_item(self.grocery_items, self.item_index, item_id)
+
+    @_locked
+    def add_item(self, item):
+        """Add an item, assigning an ID if it has none"""
+        add_item(self.grocery_items, self.item_index, item)
+        self._emit([self._event(ITEM_ADDED, item=item)])
+        return item
+
+    @_locked
+    def add_items(self, items):
+        """Add several items as one change"""
+        events = []
+        for item in items:
+            add_item(self.grocery_items, self.item_index, item)
+            events.append(self._event(ITEM_ADDED, item=item))
+        self._emit(events)
+        return items
+
+    @_locked
+    def remove_item(self, item_id):
+        """Remove an item by ID, returning it"""
+        removed = remove_item(self.grocery_items, self.item_index, item_id)
+        self._emit([self._event(ITEM_REMOVED, item=removed)])
+        return removed
+
+    @_locked
+    def remove_items(self, item_ids):
+        """Remove several items as one change, skipping unknown IDs"""
+        events = [
+            self._event(ITEM_REMOVED, item=remove_item(self.grocery_items, self.item_index, item_id))
+            for item_id in item_ids if item_id in self.item_index
+        ]
+        self._emit(events)
+        return [event.item for event in events]
+
+    @_locked
+    def update_item(self, item_id, changes):
+        """Change an item's fields, returning the updated item"""
+        previous = self.get_item(item_id)
+        updated = update_item(self.grocery_items, self.item_index, item_id, changes)
+        self._emit([self._event(ITEM_UPDATED, item=updated, previous=previous)])
+        return updated
+
+    @_locked
+    def update_items(self, item_ids, changes):
+        """Apply the same field changes to several items as one change"""
+        events = []
+        for item_id in item_ids:
+            previous = self.get_item(item_id)
+            if previous is not None:
+                updated = update_item(self.grocery_items, self.item_index, item_id, changes)
+                events.append(self._event(ITEM_UPDATED, item=updated, previous=previous))
+        self._emit(events)
+        return [event.item for event in events]
+
+    @_locked
+    def set_budget(self, category, allocated_amount, month):
+        """Create or replace the budget for a category and month"""
+        new_budget = {
+            'category': category,
+            'allocated_amount': allocated_amount,
+            'spent_amount': 0,
+            'month': month
+        }
+        previous = None
+        for i, budget in enumerate(self.budget_entries):
+            if budget['category'] == category and budget['month'] == month:
+                previous = budget
+                self.budget_entries[i] = new_budget
+                break
+        else:
+            self.budget_entries.append(new_budget)
+        self._emit([self._event(BUDGET_SET, budget=new_budget, previous=previous)])
+        return new_budget
+
+    @_locked
+    def apply_remote(self, grocery_items, budget_entries):
+        """Bring the data to a state saved by another session, emitting REMOTE events for the differences"""
+        target = {item['id']: item for item in grocery_items}
+        events = [
+            self._event(ITEM_REMOVED, origin=REMOTE, item=remove_item(self.grocery_items, self.item_index, item_id))
+            for item_id in [item_id for item_id in self.item_index if item_id not in target]
+        ]
+        for item in grocery_items:
+            current = self.get_item(item['id'])
+            if current is None:
+                add_item(self.grocery_items, self.item_index, item)
+                events.append(self._event(ITEM_ADDED, origin=REMOTE, item=item))
+            elif current != item:
+                updated = update_item(self.grocery_items, self.item_index, item['id'], item)
+                events.append(self._event(ITEM_UPDATED, origin=REMOTE, item=updated, previous=current))
+        positions = {(budget['month'], budget['category']): i for i, budget in enumerate(self.budget_entries)}
+        for budget in budget_entries:
+            position = positions.get((budget['month'], budget['category']))
+            previous = self.budget_entries[position] if position is not None else None
+            if previous == budget:
+                continue
+            if position is None:
+                self.budget_entries.append(budget)
+            else:
+                self.budget_entries[position] = budget
+            events.append(self._event(BUDGET_SET, origin=REMOTE, budget=budget, previous=previous))
+        self._emit(events)
+        return events
+
+    def _event(self, kind, origin=LOCAL, **fields):
+        self.revision += 1
+        return ChangeEvent(kind, self.revision, origin=origin, **fields)
+
+    def _emit(self, events):
+        if not events:
+            return
+        for name, (built_at, view) in list(self._derived.items()):
+            if built_at is None:
+                try:
+                    for event in events:
+                        view.apply(event)
+                except Exception:
+                    logger.exception("Derived view %r failed to apply changes; rebuilding it", name)
+                    del self._derived[name]
+        for callback in list(self._subscribers):
+            try:
+                callback(events)
+            except Exception:
+                # One broken subscriber must not undo or block the mutation itself
+                logger.exception("Change subscriber %r failed for %s", callback, self.username)
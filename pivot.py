@@ -0,0 +1,126 @@
+"""Category × month pivot of spending against budgets.
+
+One matrix per measure (spent, budget, variance) with a row per category
+and a column per calendar month, covering every month from the first
+purchase or budget to the last. Live items are aggregated with a single
+`np.bincount` over (category, month) cells; archived months contribute
+their per-category summaries directly. The pivot is materialized once per
+data revision, so the report page only slices and formats it.
+"""
+import csv
+import io
+import re
+import time
+
+import numpy as np
+
+
+_MONTH = re.compile(r'(\d{4})-(\d{1,2})')
+
+
+def normalize_month(value):
+    """`value` as YYYY-MM ('2025-7' -> '2025-07'), or None if it is not a year and month"""
+    match = _MONTH.fullmatch(value) if isinstance(value, str) else None
+    if match is None or not 1 <= int(match[2]) <= 12:
+        return None
+    return f"{match[1]}-{int(match[2]):02d}"
+
+
+def month_range(first, last):
+    """All months from `first` to `last` (YYYY-MM), inclusive"""
+    first_year, first_month = map(int, first.split('-'))
+    last_year, last_month = map(int, last.split('-'))
+    return [
+        f"{index // 12:04d}-{index % 12 + 1:02d}"
+        for index in range(first_year * 12 + first_month - 1, last_year * 12 + last_month)
+    ]
+
+
+class CategoryMonthPivot:
+    """Spent, budget and variance matrices indexed by category and month"""
+
+    def __init__(self, categories, months, spent, budget, build_ms=0.0):
+        self.categories = categories
+        self.months = months
+        self.spent = spent
+        # NaN where no budget was set for the category and month
+        self.budget = budget
+        self.variance = budget - spent
+        self.build_ms = build_ms
+        self._csv = None
+
+    @classmethod
+    def from_user_data(cls, user_data):
+        return build_pivot(user_data.grocery_items, user_data.budget_entries, user_data.archive_index)
+
+    def measure(self, name):
+        """The matrix for 'spent', 'budget' or 'variance'"""
+        return {'spent': self.spent, 'budget': self.budget, 'variance': self.variance}[name]
+
+    def to_csv(self):
+        """Long-format CSV with one row per category and month that has spending or a budget"""
+        if self._csv is None:
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerow(['category', 'month', 'spent', 'budget', 'variance'])
+            rows, columns = np.nonzero((self.spent != 0) | ~np.isnan(self.budget))
+            for row, column in zip(rows, columns):
+                budget = self.budget[row, column]
+                has_budget = not np.isnan(budget)
+                writer.writerow([
+                    self.categories[row],
+                    self.months[column],
+                    f"{self.spent[row, column]:.2f}",
+                    f"{budget:.2f}" if has_budget else '',
+                    f"{self.variance[row, column]:.2f}" if has_budget else '',
+                ])
+            self._csv = out.getvalue()
+        return self._csv
+
+
+def build_pivot(items, budget_entries, archive_index=None):
+    """Build the category × month pivot for a user's items, budgets and archived months"""
+    start = time.perf_counter()
+    archive_index = archive_index or {}
+    # Code each distinct category and month as it is first seen; cells are aggregated in one bincount
+    category_codes, month_codes = {}, {}
+    item_categories = [category_codes.setdefault(item['category'], len(category_codes)) for item in items]
+    item_months = [month_codes.setdefault(item['date_added'][:7], len(month_codes)) for item in items]
+    amounts = np.fromiter((item['price'] * item['quantity'] for item in items), dtype=float, count=len(items))
+    # Months that are not YYYY-MM (free-text budget months, unparseable dates) are left out
+    item_month_names = {code: normalize_month(month) for month, code in month_codes.items()}
+    budgets = [(entry, normalize_month(entry['month'])) for entry in budget_entries]
+    budgets = [(entry, month) for entry, month in budgets if month is not None]
+
+    categories = sorted(
+        set(category_codes)
+        | {entry['category'] for entry in budget_entries}
+        | {category for summary in archive_index.values() for category in summary['categories']}
+    )
+    known_months = ({month for month in item_month_names.values() if month}
+                    | {month for _, month in budgets} | set(archive_index))
+    if not known_months:
+        return CategoryMonthPivot([], [], np.zeros((0, 0)), np.zeros((0, 0)), 0.0)
+    months = month_range(min(known_months), max(known_months))
+
+    category_rows = {category: row for row, category in enumerate(categories)}
+    month_columns = {month: column for column, month in enumerate(months)}
+    shape = (len(categories), len(months))
+
+    spent = np.zeros(shape)
+    if items:
+        code_rows = np.array([category_rows[category] for category in category_codes])
+        code_columns = np.array([month_columns.get(item_month_names[code], -1) for code in range(len(month_codes))])
+        item_columns = code_columns[item_months]
+        dated = item_columns >= 0
+        cells = code_rows[item_categories][dated] * shape[1] + item_columns[dated]
+        spent += np.bincount(cells, weights=amounts[dated], minlength=spent.size).reshape(shape)
+    for month, summary in archive_index.items():
+        for category, values in summary['categories'].items():
+            spent[category_rows[category], month_columns[month]] += values['total']
+
+    budget = np.full(shape, np.nan)
+    for entry, month in budgets:
+        budget[category_rows[entry['category']], month_columns[month]] = entry['allocated_amount']
+
+    return CategoryMonthPivot(categories, months, spent, budget, (time.perf_counter() - start) * 1000)
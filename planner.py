@@ -0,0 +1,151 @@
+"""Budget-constrained shopping list planner.
+
+Given a list of candidate purchases and the remaining budget per category,
+choose how many units of each candidate to buy so that the total priority of
+the plan is as high as possible without overspending any category.
+
+Each category is an independent bounded knapsack. Prices are converted to
+whole budget cells (cents, or coarser for large budgets, always rounding
+prices up so a plan never exceeds the real budget). Quantities are split
+into power-of-two bundles, turning the problem into a 0/1 knapsack that is
+solved one bundle at a time with a vectorized numpy update over all
+capacities. When a category is too large for the DP table, a greedy pass by
+priority per euro is used instead.
+
+A candidate is a dict:
+
+    {"name": "Milk", "category": "🥛 Dairy & Eggs", "price": 1.29,
+     "quantity": 2, "priority": 4}
+
+`quantity` is the most units wanted; `priority` runs from 1 (nice to have)
+to 5 (essential).
+"""
+import time
+
+import numpy as np
+
+PRIORITY_LEVELS = {1: "Nice to have", 2: "Low", 3: "Medium", 4: "High", 5: "Essential"}
+# Weight of one unit per priority level: one essential unit outweighs several
+# nice-to-have ones, but not an unlimited number of them
+PRIORITY_VALUES = {level: level ** 2 for level in PRIORITY_LEVELS}
+
+MAX_CAPACITY_CELLS = 20000
+# Above this many bundle x capacity cells a category switches to the greedy
+# fallback, which keeps interactive plans of a few hundred items under 100 ms
+MAX_DP_CELLS = 5_000_000
+
+
+def _bundles(quantity):
+    """Split a quantity into power-of-two bundles that can form any count up to it"""
+    bundles = []
+    size = 1
+    while quantity > 0:
+        take = min(size, quantity)
+        bundles.append(take)
+        quantity -= take
+        size *= 2
+    return bundles
+
+
+def _solve_dp(prices, values, quantities, budget):
+    """Exact bounded knapsack; returns units chosen per candidate"""
+    cell = max(0.01, budget / MAX_CAPACITY_CELLS)
+    capacity = int(budget / cell + 1e-9)
+    costs = np.ceil(np.asarray(prices) / cell - 1e-9).astype(np.int64)
+
+    owners, bundle_costs, bundle_values, bundle_sizes = [], [], [], []
+    for i, quantity in enumerate(quantities):
+        for size in _bundles(quantity):
+            owners.append(i)
+            bundle_costs.append(costs[i] * size)
+            bundle_values.append(values[i] * size)
+            bundle_sizes.append(size)
+
+    best = np.zeros(capacity + 1)
+    taken = np.zeros((len(owners), capacity + 1), dtype=bool)
+    for b, (cost, value) in enumerate(zip(bundle_costs, bundle_values)):
+        if cost > capacity:
+            continue
+        candidate = best[:capacity + 1 - cost] + value
+        improved = candidate > best[cost:]
+        # The right-hand side is evaluated before assignment, so each bundle is used at most once
+        best[cost:] = np.where(improved, candidate, best[cost:])
+        taken[b, cost:] = improved
+
+    chosen = [0] * len(quantities)
+    remaining = capacity
+    for b in range(len(owners) - 1, -1, -1):
+        if taken[b, remaining]:
+            chosen[owners[b]] += bundle_sizes[b]
+            remaining -= bundle_costs[b]
+    return chosen
+
+
+def _solve_greedy(prices, values, quantities, budget):
+    """Fill the budget by value per euro; fast but not always optimal"""
+    order = sorted(range(len(prices)), key=lambda i: values[i] / prices[i], reverse=True)
+    chosen = [0] * len(prices)
+    left = budget
+    for i in order:
+        units = min(quantities[i], int(left / prices[i] + 1e-9))
+        chosen[i] = units
+        left -= units * prices[i]
+    return chosen
+
+
+def plan_shopping_list(candidates, remaining_by_category, method='auto'):
+    """Choose units per candidate within each category's remaining budget.
+
+    Categories missing from `remaining_by_category` have no budget set and
+    are bought in full. Returns the chosen items, per-category totals, the
+    candidates that did not fit, and the solve time.
+    """
+    start = time.perf_counter()
+    by_category = {}
+    for position, candidate in enumerate(candidates):
+        if candidate['price'] > 0 and candidate['quantity'] >= 1:
+            by_category.setdefault(candidate['category'], []).append(position)
+
+    chosen_units = {}
+    categories = {}
+    for category, positions in by_category.items():
+        prices = [float(candidates[p]['price']) for p in positions]
+        quantities = [int(candidates[p]['quantity']) for p in positions]
+        values = [PRIORITY_VALUES[int(candidates[p].get('priority') or 3)] for p in positions]
+
+        if category not in remaining_by_category:
+            units, used_method, budget = quantities, 'unbudgeted', None
+        else:
+            budget = max(0.0, float(remaining_by_category[category]))
+            bundle_count = sum(len(_bundles(q)) for q in quantities)
+            cells = min(MAX_CAPACITY_CELLS, int(budget * 100)) + 1
+            use_dp = method == 'dp' or (method == 'auto' and bundle_count * cells <= MAX_DP_CELLS)
+            solver = _solve_dp if use_dp else _solve_greedy
+            units = solver(prices, values, quantities, budget) if budget > 0 else [0] * len(positions)
+            used_method = 'dp' if use_dp else 'greedy'
+
+        chosen_units.update(zip(positions, units))
+        planned = sum(price * unit for price, unit in zip(prices, units))
+        categories[category] = {
+            'budget': budget,
+            'planned': planned,
+            'left': budget - planned if budget is not None else None,
+            'priority_value': sum(value * unit for value, unit in zip(values, units)),
+            'method': used_method,
+        }
+
+    selected, skipped = [], []
+    for position, candidate in enumerate(candidates):
+        units = chosen_units.get(position, 0)
+        if units:
+            selected.append({**candidate, 'quantity': units, 'total': units * candidate['price']})
+        if units < candidate['quantity']:
+            skipped.append({**candidate, 'quantity': candidate['quantity'] - units})
+
+    return {
+        'selected': selected,
+        'skipped': skipped,
+        'categories': categories,
+        'total': sum(item['total'] for item in selected),
+        'elapsed_ms': (time.perf_counter() - start) * 1000,
+    }
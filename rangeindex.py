@@ -0,0 +1,208 @@
+"""Prefix-sum index for spending over arbitrary date ranges.
+
+Spend and item counts are kept as cumulative sums over days, one row per
+category plus a row for the daily total, so the spend of any [start, end]
+range is `cum[end + 1] - cum[start]`: O(categories) NumPy work however many
+items the user has. The index is built once per user and kept current from
+change events; an edit only adds its amount to the suffix of one row.
+
+Archived months contribute their per-day totals to the total row and their
+per-category summaries at the first day of the month, so category figures
+for archived months are resolved to whole months.
+"""
+import time
+
+import numpy as np
+
+from events import ITEM_ADDED, ITEM_REMOVED, ITEM_UPDATED
+
+ONE_DAY = np.timedelta64(1, 'D')
+
+
+def _day(value):
+    return np.datetime64(value, 'D')
+
+
+def _parse_day(value):
+    try:
+        return _day(value)
+    except (ValueError, TypeError):
+        return np.datetime64('NaT')
+
+
+def _live_days(items):
+    """date_added of each item as datetime64[D], NaT where it is missing or free text"""
+    dates = [item['date_added'] for item in items]
+    try:
+        return np.array(dates, dtype='datetime64[D]')
+    except (ValueError, TypeError):
+        return np.array([_parse_day(value) for value in dates], dtype='datetime64[D]')
+
+
+class SpendRangeIndex:
+    """Cumulative spend and item counts per category and day"""
+
+    def __init__(self):
+        self.first_day = None
+        self.categories = []
+        self._rows = {}  # category -> row in the cumulative arrays
+        # Column d holds the sum over all days before first_day + d
+        self._spend = np.zeros((0, 1))
+        self._counts = np.zeros((0, 1), dtype=np.int64)
+        self._total = np.zeros(1)
+        self.last_query_us = 0.0
+
+    @classmethod
+    def from_user_data(cls, user_data):
+        return cls.from_items(user_data.grocery_items, user_data.archive_index)
+
+    @classmethod
+    def from_items(cls, items, archive_index=None):
+        """Build the index from live items and the archive's month summaries in one vectorized pass"""
+        archive_index = archive_index or {}
+        live_days = _live_days(items)
+        dated = ~np.isnat(live_days)
+        if not dated.all():
+            # Items without a usable date cannot be placed on the day axis and are left out
+            items = [item for item, keep in zip(items, dated.tolist()) if keep]
+            live_days = live_days[dated]
+        month_days, categories, amounts, counts = [], [], [], []
+        for item in items:
+            categories.append(item['category'])
+            amounts.append(item['price'] * item['quantity'])
+            counts.append(1)
+        for month, summary in archive_index.items():
+            for category, values in summary['categories'].items():
+                month_days.append(f"{month}-01")
+                categories.append(category)
+                amounts.append(values['total'])
+                counts.append(values['count'])
+        archived_days = [day for summary in archive_index.values() for day in summary['daily']]
+
+        index = cls()
+        if not categories and not archived_days:
+            return index
+        day_values = np.concatenate([live_days, np.array(month_days + archived_days, dtype='datetime64[D]')])
+        index.first_day = day_values.min()
+        n_days = int((day_values.max() - index.first_day) // ONE_DAY) + 1
+
+        index.categories = sorted(set(categories))
+        index._rows = {category: row for row, category in enumerate(index.categories)}
+        offsets = ((day_values[:len(categories)] - index.first_day) // ONE_DAY).astype(np.int64)
+        rows = np.array([index._rows[category] for category in categories], dtype=np.int64)
+        cells = rows * n_days + offsets
+        shape = (len(index.categories), n_days)
+        spend = np.bincount(cells, weights=amounts, minlength=shape[0] * n_days).reshape(shape)
+        item_counts = np.bincount(cells, weights=counts, minlength=shape[0] * n_days).reshape(shape)
+
+        # The total row uses exact per-day archive totals instead of the month-start category figures
+        daily = np.bincount(offsets[:len(items)], weights=amounts[:len(items)], minlength=n_days)
+        if archived_days:
+            archived_offsets = ((day_values[len(categories):] - index.first_day) // ONE_DAY).astype(np.int64)
+            archived_amounts = [amount for summary in archive_index.values() for amount in summary['daily'].values()]
+            daily += np.bincount(archived_offsets, weights=archived_amounts, minlength=n_days)
+
+        index._spend = np.concatenate([np.zeros((shape[0], 1)), np.cumsum(spend, axis=1)], axis=1)
+        index._counts = np.concatenate(
+            [np.zeros((shape[0], 1), dtype=np.int64), np.cumsum(item_counts, axis=1).astype(np.int64)], axis=1
+        )
+        index._total = np.concatenate([[0.0], np.cumsum(daily)])
+        return index
+
+    @property
+    def day_count(self):
+        return self._total.shape[0] - 1
+
+    def bounds(self):
+        """First and last day covered, as dates, or None when there is no data"""
+        if self.first_day is None:
+            return None
+        last_day = self.first_day + (self.day_count - 1) * ONE_DAY
+        return self.first_day.item(), last_day.item()
+
+    def apply(self, event):
+        """Update the index from one change event"""
+        if event.kind == ITEM_ADDED:
+            self._add(event.item, 1)
+        elif event.kind == ITEM_REMOVED:
+            self._add(event.item, -1)
+        elif event.kind == ITEM_UPDATED:
+            self._add(event.previous, -1)
+            self._add(event.item, 1)
+
+    def total(self, start, end):
+        """Total spend from `start` to `end`, inclusive"""
+        i, j = self._columns(start, end)
+        return float(self._total[j] - self._total[i]) if i < j else 0.0
+
+    def category_totals(self, start, end):
+        """Spend per category from `start` to `end`, leaving out categories with none"""
+        query_start = time.perf_counter()
+        i, j = self._columns(start, end)
+        totals = {}
+        if i < j:
+            spend = self._spend[:, j] - self._spend[:, i]
+            counts = self._counts[:, j] - self._counts[:, i]
+            totals = {category: float(spend[row]) for row, category in enumerate(self.categories) if counts[row]}
+        self.last_query_us = (time.perf_counter() - query_start) * 1e6
+        return totals
+
+    def category_counts(self, start, end):
+        """Number of items per category from `start` to `end`, leaving out categories with none"""
+        i, j = self._columns(start, end)
+        if i >= j:
+            return {}
+        counts = self._counts[:, j] - self._counts[:, i]
+        return {category: int(counts[row]) for row, category in enumerate(self.categories) if counts[row]}
+
+    def daily_totals(self, start, end):
+        """Days with spending from `start` to `end` and the spend on each, as NumPy arrays"""
+        i, j = self._columns(start, end)
+        if i >= j:
+            return np.array([], dtype='datetime64[D]'), np.array([])
+        amounts = np.diff(self._total[i:j + 1])
+        spent = np.flatnonzero(np.abs(amounts) > 1e-9)
+        return self.first_day + (i + spent) * ONE_DAY, amounts[spent]
+
+    def _columns(self, start, end):
+        if self.first_day is None:
+            return 0, 0
+        i = int((_day(start) - self.first_day) // ONE_DAY)
+        j = int((_day(end) - self.first_day) // ONE_DAY) + 1
+        return max(0, i), min(self.day_count, j)
+
+    def _add(self, item, sign):
+        day = _parse_day(item['date_added'])
+        if np.isnat(day):
+            return
+        self._cover(day, item['category'])
+        column = int((day - self.first_day) // ONE_DAY) + 1
+        row = self._rows[item['category']]
+        amount = sign * item['price'] * item['quantity']
+        self._spend[row, column:] += amount
+        self._counts[row, column:] += sign
+        self._total[column:] += amount
+
+    def _cover(self, day, category):
+        """Grow the arrays so they include `day` and have a row for `category`"""
+        if category not in self._rows:
+            self._rows[category] = len(self.categories)
+            self.categories.append(category)
+            self._spend = np.vstack([self._spend, np.zeros((1, self._spend.shape[1]))])
+            self._counts = np.vstack([self._counts, np.zeros((1, self._counts.shape[1]), dtype=np.int64)])
+        if self.first_day is None:
+            self.first_day = day
+            self._spend = np.zeros((len(self.categories), 2))
+            self._counts = np.zeros((len(self.categories), 2), dtype=np.int64)
+            self._total = np.zeros(2)
+            return
+        before = max(0, int((self.first_day - day) // ONE_DAY))
+        after = max(0, int((day - self.first_day) // ONE_DAY) - self.day_count + 1)
+        if before or after:
+            # Nothing precedes the old first day; later days carry the final cumulative value forward
+            self._spend = np.pad(self._spend, ((0, 0), (before, 0)))
+            self._spend = np.pad(self._spend, ((0, 0), (0, after)), mode='edge')
+            self._counts = np.pad(self._counts, ((0, 0), (before, 0)))
+            self._counts = np.pad(self._counts, ((0, 0), (0, after)), mode='edge')
+            self._total = np.pad(np.pad(self._total, (before, 0)), (0, after), mode='edge')
+            self.first_day -= before * ONE_DAY
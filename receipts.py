@@ -0,0 +1,181 @@
+"""Free-text receipt parsing for multi-item entry.
+
+Receipt text is parsed line by line with a small set of precompiled
+patterns, tried from most to least specific:
+
+    Apples 1.234 kg @ 2.49/kg   3.07      weighed item
+    Yogurt 4 x 0.89   3.56                quantity x unit price [total]
+    3 x Bagels   2.97                     quantity prefix, line total
+    BANANAS   1,29 A                      name and price (tax code optional)
+
+Totals, payment lines, separators and other non-item lines are skipped; the
+first date found becomes the receipt date. Parsing is a generator over any
+iterable of lines (a list, a string's lines or an open file), so large
+receipts are processed as a stream.
+
+    python receipts.py sample_receipts/supermarket.txt
+"""
+import argparse
+import re
+from datetime import datetime
+
+from classifier import get_category_classifier
+
+
+def _price(group):
+    return rf'€?\s*(?P<{group}>\d{{1,6}}[.,]\d{{2}})'
+
+
+# Optional currency and trailing tax code ("A", "B1", "*")
+_TAIL = r'\s*(?:EUR|€)?\s*(?:[A-Z]{1,2}\d?|\*)?\s*$'
+
+WEIGHED_RE = re.compile(
+    r'^(?P<name>.+?)\s+(?P<amount>\d+(?:[.,]\d+)?)\s*(?P<unit>kg|g|lbs?|l|ml)\s*(?:@|x|×)\s*'
+    + _price('unit_price') + r'\s*(?:/\s*(?:kg|lbs?|l))?\s+' + _price('total') + _TAIL,
+    re.IGNORECASE
+)
+MULTI_RE = re.compile(
+    r'^(?P<name>.+?)\s+(?P<quantity>\d{1,3})\s*[x×@]\s*' + _price('unit_price')
+    + r'(?:\s+' + _price('total') + r')?' + _TAIL,
+    re.IGNORECASE
+)
+# Cheap searches that rule out most lines before the backtracking patterns above run
+WEIGHED_HINT_RE = re.compile(r'\d\s*(?:kg|g|lbs?|l|ml)\s*[@x×]', re.IGNORECASE)
+MULTI_HINT_RE = re.compile(r'\d\s*[x×@]\s*€?\s*\d', re.IGNORECASE)
+PREFIX_RE = re.compile(r'^(?P<quantity>\d{1,3})\s*[x×]\s+(?P<name>.+?)\s+' + _price('total') + _TAIL, re.IGNORECASE)
+SIMPLE_RE = re.compile(r'^(?P<name>.*?[^\W\d_].*?)\s+' + _price('total') + _TAIL, re.IGNORECASE)
+
+SKIP_RE = re.compile(
+    r'\b(?:sub-?total|total|tax|vat|mwst|change|cash|card|visa|mastercard|debit|credit|balance|amount due|'
+    r'tender(?:ed)?|payment|paid|rounding|savings|you saved|thank you|items? sold|auth code)\b',
+    re.IGNORECASE
+)
+SEPARATOR_RE = re.compile(r'^[\s\-=*_#.~]*$')
+ITEM_CODE_RE = re.compile(r'^\d{4,}\s+')
+DATE_RE = re.compile(r'\b(?:(\d{4})-(\d{2})-(\d{2})|(\d{1,2})[./](\d{1,2})[./](\d{4}|\d{2}))\b')
+
+MAX_SKIPPED_KEPT = 20
+
+# Receipt weight/volume units mapped onto the app's units and a factor into them
+UNITS = {'kg': ('kg', 1), 'g': ('kg', 0.001), 'lb': ('lbs', 1), 'lbs': ('lbs', 1), 'l': ('liters', 1), 'ml': ('liters', 0.001)}
+
+
+def _amount(text):
+    return float(text.replace(',', '.'))
+
+
+def _clean_name(name):
+    name = ITEM_CODE_RE.sub('', name.strip()).strip(' .:-')
+    return name.title() if name.isupper() else name
+
+
+def _parse_date(match):
+    year, month, day = match.group(1, 2, 3)
+    if year is None:
+        day, month, year = match.group(4, 5, 6)
+        if len(year) == 2:
+            year = '20' + year
+    try:
+        return datetime(int(year), int(month), int(day)).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _line_item(name, quantity, unit_price, total):
+    """A pieces item; if unit price × quantity misses the line total (multi-buy deals, rounding),
+    one unit priced at the line total, like weighed items, so spending stays exact"""
+    if abs(unit_price * quantity - total) < 0.005:
+        return {'name': name, 'quantity': quantity, 'unit': 'pieces', 'price': unit_price, 'total': total}
+    return {'name': f"{name} ({quantity} pieces)", 'quantity': 1, 'unit': 'pieces', 'price': total, 'total': total}
+
+
+def parse_line(line):
+    """Parse one receipt line into {name, quantity, unit, price, total}, or None if it is not an item"""
+    line = line.strip()
+    if not line or SEPARATOR_RE.match(line) or SKIP_RE.search(line):
+        return None
+
+    match = WEIGHED_HINT_RE.search(line) and WEIGHED_RE.match(line)
+    if match:
+        # Weighed items are stored as one unit priced at the line total, so spending stays exact
+        unit, factor = UNITS[match['unit'].lower()]
+        total = _amount(match['total'])
+        name = f"{_clean_name(match['name'])} ({_amount(match['amount']) * factor:g} {unit})"
+        return {'name': name, 'quantity': 1, 'unit': unit, 'price': total, 'total': total}
+
+    match = MULTI_HINT_RE.search(line) and MULTI_RE.match(line)
+    if match:
+        quantity = int(match['quantity'])
+        unit_price = _amount(match['unit_price'])
+        total = _amount(match['total']) if match['total'] else round(unit_price * quantity, 2)
+        return _line_item(_clean_name(match['name']), quantity, unit_price, total)
+
+    match = PREFIX_RE.match(line)
+    if match:
+        quantity = max(1, int(match['quantity']))
+        total = _amount(match['total'])
+        return _line_item(_clean_name(match['name']), quantity, round(total / quantity, 2), total)
+
+    match = SIMPLE_RE.match(line)
+    if match:
+        name = _clean_name(match['name'])
+        total = _amount(match['total'])
+        if name and total > 0:
+            return {'name': name, 'quantity': 1, 'unit': 'pieces', 'price': total, 'total': total}
+    return None
+
+
+class ReceiptParser:
+    """Streaming receipt parser that also records the receipt date and skipped lines"""
+
+    def __init__(self):
+        self.date = None
+        self.lines = 0
+        self.skipped_count = 0
+        self.skipped = []  # the first MAX_SKIPPED_KEPT non-item lines, for display
+
+    def parse(self, lines):
+        """Yield one item dict per item line of `lines`"""
+        for line_no, line in enumerate(lines, start=self.lines + 1):
+            self.lines = line_no
+            if self.date is None:
+                date_match = DATE_RE.search(line)
+                if date_match:
+                    self.date = _parse_date(date_match)
+                    continue
+            item = parse_line(line)
+            if item is None:
+                if line.strip() and not SEPARATOR_RE.match(line):
+                    self.skipped_count += 1
+                    if len(self.skipped) < MAX_SKIPPED_KEPT:
+                        self.skipped.append(line.strip())
+                continue
+            item['line'] = line_no
+            yield item
+
+
+def categorize(items):
+    """Fill in a predicted category for each parsed item (None when nothing is known)"""
+    classifier = get_category_classifier()
+    for item in items:
+        item['category'] = classifier.predict(item['name'])
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a receipt text file into grocery items")
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    receipt = ReceiptParser()
+    with open(args.path, encoding='utf-8') as f:
+        items = list(receipt.parse(f))
+    print(f"{len(items)} items from {receipt.lines} lines, date {receipt.date or 'unknown'}")
+    for item in items:
+        print(f"  {item['name']:<32} {item['quantity']:>3} {item['unit']:<7} €{item['price']:>7.2f}  €{item['total']:>7.2f}")
+    if receipt.skipped_count:
+        print(f"Skipped {receipt.skipped_count} non-item lines, e.g. {receipt.skipped[:5]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""Recurring-purchase detection and replenishment predictions.
+
+Items are grouped by normalized name. For each name the model keeps the
+sorted distinct purchase days and the running sum and sum of squares of the
+gaps between them, so the mean interval and its variance are available at
+any time. Adding or removing a purchase only splits or merges the gaps next
+to that day, which is O(log n) per change instead of a rescan of the
+history. The initial build is vectorized: one sort over (name, day) and
+grouped sums of the day differences.
+
+A name counts as recurring once it has been bought on MIN_PURCHASE_DAYS
+different days at reasonably regular intervals of at most MAX_INTERVAL_DAYS.
+Its next purchase is predicted at the last purchase plus the mean interval.
+"""
+import bisect
+import math
+from collections import Counter
+from datetime import date, timedelta
+
+import numpy as np
+
+from copurchase import item_key
+from events import ITEM_ADDED, ITEM_REMOVED, ITEM_UPDATED
+
+MIN_PURCHASE_DAYS = 4
+# Coefficient of variation of the interval above which purchases are not treated as a routine
+MAX_INTERVAL_CV = 0.5
+# Longer average intervals are occasional purchases, not replenishment
+MAX_INTERVAL_DAYS = 60
+DUE_SOON_DAYS = 3
+# Names overdue by more than this many mean intervals are considered dropped from the routine
+LAPSED_INTERVALS = 1
+
+
+def _day_ordinal(value):
+    """Day ordinal of an ISO date or timestamp, or None for free text the model cannot place"""
+    try:
+        return date.fromisoformat(value[:10]).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+class _History:
+    __slots__ = ('days', 'day_counts', 'gap_sum', 'gap_squares', 'latest')
+
+    def __init__(self):
+        self.days = []  # sorted distinct day ordinals
+        self.day_counts = Counter()
+        self.gap_sum = 0
+        self.gap_squares = 0
+        self.latest = None  # most recent item, for display
+
+    def _add_gap(self, gap, sign):
+        self.gap_sum += sign * gap
+        self.gap_squares += sign * gap * gap
+
+    def add_day(self, day):
+        self.day_counts[day] += 1
+        if self.day_counts[day] > 1:
+            return
+        position = bisect.bisect_left(self.days, day)
+        before = self.days[position - 1] if position > 0 else None
+        after = self.days[position] if position < len(self.days) else None
+        if before is not None and after is not None:
+            self._add_gap(after - before, -1)
+        if before is not None:
+            self._add_gap(day - before, 1)
+        if after is not None:
+            self._add_gap(after - day, 1)
+        self.days.insert(position, day)
+
+    def remove_day(self, day):
+        if self.day_counts[day] == 0:
+            return
+        self.day_counts[day] -= 1
+        if self.day_counts[day]:
+            return
+        del self.day_counts[day]
+        position = bisect.bisect_left(self.days, day)
+        before = self.days[position - 1] if position > 0 else None
+        after = self.days[position + 1] if position + 1 < len(self.days) else None
+        if before is not None:
+            self._add_gap(day - before, -1)
+        if after is not None:
+            self._add_gap(after - day, -1)
+        if before is not None and after is not None:
+            self._add_gap(after - before, 1)
+        del self.days[position]
+
+
+class RecurringPurchases:
+    """Per-name purchase intervals for one user, kept current from change events"""
+
+    def __init__(self):
+        self.histories = {}  # item key -> _History
+
+    @classmethod
+    def from_user_data(cls, user_data):
+        return cls.from_items(user_data.grocery_items)
+
+    @classmethod
+    def from_items(cls, items):
+        """Build all histories with one sort and grouped NumPy sums instead of per-item updates"""
+        model = cls()
+        ordinals = [_day_ordinal(item['date_added']) for item in items]
+        # Items without a usable date cannot be placed in a history and are left out
+        items = [item for item, day in zip(items, ordinals) if day is not None]
+        if not items:
+            return model
+        key_codes = {}
+        codes = np.fromiter(
+            (key_codes.setdefault(item_key(item['name']), len(key_codes)) for item in items),
+            dtype=np.int64, count=len(items)
+        )
+        days = np.fromiter((day for day in ordinals if day is not None), dtype=np.int64, count=len(items))
+        order = np.lexsort((days, codes))
+        codes, days = codes[order], days[order]
+
+        # Distinct (name, day) pairs; consecutive pairs of the same name give the gaps
+        distinct = np.ones(len(days), dtype=bool)
+        distinct[1:] = (codes[1:] != codes[:-1]) | (days[1:] != days[:-1])
+        unique_codes, unique_days = codes[distinct], days[distinct]
+        same_name = unique_codes[1:] == unique_codes[:-1]
+        gaps = np.diff(unique_days)[same_name]
+        gap_codes = unique_codes[1:][same_name]
+        gap_sums = np.bincount(gap_codes, weights=gaps, minlength=len(key_codes))
+        gap_squares = np.bincount(gap_codes, weights=gaps * gaps, minlength=len(key_codes))
+
+        day_counts = np.diff(np.append(np.flatnonzero(distinct), len(days)))
+        starts = np.searchsorted(unique_codes, np.arange(len(key_codes)))
+        ends = np.append(starts[1:], len(unique_codes))
+        for key, code in key_codes.items():
+            history = _History()
+            history.days = unique_days[starts[code]:ends[code]].tolist()
+            history.day_counts = Counter(dict(zip(history.days, day_counts[starts[code]:ends[code]].tolist())))
+            history.gap_sum = int(gap_sums[code])
+            history.gap_squares = int(gap_squares[code])
+            model.histories[key] = history
+        for item in items:
+            model._track_latest(item)
+        return model
+
+    def apply(self, event):
+        """Update the purchase histories from one change event"""
+        if event.kind == ITEM_ADDED:
+            self.add(event.item)
+        elif event.kind == ITEM_REMOVED:
+            self.remove(event.item)
+        elif event.kind == ITEM_UPDATED:
+            if (item_key(event.previous['name']) != item_key(event.item['name'])
+                    or event.previous['date_added'] != event.item['date_added']):
+                self.remove(event.previous)
+                self.add(event.item)
+            elif _day_ordinal(event.item['date_added']) is not None:
+                self._track_latest(event.item)
+
+    def add(self, item):
+        day = _day_ordinal(item['date_added'])
+        if day is None:
+            return
+        history = self.histories.setdefault(item_key(item['name']), _History())
+        history.add_day(day)
+        self._track_latest(item)
+
+    def remove(self, item):
+        key = item_key(item['name'])
+        history = self.histories.get(key)
+        day = _day_ordinal(item['date_added'])
+        if history is None or day is None:
+            return
+        history.remove_day(day)
+        if not history.days:
+            del self.histories[key]
+        elif history.latest is not None and history.latest.get('id') == item.get('id'):
+            # Keep showing the removed item's details until a newer purchase replaces them
+            history.latest = dict(history.latest, date_added=date.fromordinal(history.days[-1]).isoformat())
+
+    def estimate(self, name):
+        """Interval statistics and the predicted next purchase for one name, or None if too few purchases"""
+        history = self.histories.get(item_key(name))
+        if history is None:
+            return None
+        return self._estimate(history)
+
+    def schedule(self, today=None):
+        """Estimates for every recurring name, soonest due first"""
+        today = today or date.today()
+        estimates = []
+        for history in self.histories.values():
+            estimate = self._estimate(history)
+            if (estimate is None or estimate['cv'] > MAX_INTERVAL_CV
+                    or estimate['interval_days'] > MAX_INTERVAL_DAYS):
+                continue
+            estimate['days_until'] = (estimate['next_due'] - today).days
+            if estimate['days_until'] < -LAPSED_INTERVALS * estimate['interval_days']:
+                continue
+            estimates.append(estimate)
+        return sorted(estimates, key=lambda estimate: estimate['next_due'])
+
+    def due_soon(self, today=None, within_days=DUE_SOON_DAYS):
+        """Recurring names whose next purchase is due within `within_days`, including overdue ones"""
+        return [estimate for estimate in self.schedule(today) if estimate['days_until'] <= within_days]
+
+    def _track_latest(self, item):
+        history = self.histories[item_key(item['name'])]
+        if history.latest is None or item['date_added'] >= history.latest['date_added']:
+            history.latest = item
+
+    @staticmethod
+    def _estimate(history):
+        gaps = len(history.days) - 1
+        if len(history.days) < MIN_PURCHASE_DAYS or history.gap_sum <= 0:
+            return None
+        mean = history.gap_sum / gaps
+        variance = max(0.0, history.gap_squares / gaps - mean * mean)
+        std = math.sqrt(variance)
+        last_day = date.fromordinal(history.days[-1])
+        latest = history.latest
+        return {
+            'name': latest['name'],
+            'category': latest['category'],
+            'unit': latest['unit'],
+            'quantity': latest['quantity'],
+            'price': latest['price'],
+            'purchases': len(history.days),
+            'interval_days': mean,
+            'interval_std': std,
+            'cv': std / mean,
+            'last_purchase': last_day,
+            'next_due': last_day + timedelta(days=round(mean)),
+        }
@@ -0,0 +1,167 @@
+"""Per-user data persistence for the Smart Grocery & Budget Assistant.
+
+Every save increments a revision number stored in the user's directory.
+Reads and writes of one user's files hold the user's file lock (shared for
+reads, exclusive for writes), so a reader never sees the items of one save
+with the budgets of another, and `save_user_data(..., expected_revision=N)`
+is a compare-and-swap across processes.
+"""
+import contextlib
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks then only guard the threads of this process
+    fcntl = None
+
+from columnar import ItemColumns, encode_item_columns, write_item_columns
+from datadir import ensure_user_dir, user_dir
+
+
+class RevisionConflict(Exception):
+    """The stored data changed since the revision a save was based on"""
+
+    def __init__(self, revision):
+        super().__init__(f"Stored data is at revision {revision}")
+        self.revision = revision
+
+
+def grocery_file_path(username):
+    """Path of a user's grocery items file"""
+    return os.path.join(user_dir(username), 'grocery_data.json')
+
+
+def budget_file_path(username):
+    """Path of a user's budget entries file"""
+    return os.path.join(user_dir(username), 'budget_data.json')
+
+
+def item_columns_path(username):
+    """Path of a user's binary columnar copy of the grocery items"""
+    return os.path.join(user_dir(username), 'items.col')
+
+
+def archive_dir_path(username):
+    """Directory holding a user's compressed archive segments"""
+    return os.path.join(user_dir(username), 'archive')
+
+
+def revision_file_path(username):
+    """Path of the file holding the revision of a user's stored data"""
+    return os.path.join(user_dir(username), 'revision')
+
+
+_process_locks = {}
+_process_locks_guard = threading.Lock()
+
+
+@contextlib.contextmanager
+def user_lock(username, shared=False):
+    """Hold a user's file lock: shared for consistent reads, exclusive for writes"""
+    if fcntl is None:
+        with _process_locks_guard:
+            lock = _process_locks.setdefault(username, threading.RLock())
+        with lock:
+            yield
+        return
+    if shared and not os.path.isdir(user_dir(username)):
+        yield  # nothing stored yet, so nothing to read inconsistently
+        return
+    with open(os.path.join(ensure_user_dir(username), '.lock'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_revision(username):
+    """Revision of a user's stored data; 0 if it was never saved with one"""
+    try:
+        with open(revision_file_path(username), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return 0
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a temporary file and move it into place"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def load_user_columns(username):
+    """Open the user's columnar item file, or None if it is missing or stale.
+
+    The JSON file is the interchange format; if it was written after the
+    columnar copy (for example by an import), the columnar copy is ignored.
+    """
+    columns_file = item_columns_path(username)
+    grocery_file = grocery_file_path(username)
+    if not os.path.exists(columns_file):
+        return None
+    if os.path.exists(grocery_file) and os.path.getmtime(grocery_file) > os.path.getmtime(columns_file):
+        return None
+    try:
+        return ItemColumns(columns_file)
+    except ValueError:
+        return None
+
+
+def load_user_data(username):
+    """Load specific user's grocery and budget data"""
+    grocery_data, budget_data, _ = load_user_snapshot(username)
+    return grocery_data, budget_data
+
+
+def load_user_snapshot(username):
+    """A user's grocery and budget data together with the revision they belong to"""
+    with user_lock(username, shared=True):
+        return (*_read_user_files(username), load_revision(username))
+
+
+def _read_user_files(username):
+    grocery_file = grocery_file_path(username)
+    budget_file = budget_file_path(username)
+
+    grocery_data = []
+    budget_data = []
+
+    columns = load_user_columns(username)
+    if columns is not None:
+        with columns:
+            grocery_data = columns.to_dicts()
+    elif os.path.exists(grocery_file):
+        with open(grocery_file, 'r') as f:
+            grocery_data = json.load(f)
+
+    if os.path.exists(budget_file):
+        with open(budget_file, 'r') as f:
+            budget_data = json.load(f)
+
+    return grocery_data, budget_data
+
+
+def save_user_data(username, grocery_data, budget_data, expected_revision=None):
+    """Save specific user's grocery and budget data, returning the new revision.
+
+    With `expected_revision`, raises RevisionConflict instead of writing if
+    another save happened since that revision was read.
+    """
+    # Encoded up front so items the columnar format rejects fail the save before any file changes
+    item_columns = encode_item_columns(grocery_data)
+    with user_lock(username):
+        revision = load_revision(username)
+        if expected_revision is not None and revision != expected_revision:
+            raise RevisionConflict(revision)
+        write_json_atomic(grocery_file_path(username), grocery_data)
+        write_json_atomic(budget_file_path(username), budget_data)
+        # Written after the JSON so its mtime marks it as current
+        write_item_columns(item_columns_path(username), grocery_data, item_columns)
+        # Written last: a changed revision file means a complete save
+        write_json_atomic(revision_file_path(username), revision + 1)
+    return revision + 1
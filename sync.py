@@ -0,0 +1,258 @@
+"""Optimistic concurrency for one user's data open in several processes.
+
+Each process holds one in-memory copy of a user's data (`mutations.UserData`)
+tied to the stored revision it was loaded from, plus a journal of the LOCAL
+change events made since then. Saving is a compare-and-swap on the stored
+revision (`storage.save_user_data(..., expected_revision=...)`):
+
+* if nobody saved since, the in-memory data is written as is;
+* otherwise the other writer's data is loaded and the journal is replayed on
+  top of it: a three-way merge by item ID in which each event's `previous`
+  value is the common ancestor. Changes to different items, or to different
+  fields of one item, merge without a trace. Two different values for the
+  same field, or an edit racing a removal, are resolved by a fixed rule
+  (this session's value wins; an edited item survives a removal) and
+  recorded as conflicts the user can review and reverse.
+
+Every rerun compares the revision file's stat with the last one seen, so
+picking up other sessions' changes costs one `os.stat` while nothing
+changed. When something did, only the differences are applied, as REMOTE
+events, so derived views update incrementally. If the other session also
+archived months, the archive index is re-read and derived views are rebuilt.
+"""
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+from archive import archive_index_path, load_archive_index
+from events import BUDGET_SET, ITEM_ADDED, ITEM_REMOVED, ITEM_UPDATED, LOCAL
+from items import add_item, build_item_index, get_item, remove_item, update_item
+from storage import RevisionConflict, load_user_snapshot, revision_file_path, save_user_data
+
+logger = logging.getLogger(__name__)
+
+MAX_SAVE_ATTEMPTS = 5
+MAX_CONFLICTS_KEPT = 50
+
+# Conflict kinds
+FIELD_CONFLICT = 'field'  # both sides changed one field of an item
+REMOVED_HERE = 'removed_here'  # removed here, edited elsewhere: the edited item is kept
+REMOVED_ELSEWHERE = 'removed_elsewhere'  # edited here, removed elsewhere: the edited item is kept
+BUDGET_CONFLICT = 'budget'  # both sides set the same month's budget for a category
+
+_syncs = weakref.WeakValueDictionary()  # username -> UserSync of this process
+
+
+def merge(grocery_items, budget_entries, journal):
+    """Replay local change events on top of another writer's items and budgets.
+
+    Returns the merged items, the merged budgets and a list of conflicts as
+    dicts with 'kind', 'item_id', 'label', 'field', 'kept' and 'other'.
+    """
+    items = list(grocery_items)
+    index = build_item_index(items)
+    budgets = list(budget_entries)
+    theirs = {item['id']: item for item in grocery_items}
+    ancestors = {}  # item id -> the item as this session first saw it, before its own changes
+    conflicts = []
+
+    for event in journal:
+        if event.kind == ITEM_ADDED:
+            ancestors.setdefault(event.item['id'], None)
+            if event.item['id'] not in index:
+                add_item(items, index, event.item)
+        elif event.kind == ITEM_REMOVED:
+            item_id = event.item['id']
+            ancestor = ancestors.setdefault(item_id, event.item)
+            if item_id not in index:
+                continue
+            if ancestor is not None and theirs.get(item_id, ancestor) != ancestor:
+                conflicts.append(_conflict(REMOVED_HERE, item_id, get_item(items, index, item_id)['name']))
+            else:
+                remove_item(items, index, item_id)
+        elif event.kind == ITEM_UPDATED:
+            item_id = event.item['id']
+            ancestors.setdefault(item_id, event.previous)
+            current = get_item(items, index, item_id)
+            if current is None:
+                add_item(items, index, event.item)
+                conflicts.append(_conflict(REMOVED_ELSEWHERE, item_id, event.item['name']))
+                continue
+            changes = {}
+            for field, value in event.item.items():
+                base = event.previous.get(field)
+                if field == 'id' or value == base:
+                    continue
+                if current.get(field) not in (base, value):
+                    conflicts.append(_conflict(FIELD_CONFLICT, item_id, event.item['name'], field,
+                                               kept=value, other=current.get(field)))
+                changes[field] = value
+            if changes:
+                update_item(items, index, item_id, changes)
+        elif event.kind == BUDGET_SET:
+            key = (event.budget['month'], event.budget['category'])
+            position = next((i for i, budget in enumerate(budgets)
+                             if (budget['month'], budget['category']) == key), None)
+            current = budgets[position]['allocated_amount'] if position is not None else None
+            base = event.previous['allocated_amount'] if event.previous else None
+            if current not in (base, event.budget['allocated_amount']):
+                conflicts.append(_conflict(BUDGET_CONFLICT, None, f"{key[1]} {key[0]}", 'allocated_amount',
+                                           kept=event.budget['allocated_amount'], other=current))
+            if position is None:
+                budgets.append(event.budget)
+            else:
+                budgets[position] = event.budget
+    return items, budgets, conflicts
+
+
+def _conflict(kind, item_id, label, field=None, kept=None, other=None):
+    return {'kind': kind, 'item_id': item_id, 'label': label, 'field': field, 'kept': kept, 'other': other}
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    # Both files are replaced on every write, so the inode changes even within one mtime tick
+    return stat.st_ino, stat.st_mtime_ns
+
+
+class UserSync:
+    """Stored revision, pending local changes and merge conflicts of one user's in-memory data"""
+
+    def __init__(self, user_data, stored_revision):
+        self.user_data = user_data
+        self.stored_revision = stored_revision
+        self.journal = []  # LOCAL events not saved yet, oldest first
+        self.conflicts = deque(maxlen=MAX_CONFLICTS_KEPT)
+        self.sequence = 0
+        self.merges = 0
+        self._revision_path = revision_file_path(user_data.username)
+        self._stamp = _file_stamp(self._revision_path)
+        self._archive_index_path = archive_index_path(user_data.username)
+        self._archive_stamp = _file_stamp(self._archive_index_path)
+        # Saves and refreshes of one user do their I/O one at a time
+        self._lock = threading.Lock()
+        user_data.subscribe(self._record)
+
+    def _record(self, events):
+        self.journal.extend(event for event in events if event.origin == LOCAL)
+
+    def refresh(self):
+        """Merge in changes another session saved since ours; returns whether anything changed"""
+        username = self.user_data.username
+        stamp = _file_stamp(self._revision_path)
+        if stamp == self._stamp:
+            return False
+        # A save in flight merges the other session's changes itself
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            grocery_items, budget_entries, revision = load_user_snapshot(username)
+            with self.user_data.lock:
+                self._stamp = stamp
+                if revision == self.stored_revision:
+                    return False
+                items, budgets, conflicts = merge(grocery_items, budget_entries, self.journal)
+                self._add_conflicts(conflicts)
+                self._reload_archive_index()
+                self.user_data.apply_remote(items, budgets)
+                self.stored_revision = revision
+                self.merges += 1
+                return True
+        finally:
+            self._lock.release()
+
+    def save(self):
+        """Write the in-memory data, merging first if another session saved since it was loaded"""
+        username = self.user_data.username
+        with self._lock:
+            with self.user_data.lock:
+                grocery_items = list(self.user_data.grocery_items)
+                budget_entries = list(self.user_data.budget_entries)
+                journal = list(self.journal)
+                saved_through = self.user_data.revision
+                expected = self.stored_revision
+            conflicts = None
+            for _ in range(MAX_SAVE_ATTEMPTS):
+                try:
+                    revision = save_user_data(username, grocery_items, budget_entries, expected_revision=expected)
+                    break
+                except RevisionConflict:
+                    theirs_items, theirs_budgets, expected = load_user_snapshot(username)
+                    grocery_items, budget_entries, conflicts = merge(theirs_items, theirs_budgets, journal)
+            else:
+                raise RevisionConflict(expected)
+
+            with self.user_data.lock:
+                self.journal = [event for event in self.journal if event.revision > saved_through]
+                self.stored_revision = revision
+                self._stamp = _file_stamp(self._revision_path)
+                if conflicts is not None:
+                    self.merges += 1
+                    self._add_conflicts(conflicts)
+                    self._reload_archive_index()
+                    # Changes made while writing are not saved yet; keep them on top of the merged data
+                    items, budgets, _ = merge(grocery_items, budget_entries, self.journal)
+                    self.user_data.apply_remote(items, budgets)
+        return revision
+
+    def _reload_archive_index(self):
+        """Pick up months another session archived; its removals of their items arrive with its save"""
+        stamp = _file_stamp(self._archive_index_path)
+        if stamp == self._archive_stamp:
+            return
+        self._archive_stamp = stamp
+        self.user_data.archive_index = load_archive_index(self.user_data.username)
+        # Views built on the old index would miss the archived spend; months are archived rarely
+        self.user_data.invalidate()
+
+    def resolve(self, sequence, use_other):
+        """Close a conflict, switching to the other session's version if `use_other`"""
+        conflict = next((conflict for conflict in self.conflicts if conflict['sequence'] == sequence), None)
+        if conflict is None:
+            return
+        self.conflicts.remove(conflict)
+        if not use_other:
+            return
+        user_data = self.user_data
+        if conflict['kind'] == FIELD_CONFLICT:
+            if conflict['item_id'] in user_data.item_index:
+                user_data.update_item(conflict['item_id'], {conflict['field']: conflict['other']})
+        elif conflict['kind'] in (REMOVED_HERE, REMOVED_ELSEWHERE):
+            # The other version is the removal
+            user_data.remove_items([conflict['item_id']])
+        elif conflict['kind'] == BUDGET_CONFLICT and conflict['other'] is not None:
+            category, month = conflict['label'].rsplit(' ', 1)
+            user_data.set_budget(category, conflict['other'], month)
+
+    def _add_conflicts(self, conflicts):
+        known = {(c['kind'], c['item_id'], c['label'], c['field'], c['kept'], c['other']) for c in self.conflicts}
+        for conflict in conflicts:
+            key = tuple(conflict.values())
+            if key in known:
+                continue
+            known.add(key)
+            self.sequence += 1
+            self.conflicts.append(dict(conflict, sequence=self.sequence, time=time.time()))
+            logger.info("Merge conflict for %s: %s", self.user_data.username, conflict)
+
+
+def attach(user_data, stored_revision):
+    """Tie loaded data to the stored revision it came from; this process's saves of the user go through it"""
+    user_data.sync = UserSync(user_data, stored_revision)
+    _syncs[user_data.username] = user_data.sync
+    return user_data.sync
+
+
+def save_user(username, grocery_data, budget_data):
+    """Autosave writer: a compare-and-swap save with merge for users with attached data, else a plain save"""
+    sync = _syncs.get(username)
+    if sync is None:
+        save_user_data(username, grocery_data, budget_data)
+    else:
+        sync.save()